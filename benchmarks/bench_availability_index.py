@@ -0,0 +1,121 @@
+"""
+Benchmark availability index queries against recomputing availability per query
+
+Builds a seeded host calendar, serves it from a stub fetch with optional
+latency and times the three index queries (is_free, next_free, overlapping)
+on a warm AvailabilityIndex against the on-demand path every booking used
+to take: fetch, parse every spot, scan. Results are checked against each
+other. Run from the repository root:
+
+    python -m benchmarks.bench_availability_index --days 60 --slot-minutes 15 --queries 2000
+    python -m benchmarks.bench_availability_index --fetch-latency 0.15
+"""
+
+import time
+import random
+import argparse
+from datetime import date, timedelta
+
+from utils.availability_index import AvailabilityIndex, from_minute
+from utils.calendar_utils import generate_mock_calendar, iter_available_spots
+
+TIMEZONE = "America/Los_Angeles"
+UUID = "bench-host"
+
+
+def on_demand(fetch, slot_minutes: int):
+    """The three queries answered from a fresh fetch and a linear scan, as before the index."""
+    def spots():
+        return list(iter_available_spots(fetch(UUID, TIMEZONE)))
+
+    def is_free(slot):
+        return slot in spots()
+
+    def next_free(after, n):
+        return [spot for spot in spots() if spot >= after][:n]
+
+    def overlapping(start, end):
+        return [spot for spot in spots() if spot < end and spot + timedelta(minutes=slot_minutes) > start]
+
+    return is_free, next_free, overlapping
+
+
+def timed_queries(queries: list, is_free, next_free, overlapping) -> tuple:
+    """Run every query; return (seconds per query, answers)."""
+    start = time.perf_counter()
+    answers = []
+    for kind, first, second in queries:
+        if kind == "is_free":
+            answers.append(is_free(first))
+        elif kind == "next_free":
+            answers.append(next_free(first, second))
+        else:
+            answers.append(overlapping(first, second))
+    return (time.perf_counter() - start) / len(queries), answers
+
+
+def run(days: int, slot_minutes: int, queries: int, fetch_latency: float, seed: int) -> dict:
+    """Time warm index queries against on-demand fetch-and-scan on the same workload."""
+    calendar = generate_mock_calendar(TIMEZONE, days=days, slot_minutes=slot_minutes, busy_rate=0.5, seed=seed,
+                                      start=date.today() + timedelta(days=1))
+    fetches = []
+
+    def fetch(uuid, timezone):
+        fetches.append(uuid)
+        time.sleep(fetch_latency)
+        return calendar
+
+    index = AvailabilityIndex(fetch=fetch, refresh_interval=0, max_age=3600, slot_minutes=slot_minutes)
+    start = time.perf_counter()
+    host = index.lookup(UUID, TIMEZONE)
+    build_s = time.perf_counter() - start
+
+    first, last = host.slots[0], host.slots[-1]
+    rng = random.Random(seed)
+    workload = []
+    for _ in range(queries):
+        kind = rng.choice(("is_free", "next_free", "overlapping"))
+        # Times on the slot grid half of the time, anywhere in the horizon otherwise
+        minute = rng.choice(host.slots) if rng.random() < 0.5 else rng.randint(first, last)
+        if kind == "is_free":
+            workload.append((kind, from_minute(minute), None))
+        elif kind == "next_free":
+            workload.append((kind, from_minute(minute), 10))
+        else:
+            workload.append((kind, from_minute(minute), from_minute(minute + 120)))
+
+    def indexed(method):
+        return lambda *args: getattr(index.lookup(UUID, TIMEZONE), method)(*args)
+
+    index_s, index_answers = timed_queries(workload, indexed("is_free"), indexed("next_free"), indexed("overlapping"))
+    sample = workload[:max(1, min(queries, 200 if fetch_latency == 0 else 20))]
+    baseline_s, baseline_answers = timed_queries(sample, *on_demand(fetch, slot_minutes))
+    return {
+        "slots": len(host),
+        "intervals": len(host.interval_starts),
+        "build_s": build_s,
+        "index_s": index_s,
+        "baseline_s": baseline_s,
+        "consistent": index_answers[:len(sample)] == baseline_answers,
+        "fetches": len(fetches),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark availability index queries')
+    parser.add_argument('--days', type=int, default=60, help='Horizon of the host calendar in days')
+    parser.add_argument('--slot-minutes', type=int, default=15, help='Slot granularity in minutes')
+    parser.add_argument('--queries', type=int, default=5000, help='Index queries to time')
+    parser.add_argument('--fetch-latency', type=float, default=0.0, help='Seconds each availability fetch takes')
+    parser.add_argument('--seed', type=int, default=1, help='Calendar and query seed')
+
+    args = parser.parse_args()
+
+    result = run(args.days, args.slot_minutes, args.queries, args.fetch_latency, args.seed)
+
+    print(f"{result['slots']} free slots in {result['intervals']} intervals, index built in "
+          f"{result['build_s'] * 1000:.1f} ms, {result['fetches']} fetches, "
+          f"answers {'match' if result['consistent'] else 'DIFFER'}")
+    print(f"{'index':>10}: {result['index_s'] * 1e6:10.1f} us/query")
+    print(f"{'on demand':>10}: {result['baseline_s'] * 1e6:10.1f} us/query "
+          f"(x{result['baseline_s'] / result['index_s']:.0f})")
@@ -0,0 +1,85 @@
+"""
+Benchmark batched versus per-booking LLM slot selection
+
+Books a cohort of N candidates onto one shared availability snapshot, first
+with one get_suggested_time call per booking, then with
+get_suggested_times_batch. Reports LLM calls, wall time per booked meeting
+and slot collisions. The offline FakeChatModel stands in for OpenAI.
+Run from the repository root:
+
+    python -m benchmarks.bench_batch_booking --bookings 50 --chunk-size 10
+"""
+
+import argparse
+import time
+
+from utils.calendar_utils import generate_mock_calendar, find_matching_times, select_candidates, format_matches
+from utils.calendly_api import get_suggested_time, get_suggested_times_batch
+from utils.llm_providers import FakeChatModel
+from utils.timezone_utils import parse_slot
+
+
+def _fake_model() -> FakeChatModel:
+    """Fake model with the same latency profile for both paths."""
+    return FakeChatModel(latency="lognormal", latency_median=0.8, per_token_latency=0.0002, seed=7)
+
+
+def run_per_booking(matches: list, bookings: int, timezone: str, prompt_candidates: int) -> dict:
+    """Run one LLM call per booking against the same availability snapshot."""
+    llm = _fake_model()
+    taken = set()
+    collisions = 0
+    start = time.perf_counter()
+    for _ in range(bookings):
+        candidates = select_candidates(matches, prompt_candidates, timezone)
+        slot = parse_slot(get_suggested_time(format_matches(candidates, timezone), llm=llm))
+        if slot in taken:
+            collisions += 1
+        taken.add(slot)
+    elapsed = time.perf_counter() - start
+    return {
+        "path": "per-booking",
+        "llm_calls": llm.calls,
+        "booked": len(taken),
+        "collisions": collisions,
+        "wall_time_s": elapsed,
+        "wall_time_per_booking_s": elapsed / max(len(taken), 1),
+    }
+
+
+def run_batched(matches: list, bookings: int, timezone: str, chunk_size: int) -> dict:
+    """Run the batched advisor over the same availability snapshot."""
+    llm = _fake_model()
+    requests = [{"id": f"candidate-{i}", "preferences": "any weekday"} for i in range(bookings)]
+    start = time.perf_counter()
+    assignments = get_suggested_times_batch(matches, requests, timezone, llm=llm, chunk_size=chunk_size)
+    elapsed = time.perf_counter() - start
+    assigned = [slot for slot in assignments.values() if slot]
+    return {
+        "path": f"batched (chunk={chunk_size})",
+        "llm_calls": llm.calls,
+        "booked": len(set(assigned)),
+        "collisions": len(assigned) - len(set(assigned)),
+        "wall_time_s": elapsed,
+        "wall_time_per_booking_s": elapsed / max(len(set(assigned)), 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark batched versus per-booking slot selection')
+    parser.add_argument('--bookings', type=int, default=50, help='Number of bookings in the cohort')
+    parser.add_argument('--chunk-size', type=int, default=10, help='Booking requests per batched LLM call')
+    parser.add_argument('--horizon', type=int, default=120, help='Availability horizon in days')
+    parser.add_argument('--timezone', default='America/Los_Angeles', help='IANA timezone')
+
+    args = parser.parse_args()
+
+    # Every candidate books onto the same interviewer calendar
+    interviewer = generate_mock_calendar(args.timezone, days=args.horizon)
+    matches = find_matching_times(interviewer, interviewer)
+    print(f"{len(matches)} open slots over {args.horizon} days, {args.bookings} bookings")
+
+    for row in (run_per_booking(matches, args.bookings, args.timezone, 20),
+                run_batched(matches, args.bookings, args.timezone, args.chunk_size)):
+        print(f"{row['path']:>20}: {row['llm_calls']:>3} LLM calls, {row['booked']:>3} booked, "
+              f"{row['collisions']:>3} collisions, {row['wall_time_per_booking_s']:.3f}s per booked meeting")
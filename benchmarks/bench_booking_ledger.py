@@ -0,0 +1,86 @@
+"""
+Benchmark booking ledger throughput and duplicate suppression under concurrency
+
+Fires `operations` run_once() calls from a thread pool at a fresh ledger,
+with every booking key requested `repeats` times at once (as retries and
+duplicate jobs would). Submissions are instant, so the run measures ledger
+overhead, then checks that each key was submitted exactly once. A second
+pass replays the same keys to time the booked short-circuit. Run from the
+repository root:
+
+    python -m benchmarks.bench_booking_ledger --operations 10000 --threads 32
+"""
+
+import os
+import time
+import argparse
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.booking_ledger import BookingLedger, booking_key
+
+
+def run_benchmark(operations: int, threads: int, repeats: int, path: str) -> dict:
+    """Run the concurrent workload and the short-circuit replay against a ledger at path."""
+    ledger = BookingLedger(path)
+    unique = operations // repeats
+    keys = [
+        booking_key("event-uuid", f"2025-04-{1 + i % 28:02d}T{9 + i % 8:02d}:00:00Z", f"user{i}@example.com")
+        for i in range(unique)
+    ]
+    workload = [key for key in keys for _ in range(repeats)]
+    submissions = Counter()
+    lock = threading.Lock()
+
+    def submit_for(key):
+        def submit():
+            with lock:
+                submissions[key] += 1
+            return f"https://calendly.com/host/event/{key[1]}"
+        return submit
+
+    def call(key):
+        return ledger.run_once(key, submit_for(key))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(call, workload))
+    concurrent_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        replayed = list(pool.map(call, workload))
+    replay_s = time.perf_counter() - start
+
+    return {
+        "operations": len(workload),
+        "unique_keys": unique,
+        "threads": threads,
+        "concurrent_ops_per_s": len(workload) / concurrent_s,
+        "replay_ops_per_s": len(workload) / replay_s,
+        "submissions": sum(submissions.values()),
+        "duplicate_submissions": sum(count - 1 for count in submissions.values() if count > 1),
+        "unsubmitted_keys": unique - len(submissions),
+        "replay_all_short_circuited": all(replayed),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark booking ledger throughput and idempotency')
+    parser.add_argument('--operations', type=int, default=10000, help='Total run_once() calls')
+    parser.add_argument('--threads', type=int, default=32, help='Concurrent callers')
+    parser.add_argument('--repeats', type=int, default=5, help='Concurrent requests per booking key')
+    parser.add_argument('--path', help='Ledger file (defaults to a temporary file)')
+
+    args = parser.parse_args()
+
+    path = args.path or os.path.join(tempfile.mkdtemp(), "bench_ledger.db")
+    result = run_benchmark(args.operations, args.threads, args.repeats, path)
+    print(f"{result['operations']} operations over {result['unique_keys']} keys with {result['threads']} threads")
+    print(f"Concurrent run_once:     {result['concurrent_ops_per_s']:>10.0f} ops/s")
+    print(f"Booked short-circuit:    {result['replay_ops_per_s']:>10.0f} ops/s")
+    print(f"Submissions:             {result['submissions']} "
+          f"(duplicates {result['duplicate_submissions']}, unsubmitted keys {result['unsubmitted_keys']})")
+    print(f"Replay all short-circuited: {result['replay_all_short_circuited']}")
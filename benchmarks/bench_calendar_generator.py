@@ -0,0 +1,75 @@
+"""
+Benchmark generating large synthetic calendar corpora
+
+Times generate_calendar_corpus against calling generate_mock_calendar once
+per calendar, reports calendars and slots per second and checks that the
+same seed reproduces the same corpus. A corpus is millions of small
+acyclic objects, so --pause-gc disables the cyclic collector for the whole
+(single-threaded) run to show how much of the time it accounts for; the
+library itself never touches the collector. Run from the repository root:
+
+    python -m benchmarks.bench_calendar_generator --count 10000 --days 30
+    python -m benchmarks.bench_calendar_generator --count 1000 --days 90 --slot-minutes 15 --busy-rate 0.3,0.9
+    python -m benchmarks.bench_calendar_generator --count 10000 --days 30 --pause-gc
+"""
+
+import gc
+import time
+import argparse
+from datetime import date
+
+from utils.calendar_utils import generate_calendar_corpus, generate_mock_calendar
+
+
+def parse_busy_rate(value: str):
+    """Parse "0.8" as a constant rate and "0.5,0.9" as a (low, high) range."""
+    parts = [float(part) for part in value.split(",")]
+    return parts[0] if len(parts) == 1 else tuple(parts)
+
+
+def run(count: int, days: int, slot_minutes: int, busy_rate, timezone: str, seed: int) -> dict:
+    """Generate the corpus both ways and summarise throughput."""
+    first_day = date.today()
+    start = time.perf_counter()
+    corpus = generate_calendar_corpus(count, timezone, days=days, slot_minutes=slot_minutes,
+                                      busy_rate=busy_rate, seed=seed, start=first_day)
+    corpus_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for index in range(count):
+        generate_mock_calendar(timezone, days=days, slot_minutes=slot_minutes, busy_rate=busy_rate,
+                               seed=seed + index, start=first_day)
+    single_s = time.perf_counter() - start
+
+    spots = sum(len(day["spots"]) for calendar in corpus for day in calendar["days"])
+    reproducible = generate_calendar_corpus(count, timezone, days=days, slot_minutes=slot_minutes,
+                                            busy_rate=busy_rate, seed=seed, start=first_day) == corpus
+    return {
+        "corpus_s": corpus_s,
+        "single_s": single_s,
+        "available_spots": spots,
+        "reproducible": reproducible,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark synthetic calendar corpus generation')
+    parser.add_argument('--count', type=int, default=10000, help='Calendars to generate')
+    parser.add_argument('--days', type=int, default=30, help='Horizon in days')
+    parser.add_argument('--slot-minutes', type=int, default=30, help='Slot granularity in minutes')
+    parser.add_argument('--busy-rate', default='0.5,0.9', help='Busy rate, or "low,high" range per calendar')
+    parser.add_argument('--timezone', default='America/Los_Angeles', help='IANA timezone')
+    parser.add_argument('--seed', type=int, default=1, help='Corpus seed')
+    parser.add_argument('--pause-gc', action='store_true', help='Disable the cyclic garbage collector for the run')
+
+    args = parser.parse_args()
+    if args.pause_gc:
+        gc.disable()
+
+    result = run(args.count, args.days, args.slot_minutes, parse_busy_rate(args.busy_rate), args.timezone, args.seed)
+
+    print(f"generate_calendar_corpus: {result['corpus_s']:.2f}s "
+          f"({args.count / result['corpus_s']:,.0f} calendars/s, {result['available_spots']:,} available spots)")
+    print(f"generate_mock_calendar x{args.count}: {result['single_s']:.2f}s "
+          f"({args.count / result['single_s']:,.0f} calendars/s)")
+    print(f"same seed reproduces corpus: {result['reproducible']}")
@@ -0,0 +1,104 @@
+"""
+Benchmark invitee availability with incremental CalDAV sync against full downloads
+
+Loads --events seeded events (a mix of one-off and weekly recurring
+meetings) into the local CalDAV stand-in, then simulates --bookings
+bookings, with --changes events edited between bookings. For each booking
+it builds the invitee's availability two ways:
+
+    full   download the whole calendar as an ICS feed and parse it
+    delta  one sync-collection REPORT with the cached token, then query the cache
+
+and reports time and bytes per booking and whether both give the same
+availability. --max-results makes the stand-in truncate REPORT responses
+the way size-limited servers do, so delta syncs span several requests.
+Run from the repository root:
+
+    python -m benchmarks.bench_calendar_sync --events 5000 --bookings 20 --changes 3
+    python -m benchmarks.bench_calendar_sync --events 5000 --changes 30 --max-results 16
+"""
+
+import time
+import random
+import argparse
+import statistics
+from datetime import date, datetime, timedelta
+
+from benchmarks.caldav_stub import LocalCalDAVServer, event_ics
+from utils.calendar_sources import CalDAVSource, EventCache, ICSSource, InviteeCalendar
+from utils.timezone_utils import localize
+
+TIMEZONE = "America/Los_Angeles"
+START = date(2026, 3, 2)
+
+
+def random_event(rng: random.Random, name: str) -> str:
+    """A 30-90 minute working-hours meeting within 180 days of START; one in five repeats weekly."""
+    day = START + timedelta(days=rng.randrange(-90, 90))
+    begin = localize(datetime(day.year, day.month, day.day, rng.randrange(8, 18), rng.choice((0, 30))), TIMEZONE)
+    end = begin + timedelta(minutes=rng.choice((30, 60, 90)))
+    rrule = "FREQ=WEEKLY;COUNT=20" if rng.random() < 0.2 else None
+    return event_ics(name, begin, end, rrule=rrule)
+
+
+def run(events: int, bookings: int, changes: int, seed: int, max_results: int = None) -> dict:
+    """Time full and delta availability per booking on the same evolving calendar."""
+    rng = random.Random(seed)
+    names = [f"event-{index}" for index in range(events)]
+    with LocalCalDAVServer(max_log=max(1000, bookings * changes * 2), max_results=max_results) as stub:
+        for name in names:
+            stub.put(name, random_event(rng, name))
+
+        full = InviteeCalendar(ICSSource(stub.url, TIMEZONE), timezone=TIMEZONE)
+        delta = InviteeCalendar(CalDAVSource(stub.url, TIMEZONE), cache=EventCache(), timezone=TIMEZONE)
+
+        start = time.perf_counter()
+        delta.sync()
+        initial_s = time.perf_counter() - start
+
+        samples = {"full": [], "delta": []}
+        transferred = {"full": 0, "delta": 0}
+        consistent = True
+        for _ in range(bookings):
+            for name in rng.sample(names, changes):
+                stub.put(name, random_event(rng, name))
+
+            results = {}
+            for label, invitee in (("full", full), ("delta", delta)):
+                # A fresh ICS source has no token, so it downloads the whole feed like a naive integration
+                if label == "full":
+                    invitee.source = ICSSource(stub.url, TIMEZONE)
+                    invitee.cache = EventCache()
+                before = stub.counts["bytes"]
+                start = time.perf_counter()
+                results[label] = invitee.availability(TIMEZONE, days=7, start=START)
+                samples[label].append(time.perf_counter() - start)
+                transferred[label] += stub.counts["bytes"] - before
+            consistent = consistent and results["full"] == results["delta"]
+
+    return {
+        "initial_s": initial_s,
+        "full_s": statistics.median(samples["full"]),
+        "delta_s": statistics.median(samples["delta"]),
+        "full_bytes": transferred["full"] / bookings,
+        "delta_bytes": transferred["delta"] / bookings,
+        "consistent": consistent,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark incremental calendar sync against full downloads')
+    parser.add_argument('--events', type=int, default=5000, help='Events in the invitee calendar')
+    parser.add_argument('--bookings', type=int, default=20, help='Bookings to simulate')
+    parser.add_argument('--changes', type=int, default=3, help='Events edited between bookings')
+    parser.add_argument('--seed', type=int, default=1, help='Calendar seed')
+    parser.add_argument('--max-results', type=int, help='Changes the server lists per REPORT before truncating')
+
+    args = parser.parse_args()
+
+    result = run(args.events, args.bookings, args.changes, args.seed, args.max_results)
+
+    print(f"{args.events} events, {args.changes} changed per booking, initial sync {result['initial_s']:.2f}s, "
+          f"availability {'matches' if result['consistent'] else 'DIFFERS'}")
+    print(f"{'full':>6}: {result['full_s'] * 1000:8.1f} ms/booking, {result['full_bytes'] / 1024:9.1f} KiB/booking")
+    print(f"{'delta':>6}: {result['delta_s'] * 1000:8.1f} ms/booking, {result['delta_bytes'] / 1024:9.1f} KiB/booking")
@@ -0,0 +1,81 @@
+"""
+Benchmark cold versus pooled Chrome time-to-first-navigate
+
+Cold runs repeat what _setup_standard_driver used to do for every booking:
+ask webdriver-manager for chromedriver, launch Chrome, apply the
+anti-detection setup, then navigate. Pooled runs lease a pre-launched driver
+from ChromeDriverPool and navigate. Requires a local Chrome. Run from the
+repository root:
+
+    python -m benchmarks.bench_driver_pool --runs 5 --pool-size 2
+"""
+
+import argparse
+import statistics
+import time
+
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+from browser.driver_pool import ChromeDriverPool, apply_driver_setup, build_chrome_options
+
+TARGET_URL = "data:text/html,<html><body><h1>Calendly</h1></body></html>"
+
+
+def cold_navigate() -> float:
+    """Resolve, launch, configure and navigate a fresh driver; returns seconds to first navigate."""
+    start = time.perf_counter()
+    driver = webdriver.Chrome(
+        service=Service(ChromeDriverManager().install()),
+        options=build_chrome_options(headless=True)
+    )
+    apply_driver_setup(driver)
+    driver.get(TARGET_URL)
+    elapsed = time.perf_counter() - start
+    driver.quit()
+    return elapsed
+
+
+def pooled_navigate(pool: ChromeDriverPool) -> float:
+    """Lease a pooled driver and navigate; returns seconds to first navigate."""
+    start = time.perf_counter()
+    driver = pool.lease()
+    driver.get(TARGET_URL)
+    elapsed = time.perf_counter() - start
+    pool.release(driver)
+    return elapsed
+
+
+def run_benchmark(runs: int, pool_size: int) -> dict:
+    """Time cold and pooled time-to-first-navigate over runs bookings each."""
+    cold = [cold_navigate() for _ in range(runs)]
+
+    pool_start = time.perf_counter()
+    pool = ChromeDriverPool(size=pool_size, headless=True).start()
+    warmup = time.perf_counter() - pool_start
+    try:
+        pooled = [pooled_navigate(pool) for _ in range(runs)]
+    finally:
+        pool.close()
+
+    return {
+        "runs": runs,
+        "pool_size": pool_size,
+        "pool_warmup_s": warmup,
+        "cold_median_s": statistics.median(cold),
+        "pooled_median_s": statistics.median(pooled),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark cold versus pooled Chrome startup')
+    parser.add_argument('--runs', type=int, default=5, help='Navigations per strategy')
+    parser.add_argument('--pool-size', type=int, default=2, help='Pre-launched Chrome instances')
+
+    args = parser.parse_args()
+
+    result = run_benchmark(args.runs, args.pool_size)
+    print(f"Pool warm-up ({result['pool_size']} instances): {result['pool_warmup_s']:.2f}s (paid once per process)")
+    print(f"Cold time-to-first-navigate:   {result['cold_median_s']:.3f}s (median of {result['runs']})")
+    print(f"Pooled time-to-first-navigate: {result['pooled_median_s']:.3f}s (median of {result['runs']})")
@@ -0,0 +1,157 @@
+"""
+Benchmark the free/busy engine against eager expansion and per-slot tests
+
+Builds a seeded calendar of --events raw events spread over --years of
+history and 90 days ahead: mostly one-off meetings plus recurring series
+(daily standups, weekly and biweekly 1:1s, monthly reviews, yearly
+reviews) with COUNT, UNTIL, EXDATEs, moved instances and free events.
+Most series end after a few months, as in real calendars; only those set
+up in the last year may still be running. The free slots of a --days
+window are then computed two ways:
+
+    naive   expand every series from its first occurrence, keep the ones
+            in the window and test every working-hours slot against them
+    engine  free_busy(): lazy expansion from the window on, heap-merge
+            sweep into busy intervals, free intervals swept into slots
+
+and both must give the same free slots. Run from the repository root:
+
+    python -m benchmarks.bench_freebusy --events 20000 --days 30
+"""
+
+import time
+import random
+import argparse
+import statistics
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from utils.calendar_sources import CalendarEvent
+from utils.calendar_utils import generate_mock_calendar, iter_available_spots
+from utils.freebusy import free_busy, iter_occurrences
+from utils.timezone_utils import localize
+
+TIMEZONE = "America/Los_Angeles"
+START = date(2026, 3, 2)
+SERIES = (
+    # (share of series, RRULE, meeting minutes)
+    (0.10, "FREQ=DAILY;BYDAY=MO,TU,WE,TH,FR", 15),
+    (0.45, "FREQ=WEEKLY", 30),
+    (0.15, "FREQ=WEEKLY;INTERVAL=2;BYDAY=TU,TH", 60),
+    (0.20, "FREQ=MONTHLY;BYDAY=1TU", 60),
+    (0.05, "FREQ=MONTHLY;BYMONTHDAY=-1", 90),
+    (0.05, "FREQ=YEARLY", 120),
+)
+
+
+def utc(day: date, hour: int, minute: int) -> datetime:
+    return localize(datetime(day.year, day.month, day.day, hour, minute), TIMEZONE).astimezone(dt_timezone.utc)
+
+
+def synthetic_events(count: int, years: int, recurring: float, seed: int) -> list:
+    """A seeded mix of one-off meetings and recurring series, with overrides and exceptions."""
+    rng = random.Random(seed)
+    first_day = START - timedelta(days=365 * years)
+    span = (START + timedelta(days=90) - first_day).days
+    events = []
+    while len(events) < count:
+        uid = f"event-{len(events)}"
+        day = first_day + timedelta(days=rng.randrange(span))
+        begin = utc(day, rng.randrange(8, 18), rng.choice((0, 30)))
+        if rng.random() >= recurring:
+            end = begin + timedelta(minutes=rng.choice((30, 60, 90)))
+            events.append(CalendarEvent(uid, uid, begin, end, rng.random() > 0.05, TIMEZONE, None, (), None))
+            continue
+
+        share = rng.random()
+        for weight, rrule, minutes in SERIES:
+            share -= weight
+            if share < 0:
+                break
+        # Most series end after a few months; only recent ones may still be running
+        ending = rng.random()
+        if ending < 0.4:
+            rrule += f";COUNT={rng.randint(5, 60)}"
+        elif ending < 0.8 or begin.date() < START - timedelta(days=365):
+            rrule += ";UNTIL=" + (begin + timedelta(days=rng.randrange(30, 365))).strftime("%Y%m%dT%H%M%SZ")
+        end = begin + timedelta(minutes=minutes)
+        # Exceptions and a moved instance on the first few weeks of the series
+        exdates = tuple((begin + timedelta(weeks=week)).timestamp() for week in range(1, 4) if rng.random() < 0.2)
+        events.append(CalendarEvent(uid, uid, begin, end, True, TIMEZONE, rrule, exdates, None))
+        if rng.random() < 0.1 and len(events) < count:
+            original = begin + timedelta(weeks=4)
+            moved = original + timedelta(hours=rng.choice((-2, 1, 3)))
+            events.append(CalendarEvent(uid, uid, moved, moved + timedelta(minutes=minutes), True, TIMEZONE, None,
+                                        (), original.timestamp()))
+    return events
+
+
+def naive_free_slots(events: list, days: int, slot_minutes: int) -> list:
+    """Free slots from eager expansion of every series and a scan of every occurrence per slot."""
+    window_start = utc(START, 0, 0).timestamp()
+    window_end = utc(START + timedelta(days=days), 0, 0).timestamp()
+    overridden = {}
+    for event in events:
+        if event.recurrence_id is not None:
+            overridden.setdefault(event.uid, set()).add(event.recurrence_id)
+
+    occurrences = []
+    for event in events:
+        if not event.busy:
+            continue
+        skip = overridden.get(event.uid, ()) if event.rrule else ()
+        # Expanding from the series start materializes every past occurrence, as before the engine
+        expanded = list(iter_occurrences(event, event.start.timestamp(), window_end, skip))
+        occurrences.extend((start, end) for start, end in expanded if end > window_start)
+
+    slots = iter_available_spots(generate_mock_calendar(TIMEZONE, days=days, slot_minutes=slot_minutes,
+                                                        busy_rate=0, start=START))
+    length = slot_minutes * 60
+    return [
+        slot for slot in slots
+        if not any(start < slot.timestamp() + length and end > slot.timestamp() for start, end in occurrences)
+    ]
+
+
+def run(events: int, years: int, recurring: float, days: int, slot_minutes: int, repeat: int, seed: int) -> dict:
+    """Time naive and engine free/busy on the same calendar."""
+    calendar_events = synthetic_events(events, years, recurring, seed)
+
+    start = time.perf_counter()
+    naive = naive_free_slots(calendar_events, days, slot_minutes)
+    naive_s = time.perf_counter() - start
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        calendar = free_busy(calendar_events, TIMEZONE, days=days, slot_minutes=slot_minutes, start=START)
+        samples.append(time.perf_counter() - start)
+    engine = list(iter_available_spots(calendar))
+
+    return {
+        "events": len(calendar_events),
+        "series": sum(1 for event in calendar_events if event.rrule),
+        "free_slots": len(engine),
+        "naive_s": naive_s,
+        "engine_s": statistics.median(samples),
+        "consistent": naive == engine,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the free/busy engine on large raw calendars')
+    parser.add_argument('--events', type=int, default=10000, help='Raw events in the calendar')
+    parser.add_argument('--years', type=int, default=8, help='Years of history before the window')
+    parser.add_argument('--recurring', type=float, default=0.2, help='Share of events that are recurring series')
+    parser.add_argument('--days', type=int, default=30, help='Query window in days')
+    parser.add_argument('--slot-minutes', type=int, default=30, help='Slot length in minutes')
+    parser.add_argument('--repeat', type=int, default=5, help='Engine runs to take the median of')
+    parser.add_argument('--seed', type=int, default=1, help='Calendar seed')
+
+    args = parser.parse_args()
+
+    result = run(args.events, args.years, args.recurring, args.days, args.slot_minutes, args.repeat, args.seed)
+
+    print(f"{result['events']} events ({result['series']} recurring), {args.days}-day window, "
+          f"{result['free_slots']} free slots, results {'match' if result['consistent'] else 'DIFFER'}")
+    print(f"{'naive':>7}: {result['naive_s'] * 1000:9.1f} ms")
+    print(f"{'engine':>7}: {result['engine_s'] * 1000:9.1f} ms (x{result['naive_s'] / result['engine_s']:.0f})")
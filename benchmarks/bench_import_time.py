@@ -0,0 +1,91 @@
+"""
+Benchmark cold-start import time of book.py against a budget
+
+Imports each target in a fresh interpreter with `python -X importtime`,
+takes the median cumulative time over --runs, lists the slowest imported
+packages and checks that heavy optional dependencies (langchain, selenium,
+the Browserbase SDK, dotenv, tiktoken) are not loaded at import. Exits with
+status 1 when a target goes over --budget-ms or pulls in a deferred module,
+so it can gate CI. Run from the repository root:
+
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time --target book --target worker.booking_worker --budget-ms 200
+"""
+
+import re
+import sys
+import argparse
+import statistics
+import subprocess
+from collections import defaultdict
+
+# Loaded on first use only; importing any of these at module import is a regression
+DEFERRED_MODULES = ("langchain", "langchain_core", "langchain_openai", "langchain_community",
+                    "selenium", "browserbase", "dotenv", "tiktoken")
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def measure(target: str) -> dict:
+    """
+    Import target in a fresh interpreter and parse the -X importtime report.
+
+    Returns:
+        dict: total_us (cumulative time of target), top-level package self times and loaded modules
+    """
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {target}"],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed:\n{proc.stderr[-2000:]}")
+
+    total_us = None
+    packages = defaultdict(int)
+    modules = set()
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, _, module = int(match.group(1)), int(match.group(2)), match.group(3), match.group(4)
+        modules.add(module)
+        packages[module.split(".")[0]] += self_us
+        if module == target:
+            total_us = cumulative_us
+    return {"total_us": total_us, "packages": dict(packages), "modules": modules}
+
+
+def run(target: str, runs: int) -> dict:
+    """Measure target runs times; report the median total and the packages of the median run."""
+    samples = sorted((measure(target) for _ in range(runs)), key=lambda sample: sample["total_us"])
+    median = samples[len(samples) // 2]
+    deferred = sorted({module.split(".")[0] for module in median["modules"]} & set(DEFERRED_MODULES))
+    return {
+        "total_ms": statistics.median(sample["total_us"] for sample in samples) / 1000,
+        "packages": median["packages"],
+        "deferred_loaded": deferred,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark cold-start import time against a budget')
+    parser.add_argument('--target', action='append', help='Module to import (repeatable, default: book)')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per target')
+    parser.add_argument('--budget-ms', type=float, default=250.0, help='Maximum median import time per target')
+    parser.add_argument('--top', type=int, default=8, help='Slowest packages to list')
+
+    args = parser.parse_args()
+
+    failed = False
+    for target in args.target or ["book"]:
+        result = run(target, args.runs)
+        over_budget = result["total_ms"] > args.budget_ms
+        status = "OVER BUDGET" if over_budget else "ok"
+        print(f"{target}: {result['total_ms']:.1f} ms median over {args.runs} runs "
+              f"(budget {args.budget_ms:.0f} ms) - {status}")
+        slowest = sorted(result["packages"].items(), key=lambda item: item[1], reverse=True)[:args.top]
+        for package, self_us in slowest:
+            print(f"  {package:<28} {self_us / 1000:>7.1f} ms")
+        if result["deferred_loaded"]:
+            print(f"  deferred modules loaded at import: {', '.join(result['deferred_loaded'])}")
+        failed = failed or over_budget or bool(result["deferred_loaded"])
+
+    sys.exit(1 if failed else 0)
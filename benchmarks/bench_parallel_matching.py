@@ -0,0 +1,77 @@
+"""
+Benchmark parallel matching of many calendar pairs at several worker counts
+
+Generates a seeded corpus, matches random (host, invitee) pairs with serial
+find_matching_times as the baseline, then with CalendarCorpus.match in this
+process (workers=0) and across 1, 2, 4 and 8 worker processes, checking
+every run against the baseline. Speedups are relative to one worker
+process; they are bounded by the cores actually available, which are
+printed. Run from the repository root:
+
+    python -m benchmarks.bench_parallel_matching --calendars 2000 --pairs 50000
+    python -m benchmarks.bench_parallel_matching --workers 1 --workers 4 --days 90 --chunk-size 1024
+"""
+
+import os
+import time
+import random
+import argparse
+
+from utils.calendar_utils import find_matching_times, generate_calendar_corpus
+from utils.parallel_matching import CalendarCorpus
+
+
+def run(calendars: list, pairs: list, worker_counts: list, chunk_size: int, baseline_pairs: int) -> dict:
+    """Time the serial baseline, packing and each worker count; verify results against the baseline."""
+    baseline_pairs = pairs[:baseline_pairs]
+    start = time.perf_counter()
+    expected = [find_matching_times(calendars[first], calendars[second]) for first, second in baseline_pairs]
+    serial_per_pair = (time.perf_counter() - start) / max(len(baseline_pairs), 1)
+
+    start = time.perf_counter()
+    corpus = CalendarCorpus(calendars)
+    pack_s = time.perf_counter() - start
+
+    runs = {}
+    with corpus:
+        for workers in worker_counts:
+            start = time.perf_counter()
+            results = list(corpus.match(pairs, workers=workers, chunk_size=chunk_size))
+            runs[workers] = {
+                "elapsed_s": time.perf_counter() - start,
+                "correct": results[:len(expected)] == expected and len(results) == len(pairs),
+            }
+    return {"serial_s": serial_per_pair * len(pairs), "pack_s": pack_s, "runs": runs}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark parallel calendar matching')
+    parser.add_argument('--calendars', type=int, default=2000, help='Calendars in the corpus')
+    parser.add_argument('--pairs', type=int, default=20000, help='(host, invitee) pairs to match')
+    parser.add_argument('--days', type=int, default=30, help='Calendar horizon in days')
+    parser.add_argument('--workers', type=int, action='append',
+                        help='Worker processes (repeatable, default: 0 1 2 4 8; 0 matches in-process)')
+    parser.add_argument('--chunk-size', type=int, default=512, help='Pairs per task')
+    parser.add_argument('--baseline-pairs', type=int, default=2000,
+                        help='Pairs matched serially for the baseline and correctness check')
+    parser.add_argument('--seed', type=int, default=1, help='Corpus and pair seed')
+
+    args = parser.parse_args()
+
+    calendars = generate_calendar_corpus(args.calendars, days=args.days, busy_rate=(0.2, 0.9), seed=args.seed)
+    rng = random.Random(args.seed)
+    pairs = [(rng.randrange(args.calendars), rng.randrange(args.calendars)) for _ in range(args.pairs)]
+
+    result = run(calendars, pairs, args.workers or [0, 1, 2, 4, 8], args.chunk_size, args.baseline_pairs)
+
+    print(f"{args.pairs} pairs over {args.calendars} calendars x {args.days} days, {os.cpu_count()} CPUs")
+    print(f"{'serial find_matching_times':>28}: {result['serial_s']:7.2f}s (extrapolated from "
+          f"{min(args.baseline_pairs, args.pairs)} pairs)")
+    print(f"{'pack corpus':>28}: {result['pack_s']:7.2f}s")
+    reference = result["runs"].get(1, next(iter(result["runs"].values())))["elapsed_s"]
+    for workers, run_result in result["runs"].items():
+        label = "in-process" if workers == 0 else f"{workers} worker{'s' if workers > 1 else ''}"
+        print(f"{label:>28}: {run_result['elapsed_s']:7.2f}s, {args.pairs / run_result['elapsed_s']:>9,.0f} pairs/s, "
+              f"x{reference / run_result['elapsed_s']:.2f} vs 1 worker, "
+              f"x{result['serial_s'] / run_result['elapsed_s']:.1f} vs serial"
+              f"{'' if run_result['correct'] else ' - MISMATCH'}")
@@ -0,0 +1,57 @@
+"""
+Benchmark prompt size and LLM latency against horizon length
+
+Runs get_suggested_time with and without top-K candidate pruning over
+mock calendars of increasing horizon. The offline FakeChatModel stands in
+for OpenAI, with latency proportional to prompt tokens. Run from the
+repository root:
+
+    python -m benchmarks.bench_prompt_size --horizons 7 30 90 180 --k 10 20
+"""
+
+import argparse
+
+from utils.calendar_utils import generate_mock_calendar, find_matching_times, select_candidates, format_matches
+from utils.calendly_api import get_suggested_time
+from utils.llm_providers import FakeChatModel
+
+
+def run_benchmark(horizons, ks, timezone: str = "America/Los_Angeles") -> list:
+    """
+    Measure prompt tokens and LLM latency for every (horizon, K) pair.
+
+    Returns:
+        list: One result dict per measurement
+    """
+    llm = FakeChatModel(latency="fixed", latency_median=0.2, per_token_latency=0.0002)
+    results = []
+    for horizon in horizons:
+        host = generate_mock_calendar(timezone, days=horizon)
+        invitee = generate_mock_calendar(timezone, days=horizon)
+        matches = find_matching_times(host, invitee)
+
+        for k in [None] + list(ks):
+            candidates = select_candidates(matches, k, timezone)
+            metrics = {}
+            get_suggested_time(format_matches(candidates, timezone), llm=llm, metrics=metrics)
+            results.append({
+                "horizon_days": horizon,
+                "k": k,
+                "matches": len(matches),
+                **metrics
+            })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark prompt size and LLM latency per horizon')
+    parser.add_argument('--horizons', type=int, nargs='+', default=[7, 30, 90, 180], help='Horizon lengths in days')
+    parser.add_argument('--k', type=int, nargs='+', default=[10, 20], help='Top-K values to compare')
+
+    args = parser.parse_args()
+
+    print(f"{'horizon':>8} {'K':>6} {'matches':>8} {'candidates':>10} {'tokens':>8} {'latency':>9}")
+    for row in run_benchmark(args.horizons, args.k):
+        k = "all" if row["k"] is None else row["k"]
+        print(f"{row['horizon_days']:>8} {k:>6} {row['matches']:>8} {row['candidates']:>10} "
+              f"{row['prompt_tokens']:>8} {row['latency_s']:>8.3f}s")
@@ -0,0 +1,149 @@
+"""
+Benchmark fixed inter-request delays versus the adaptive upstream limiter
+
+Runs against the local fault-injecting stub (benchmarks/fault_stub.py),
+which accepts `--server-rate` requests per second and answers 429 with
+Retry-After beyond that:
+
+    fixed delay  - one request every --delay seconds, as test.py used to do
+    adaptive     - --threads callers going through utils.rate_limit.Upstream
+
+Then the stub goes into an outage to show the circuit breaker failing fast
+instead of waiting on timeouts, and a fake-clock run checks that a 429 on
+the half-open probe does not leave the circuit stuck open. Run from the
+repository root:
+
+    python -m benchmarks.bench_rate_limit --requests 200 --server-rate 20
+"""
+
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.fault_stub import FaultInjectingServer
+from utils.rate_limit import CircuitOpenError, Upstream
+
+
+def run_fixed_delay(stub: FaultInjectingServer, count: int, delay: float) -> dict:
+    """Send count requests one at a time with a fixed pause in between."""
+    session = requests.Session()
+    ok = 0
+    start = time.perf_counter()
+    for i in range(count):
+        if session.get(stub.url + "/fixed", timeout=5).status_code == 200:
+            ok += 1
+        if i < count - 1:
+            time.sleep(delay)
+    elapsed = time.perf_counter() - start
+    return {"ok": ok, "elapsed_s": elapsed, "throughput": ok / elapsed}
+
+
+def run_adaptive(stub: FaultInjectingServer, count: int, threads: int) -> dict:
+    """Send count requests from several threads through an adaptive Upstream."""
+    session = requests.Session()
+    upstream = Upstream("stub", rate=5.0, burst=5, max_rate=100.0)
+    before = dict(stub.counts)
+
+    def one(_):
+        return upstream.call(session.get, stub.url + "/adaptive", timeout=5).status_code == 200
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        ok = sum(pool.map(one, range(count)))
+    elapsed = time.perf_counter() - start
+    return {
+        "ok": ok,
+        "elapsed_s": elapsed,
+        "throughput": ok / elapsed,
+        "server_429s": stub.counts["throttled"] - before["throttled"],
+        "final_rate": upstream.bucket.rate,
+    }
+
+
+def run_outage(stub: FaultInjectingServer, count: int) -> dict:
+    """Call through an Upstream while the stub is down; count fast failures."""
+    session = requests.Session()
+    upstream = Upstream("stub-outage", rate=50.0, burst=10, failure_threshold=5, reset_timeout=30.0, max_retries=1)
+    stub.set_outage(True)
+    fast_failures = 0
+    start = time.perf_counter()
+    try:
+        for _ in range(count):
+            try:
+                upstream.call(session.get, stub.url + "/outage", timeout=5)
+            except CircuitOpenError:
+                fast_failures += 1
+    finally:
+        stub.set_outage(False)
+    return {
+        "requests_reaching_stub": upstream.stats["calls"],
+        "fast_failures": fast_failures,
+        "elapsed_s": time.perf_counter() - start,
+        "circuit": upstream.breaker.state,
+    }
+
+
+def run_half_open_throttle() -> dict:
+    """
+    Open a circuit on a fake clock, answer its half-open probe with 429, then recover.
+
+    The upstream must close again once it answers 200; a probe that is
+    throttled must not leave the breaker half-open and failing fast for good.
+    """
+    now = [0.0]
+
+    def sleep(seconds):
+        # Millisecond steps, so token refills never stall on float rounding
+        now[0] += max(seconds, 0.001)
+
+    upstream = Upstream("stub-probe", rate=100.0, burst=100, failure_threshold=2, reset_timeout=30.0,
+                        max_retries=1, clock=lambda: now[0], sleep=sleep)
+    responses = iter([503, 503, 429, 429, 200])
+
+    def respond():
+        response = requests.Response()
+        response.status_code = next(responses)
+        return response
+
+    def status():
+        try:
+            return upstream.call(respond).status_code
+        except CircuitOpenError:
+            return None
+
+    status()
+    opened = upstream.breaker.state
+    sleep(31.0)
+    throttled = status()
+    recovered = status()
+    return {"opened": opened, "probe_status": throttled, "recovered_status": recovered,
+            "circuit": upstream.breaker.state}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark fixed delays versus adaptive rate limiting')
+    parser.add_argument('--requests', type=int, default=200, help='Requests for the adaptive run')
+    parser.add_argument('--fixed-requests', type=int, default=10, help='Requests for the fixed-delay run')
+    parser.add_argument('--delay', type=float, default=1.0, help='Fixed delay between requests in seconds')
+    parser.add_argument('--threads', type=int, default=8, help='Concurrent callers in the adaptive run')
+    parser.add_argument('--server-rate', type=float, default=20.0, help='Requests per second the stub accepts')
+
+    args = parser.parse_args()
+
+    with FaultInjectingServer(rate=args.server_rate, burst=5, retry_after=0.2) as stub:
+        fixed = run_fixed_delay(stub, args.fixed_requests, args.delay)
+        adaptive = run_adaptive(stub, args.requests, args.threads)
+        outage = run_outage(stub, 50)
+    probe = run_half_open_throttle()
+
+    print(f"Stub accepts {args.server_rate:.0f} req/s")
+    print(f"Fixed {args.delay}s delay: {fixed['ok']}/{args.fixed_requests} ok, {fixed['throughput']:.1f} req/s")
+    print(f"Adaptive limiter: {adaptive['ok']}/{args.requests} ok, {adaptive['throughput']:.1f} req/s, "
+          f"{adaptive['server_429s']} server 429s, settled at {adaptive['final_rate']:.1f} req/s")
+    print(f"Outage: {outage['requests_reaching_stub']} requests reached the stub, {outage['fast_failures']} of 50 "
+          f"calls failed fast in {outage['elapsed_s']:.2f}s (circuit {outage['circuit']})")
+    print(f"429 on the half-open probe: circuit {probe['opened']} -> "
+          f"probe got {probe['probe_status'] or 'CircuitOpenError'} -> "
+          f"next call got {probe['recovered_status'] or 'CircuitOpenError'} (circuit {probe['circuit']})")
@@ -0,0 +1,69 @@
+"""
+Benchmark the full book_calendly_meeting path offline against a replay cassette
+
+Every booking goes through the real workflow. The Calendly API is served by
+the local replay server, slot selection by the replayed model and form
+filling by the replayed scraper (see utils/replay.py), so results are
+deterministic and comparable across commits. Without --cassette a
+synthetic cassette is generated. Reports end-to-end and per-phase latency
+from utils.metrics. Run from the repository root:
+
+    python -m benchmarks.bench_replay_booking --bookings 20
+    python -m benchmarks.bench_replay_booking --cassette cassettes/run.json --latency "http=0.05,llm=0.8,browser=0.2"
+"""
+
+import os
+import time
+import argparse
+import tempfile
+
+from book import book_calendly_meeting
+from utils.metrics import BOOKINGS, BOOKING_SECONDS, PHASE_SECONDS
+from utils.replay import ReplaySession, parse_latency, synthetic_cassette
+
+CALENDLY_URL = "https://calendly.com/robertjandali/30min"
+
+
+def run(cassette_path: str, bookings: int, latency: dict, timezone: str) -> dict:
+    """Book sequentially through a replay session and summarise the metrics registry."""
+    with ReplaySession(cassette_path, latency=latency) as replay:
+        start = time.perf_counter()
+        urls = [
+            book_calendly_meeting(CALENDLY_URL, f"Bench User {i}", f"bench{i}@example.com", "5109198404",
+                                  timezone=timezone, **replay.booking_kwargs())
+            for i in range(bookings)
+        ]
+        elapsed = time.perf_counter() - start
+        stats = replay.stats()
+    return {
+        "booked": sum(1 for url in urls if url),
+        "elapsed_s": elapsed,
+        "outcomes": BOOKINGS.snapshot(),
+        "booking": BOOKING_SECONDS.snapshot().get(""),
+        "phases": PHASE_SECONDS.snapshot(),
+        "replay": stats,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark book_calendly_meeting against a replay cassette')
+    parser.add_argument('--cassette', help='Cassette file (default: a generated synthetic cassette)')
+    parser.add_argument('--bookings', type=int, default=20, help='Bookings to run')
+    parser.add_argument('--latency', default='', help='Injected latency, e.g. "http=0.05,llm=0.8,browser=0.2"')
+    parser.add_argument('--timezone', default='America/Los_Angeles', help='IANA timezone')
+
+    args = parser.parse_args()
+
+    cassette_path = args.cassette
+    if cassette_path is None:
+        cassette_path = os.path.join(tempfile.mkdtemp(), "synthetic.json")
+        synthetic_cassette(CALENDLY_URL, args.timezone, runs=args.bookings).save(cassette_path)
+
+    result = run(cassette_path, args.bookings, parse_latency(args.latency), args.timezone)
+
+    print(f"{result['booked']}/{args.bookings} booked in {result['elapsed_s']:.2f}s "
+          f"(outcomes {result['outcomes']}, replay {result['replay']})")
+    booking = result["booking"]
+    print(f"{'booking':>14}: mean {booking['mean'] * 1000:8.2f} ms over {booking['count']} calls")
+    for phase, summary in sorted(result["phases"].items(), key=lambda item: -item[1]["sum"]):
+        print(f"{phase:>14}: mean {summary['mean'] * 1000:8.2f} ms, total {summary['sum']:.3f}s")
@@ -0,0 +1,109 @@
+"""
+Benchmark slot collisions for concurrent bookings of one host
+
+N workers book the same host at once from the same availability snapshot,
+the way concurrent book_calendly_meeting calls do. Each worker pre-ranks the
+snapshot, asks the (offline, fake) LLM for a slot and submits it to a
+simulated Calendly host that accepts only the first submission per slot.
+Runs once without reservations and once through the reservation table,
+and reports the collision rate and the submission time wasted on
+collisions. Run from the repository root:
+
+    python -m benchmarks.bench_slot_reservations --workers 20
+    python -m benchmarks.bench_slot_reservations --workers 20 --backend sqlite
+"""
+
+import os
+import time
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.calendar_utils import generate_mock_calendar, find_matching_times, select_candidates, format_matches
+from utils.calendly_api import get_suggested_time, reserve_suggested_time
+from utils.llm_providers import FakeChatModel
+from utils.slot_reservations import SlotReservations, SQLiteSlotReservations, new_owner_id, slot_id
+
+EVENT_UUID = "bench-event"
+
+
+class SimulatedHost:
+    """Calendly host that accepts one booking per slot after a fixed submission time."""
+
+    def __init__(self, submit_seconds: float):
+        self.submit_seconds = submit_seconds
+        self.booked = set()
+        self._lock = threading.Lock()
+
+    def submit(self, slot: str) -> bool:
+        time.sleep(self.submit_seconds)
+        key = slot_id(slot)
+        with self._lock:
+            if key in self.booked:
+                return False
+            self.booked.add(key)
+            return True
+
+
+def run_workers(matches: list, workers: int, timezone: str, host: SimulatedHost, reservations=None) -> dict:
+    """Book `workers` meetings concurrently; reservations=None reproduces the unreserved path."""
+    llm = FakeChatModel(latency="uniform", latency_median=0.05, latency_sigma=0.5, pick="first", seed=3)
+
+    def book_one(_):
+        if reservations is None:
+            candidates = select_candidates(matches, 20, timezone)
+            slot = get_suggested_time(format_matches(candidates, timezone), llm=llm)
+            return host.submit(slot)
+        owner = new_owner_id()
+        reserved = reservations.reserved_slots(EVENT_UUID, exclude_owner=owner)
+        free = [slot for slot in matches if slot_id(slot) not in reserved]
+        candidates = select_candidates(free, 20, timezone)
+        slot = reserve_suggested_time(EVENT_UUID, candidates, timezone, reservations, owner, llm=llm)
+        if slot is None:
+            return None
+        accepted = host.submit(slot)
+        if not accepted:
+            reservations.release(EVENT_UUID, slot, owner)
+        return accepted
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(pool.map(book_one, range(workers)))
+    elapsed = time.perf_counter() - start
+
+    submitted = [outcome for outcome in outcomes if outcome is not None]
+    collisions = submitted.count(False)
+    return {
+        "submitted": len(submitted),
+        "booked": submitted.count(True),
+        "collisions": collisions,
+        "collision_rate": collisions / len(submitted) if submitted else 0.0,
+        "wasted_submit_s": collisions * host.submit_seconds,
+        "wall_time_s": elapsed,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark slot collisions with and without reservations')
+    parser.add_argument('--workers', type=int, default=20, help='Concurrent bookings of the same host')
+    parser.add_argument('--submit-seconds', type=float, default=0.5, help='Simulated browser submission time')
+    parser.add_argument('--backend', choices=['memory', 'sqlite'], default='memory', help='Reservation table')
+    parser.add_argument('--timezone', default='America/Los_Angeles', help='IANA timezone')
+
+    args = parser.parse_args()
+
+    host_calendar = generate_mock_calendar(args.timezone, days=14)
+    matches = find_matching_times(host_calendar, host_calendar)
+    print(f"{len(matches)} open slots, {args.workers} concurrent bookings, {args.backend} reservations")
+
+    if args.backend == 'sqlite':
+        table = SQLiteSlotReservations(os.path.join(tempfile.mkdtemp(), "reservations.db"))
+    else:
+        table = SlotReservations()
+
+    for label, reservations in (("no reservations", None), ("reservations", table)):
+        row = run_workers(matches, args.workers, args.timezone, SimulatedHost(args.submit_seconds), reservations)
+        print(f"{label:>16}: {row['booked']:>3} booked, {row['collisions']:>3} collisions "
+              f"({row['collision_rate']:.0%}), {row['wasted_submit_s']:.1f}s of submissions wasted, "
+              f"{row['wall_time_s']:.2f}s wall")
@@ -0,0 +1,119 @@
+"""
+Benchmark loading availability snapshots from the binary store against JSON files
+
+Writes the same seeded corpus of snapshots (--hosts x --snapshots, e.g. a
+month of daily captures per host) both as one JSON file per snapshot, the
+way results/ keeps them, and into a SnapshotStore. Then times:
+
+    open        parsing every JSON file vs indexing the store's block headers
+    host range  the available spots of one host in a 5-day window across all
+                of its snapshots (JSON must still parse every file)
+    full scan   every available spot of every snapshot
+
+and checks both paths return the same spots. Run from the repository root:
+
+    python -m benchmarks.bench_snapshot_store --hosts 50 --snapshots 30 --days 30
+"""
+
+import os
+import json
+import time
+import argparse
+import tempfile
+from datetime import date, datetime, timedelta
+
+from utils.calendar_utils import generate_calendar_corpus, iter_available_spots
+from utils.snapshot_store import SnapshotStore
+from utils.timezone_utils import localize
+
+TIMEZONE = "America/Los_Angeles"
+START = date(2025, 3, 3)
+
+
+def write_corpus(directory: str, hosts: int, snapshots: int, days: int, seed: int) -> tuple:
+    """Write the corpus as JSON files and as a store; return (json paths by host, store path)."""
+    calendars = generate_calendar_corpus(hosts * snapshots, TIMEZONE, days=days, busy_rate=(0.3, 0.9),
+                                         seed=seed, start=START)
+    store_path = os.path.join(directory, "availability.snap")
+    files = {}
+    with SnapshotStore(store_path) as store:
+        for index, calendar in enumerate(calendars):
+            host = f"host-{index % hosts:04d}"
+            path = os.path.join(directory, f"{host}_{index // hosts:03d}.json")
+            with open(path, "w") as handle:
+                json.dump(calendar, handle)
+            files.setdefault(host, []).append(path)
+            store.append(host, calendar, captured_at=index // hosts * 86400.0)
+    return files, store_path
+
+
+def json_spots(calendar: dict, low: int = None, high: int = None) -> list:
+    """Available spots of a parsed calendar as epoch seconds in [low, high)."""
+    return [
+        seconds for seconds in (int(slot.timestamp()) for slot in iter_available_spots(calendar))
+        if (low is None or seconds >= low) and (high is None or seconds < high)
+    ]
+
+
+def timed(function):
+    """Call function once; return (elapsed seconds, result)."""
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def run(files: dict, store_path: str, host: str, window: tuple) -> dict:
+    """Time open, host range query and full scan on both formats; window is a (first day, end day) pair."""
+    low, high = (int(localize(datetime(day.year, day.month, day.day), TIMEZONE).timestamp()) for day in window)
+
+    def json_open():
+        calendars = {}
+        for name, paths in files.items():
+            for path in paths:
+                with open(path) as handle:
+                    calendars.setdefault(name, []).append(json.load(handle))
+        return calendars
+
+    json_open_s, calendars = timed(json_open)
+    json_range_s, json_range = timed(lambda: [json_spots(calendar, low, high) for calendar in json_open()[host]])
+    json_scan_s, json_scan = timed(lambda: sum(len(json_spots(calendar)) for cals in calendars.values()
+                                                for calendar in cals))
+
+    store_open_s, store = timed(lambda: SnapshotStore(store_path))
+    store_range_s, store_range = timed(lambda: [spots for _, spots in SnapshotStore(store_path).query(
+        host, start=window[0], end=window[1])])
+    store_scan_s, store_scan = timed(lambda: sum(len(spots) for name in store.hosts()
+                                                 for _, spots in store.query(name)))
+    store.close()
+
+    json_bytes = sum(os.path.getsize(path) for paths in files.values() for path in paths)
+    return {
+        "json": {"bytes": json_bytes, "open_s": json_open_s, "range_s": json_range_s,
+                 "scan_s": json_open_s + json_scan_s},
+        "store": {"bytes": os.path.getsize(store_path), "open_s": store_open_s, "range_s": store_range_s,
+                  "scan_s": store_open_s + store_scan_s},
+        "consistent": json_range == store_range and json_scan == store_scan,
+        "spots": store_scan,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark snapshot store load time against JSON files')
+    parser.add_argument('--hosts', type=int, default=50, help='Hosts (event types)')
+    parser.add_argument('--snapshots', type=int, default=30, help='Snapshots per host')
+    parser.add_argument('--days', type=int, default=30, help='Horizon of each snapshot in days')
+    parser.add_argument('--seed', type=int, default=1, help='Corpus seed')
+
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        files, store_path = write_corpus(directory, args.hosts, args.snapshots, args.days, args.seed)
+        window = (START + timedelta(days=7), START + timedelta(days=12))
+        result = run(files, store_path, "host-0000", window)
+
+    print(f"{args.hosts * args.snapshots} snapshots, {result['spots']:,} available spots, "
+          f"results {'match' if result['consistent'] else 'DIFFER'}")
+    for name in ("json", "store"):
+        entry = result[name]
+        print(f"{name:>6}: {entry['bytes'] / 1e6:7.1f} MB  open {entry['open_s'] * 1000:9.1f} ms  "
+              f"host range {entry['range_s'] * 1000:9.1f} ms  full scan {entry['scan_s'] * 1000:9.1f} ms")
@@ -0,0 +1,81 @@
+"""
+Benchmark bulk UTC -> local slot conversion
+
+Compares per-slot pytz (when installed) with the zoneinfo conversion in
+utils.timezone_utils.utc_to_local, and checks both give the same wall-clock
+times and offsets. Run from the repository root:
+
+    python -m benchmarks.bench_timezone --slots 100000
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from utils.timezone_utils import UTC, DEFAULT_TIMEZONE, utc_to_local
+
+try:
+    import pytz
+except ImportError:
+    pytz = None
+
+
+def build_slots(num_slots: int, start: datetime = None, step_minutes: int = 30) -> list:
+    """Build num_slots consecutive UTC slots, spanning DST transitions for long runs."""
+    start = start or datetime(2025, 1, 1, tzinfo=UTC)
+    step = timedelta(minutes=step_minutes)
+    return [start + i * step for i in range(num_slots)]
+
+
+def run_benchmark(num_slots: int, timezone: str, repeat: int = 3) -> dict:
+    """
+    Time per-slot pytz and zoneinfo conversion of num_slots UTC slots.
+
+    Returns:
+        dict: Best-of-repeat timings in seconds for each strategy
+    """
+    slots = build_slots(num_slots)
+
+    pytz_best = float("inf") if pytz else None
+    zoneinfo_best = float("inf")
+    for _ in range(repeat):
+        if pytz:
+            pytz_zone = pytz.timezone(timezone)
+            start = time.perf_counter()
+            reference = [pytz_zone.normalize(slot.astimezone(pytz_zone)) for slot in slots]
+            pytz_best = min(pytz_best, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        converted = [utc_to_local(slot, timezone) for slot in slots]
+        zoneinfo_best = min(zoneinfo_best, time.perf_counter() - start)
+
+    # Both strategies must agree on wall-clock time and offset
+    if pytz:
+        for expected, actual in zip(reference, converted):
+            if expected.isoformat() != actual.isoformat():
+                raise AssertionError(f"Conversion mismatch: {expected.isoformat()} != {actual.isoformat()}")
+
+    return {
+        "slots": num_slots,
+        "timezone": timezone,
+        "per_slot_pytz_s": pytz_best,
+        "per_slot_zoneinfo_s": zoneinfo_best,
+        "speedup_vs_pytz": pytz_best / zoneinfo_best if pytz_best and zoneinfo_best else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark bulk timezone conversion of slots')
+    parser.add_argument('--slots', type=int, default=100_000, help='Number of slots to convert')
+    parser.add_argument('--timezone', default=DEFAULT_TIMEZONE, help='Target IANA timezone')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetitions (best is reported)')
+
+    args = parser.parse_args()
+
+    result = run_benchmark(args.slots, args.timezone, args.repeat)
+    print(f"Converted {result['slots']} slots to {result['timezone']}")
+    if result['per_slot_pytz_s'] is not None:
+        print(f"  per-slot pytz:     {result['per_slot_pytz_s'] * 1000:.1f} ms")
+    print(f"  per-slot zoneinfo: {result['per_slot_zoneinfo_s'] * 1000:.1f} ms")
+    if result['speedup_vs_pytz'] is not None:
+        print(f"  vs pytz:           {result['speedup_vs_pytz']:.2f}x")
@@ -0,0 +1,204 @@
+"""
+Local CalDAV stand-in for calendar sync runs
+
+Serves one calendar collection at /calendar/. REPORT answers the WebDAV
+sync-collection request (RFC 6578): with an empty token it lists every
+event resource, with a token only the resources changed or deleted since,
+and a token older than the change log answers 403 valid-sync-token. With
+max_results a REPORT lists at most that many changes, oldest first, and
+marks the response truncated (507 number-of-matches-within-limits) with a
+token for the part it returned. GET
+returns the whole collection as one ICS feed with an ETag, for comparing
+against full downloads. Events are added, changed and removed in-process:
+
+    with LocalCalDAVServer() as stub:
+        stub.put("standup", event_ics("standup", start, end, rrule="FREQ=WEEKLY;BYDAY=MO,WE"))
+        source = CalDAVSource(stub.url)
+        stub.delete("standup")
+"""
+
+import re
+import threading
+from datetime import datetime, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+COLLECTION = "/calendar/"
+TOKEN_PREFIX = "http://calendlyai.local/sync/"
+TOKEN_PATTERN = re.compile(r"<[^>]*sync-token>([^<]*)</")
+
+
+def event_ics(uid: str, start: datetime, end: datetime, rrule: str = None, transparent: bool = False,
+              recurrence_id: datetime = None, exdates=()) -> str:
+    """A VCALENDAR holding one VEVENT with UTC times."""
+    def stamp(value: datetime) -> str:
+        return value.astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//calendlyai//caldav-stub//EN", "BEGIN:VEVENT",
+             f"UID:{uid}", f"DTSTAMP:{stamp(start)}", f"DTSTART:{stamp(start)}", f"DTEND:{stamp(end)}"]
+    if rrule:
+        lines.append(f"RRULE:{rrule}")
+    if exdates:
+        lines.append("EXDATE:" + ",".join(stamp(value) for value in exdates))
+    if recurrence_id is not None:
+        lines.append(f"RECURRENCE-ID:{stamp(recurrence_id)}")
+    if transparent:
+        lines.append("TRANSP:TRANSPARENT")
+    lines += ["END:VEVENT", "END:VCALENDAR"]
+    return "\r\n".join(lines) + "\r\n"
+
+
+class LocalCalDAVServer:
+    """Threaded local CalDAV collection with a change log for sync-collection deltas."""
+
+    def __init__(self, max_log: int = 10000, max_results: int = None):
+        """
+        Args:
+            max_log: Changes kept in the log; older tokens are rejected as invalid
+            max_results: Changes listed per REPORT before the response is truncated (None for no limit)
+        """
+        self.max_log = max_log
+        self.max_results = max_results
+        self.counts = {"report": 0, "get": 0, "not_modified": 0, "invalid_token": 0, "bytes": 0}
+        self._resources = {}
+        self._log = []
+        self._revision = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}{COLLECTION}"
+
+    def _href(self, name: str) -> str:
+        return f"{COLLECTION}{name}.ics"
+
+    def _record(self, href: str) -> None:
+        self._revision += 1
+        self._log.append((self._revision, href))
+        del self._log[:-self.max_log]
+
+    def put(self, name: str, ics: str) -> None:
+        """Create or replace the event resource name."""
+        with self._lock:
+            href = self._href(name)
+            self._resources[href] = (f'"{self._revision + 1}"', ics)
+            self._record(href)
+
+    def delete(self, name: str) -> None:
+        """Remove the event resource name."""
+        with self._lock:
+            href = self._href(name)
+            if self._resources.pop(href, None) is not None:
+                self._record(href)
+
+    def _token(self) -> str:
+        return f"{TOKEN_PREFIX}{self._revision}"
+
+    def _sync_report(self, token: str):
+        """Return (status, body) of a sync-collection REPORT."""
+        with self._lock:
+            if not token:
+                revisions = {href: int(etag.strip('"')) for href, (etag, _) in self._resources.items()}
+            else:
+                revision = int(token[len(TOKEN_PREFIX):]) if token.startswith(TOKEN_PREFIX) else -1
+                oldest = self._log[0][0] - 1 if self._log else self._revision
+                if revision < oldest or revision > self._revision:
+                    self.counts["invalid_token"] += 1
+                    return 403, ('<?xml version="1.0" encoding="utf-8"?>'
+                                 '<d:error xmlns:d="DAV:"><d:valid-sync-token/></d:error>')
+                revisions = {href: entry_revision for entry_revision, href in self._log if entry_revision > revision}
+            changed = sorted(revisions, key=revisions.get)
+            token = self._token()
+            truncated = self.max_results is not None and len(changed) > self.max_results
+            if truncated:
+                changed = changed[:self.max_results]
+                token = f"{TOKEN_PREFIX}{revisions[changed[-1]]}"
+            parts = ['<?xml version="1.0" encoding="utf-8"?>'
+                     '<d:multistatus xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:caldav">']
+            for href in changed:
+                if href in self._resources:
+                    etag, ics = self._resources[href]
+                    parts.append(f"<d:response><d:href>{href}</d:href><d:propstat><d:prop>"
+                                 f"<d:getetag>{escape(etag)}</d:getetag>"
+                                 f"<c:calendar-data>{escape(ics)}</c:calendar-data>"
+                                 f"</d:prop><d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>")
+                else:
+                    parts.append(f"<d:response><d:href>{href}</d:href>"
+                                 f"<d:status>HTTP/1.1 404 Not Found</d:status></d:response>")
+            if truncated:
+                parts.append(f"<d:response><d:href>{COLLECTION}</d:href>"
+                             f"<d:status>HTTP/1.1 507 Insufficient Storage</d:status>"
+                             f"<d:error><d:number-of-matches-within-limits/></d:error></d:response>")
+            parts.append(f"<d:sync-token>{token}</d:sync-token></d:multistatus>")
+            return 207, "".join(parts)
+
+    def _feed(self):
+        """Return (etag, body) of the whole collection as one ICS feed."""
+        with self._lock:
+            events = []
+            for _, ics in self._resources.values():
+                inner = ics.split("BEGIN:VEVENT", 1)[1].rsplit("END:VEVENT", 1)[0]
+                events.append(f"BEGIN:VEVENT{inner}END:VEVENT\r\n")
+            body = ("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//calendlyai//caldav-stub//EN\r\n"
+                    + "".join(events) + "END:VCALENDAR\r\n")
+            return f'"{self._revision}"', body
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, status: int, body: str, content_type: str, headers: dict = None):
+                payload = body.encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+                with stub._lock:
+                    stub.counts["bytes"] += len(payload)
+
+            def do_REPORT(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+                match = TOKEN_PATTERN.search(body)
+                with stub._lock:
+                    stub.counts["report"] += 1
+                status, payload = stub._sync_report(match.group(1).strip() if match else "")
+                self._send(status, payload, "application/xml; charset=utf-8")
+
+            def do_GET(self):
+                etag, payload = stub._feed()
+                if self.headers.get("If-None-Match") == etag:
+                    with stub._lock:
+                        stub.counts["not_modified"] += 1
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                with stub._lock:
+                    stub.counts["get"] += 1
+                self._send(200, payload, "text/calendar; charset=utf-8", {"ETag": etag})
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "LocalCalDAVServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="caldav-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
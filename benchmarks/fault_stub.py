@@ -0,0 +1,113 @@
+"""
+Local fault-injecting HTTP stub for rate limiter and circuit breaker runs
+
+Serves any GET with a small JSON body, but enforces its own token-bucket
+rate limit (429 with Retry-After when exceeded), can inject random 5xx
+errors, and can be switched into an outage where every request gets a 503.
+Start it in-process:
+
+    with FaultInjectingServer(rate=20, burst=5) as stub:
+        requests.get(stub.url + "/api/booking/event_types/lookup")
+        stub.set_outage(True)
+"""
+
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FaultInjectingServer:
+    """Threaded local HTTP server with server-side rate limiting and fault injection."""
+
+    def __init__(self, rate: float = 20.0, burst: int = 5, retry_after: float = 0.5, error_rate: float = 0.0,
+                 latency: float = 0.0, seed: int = 0):
+        """
+        Args:
+            rate: Requests per second the stub accepts before answering 429
+            burst: Bucket capacity of the stub's own limiter
+            retry_after: Seconds sent in the Retry-After header of 429 responses
+            error_rate: Probability of answering 500 to an accepted request
+            latency: Seconds added to every response
+            seed: Seed for error injection
+        """
+        self.rate = rate
+        self.burst = burst
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.latency = latency
+        self.outage = False
+        self.counts = {"ok": 0, "throttled": 0, "errors": 0, "outage": 0}
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def set_outage(self, outage: bool) -> None:
+        """Answer every request with 503 while outage is True."""
+        self.outage = outage
+
+    def _decide(self) -> int:
+        """Return the status for the next request and count it."""
+        with self._lock:
+            if self.outage:
+                self.counts["outage"] += 1
+                return 503
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                self.counts["throttled"] += 1
+                return 429
+            self._tokens -= 1
+            if self._rng.random() < self.error_rate:
+                self.counts["errors"] += 1
+                return 500
+            self.counts["ok"] += 1
+            return 200
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if stub.latency:
+                    time.sleep(stub.latency)
+                status = stub._decide()
+                body = json.dumps({"status": status, "path": self.path}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if status in (429, 503):
+                    self.send_header("Retry-After", str(stub.retry_after))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FaultInjectingServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fault-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,93 @@
+"""
+Model of the waiting removed by condition waits per booking
+
+This is a model, not a measurement: each former fixed sleep on the booking
+paths is replayed against a condition that becomes true after a delay drawn
+from the assumed ranges in WAIT_SITES, and the fixed sleep is compared with
+utils.waits.wait_until / backoff_delays on a simulated clock. Its output is
+only as good as those assumed delays; it shows how the polling and backoff
+schedules behave, not how long real pages take. Run from the repository root:
+
+    python -m benchmarks.model_waits --bookings 1000
+"""
+
+import argparse
+import random
+
+from utils.waits import backoff_delays, wait_until
+
+# (site, fixed sleep it replaced in seconds, assumed (min, max) seconds until the condition holds)
+WAIT_SITES = [
+    ("playwright cookie dialog", 0.5, (0.02, 0.2)),
+    ("playwright post-submit", 3.0, (0.0, 0.4)),
+    ("selenium post-submit", 3.0, (0.0, 0.4)),
+]
+TYPING_PAUSE = 0.5          # former 1% chance per character
+TYPED_CHARACTERS = 80       # name + email + phone + notes
+RETRY_SLEEP = 5.0           # former fixed delay in book_with_retry
+RETRY_PROBABILITY = 0.2     # share of bookings that need one retry
+
+
+class SimulatedClock:
+    """Monotonic clock advanced by sleep() instead of real time."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def simulate_booking(rng: random.Random) -> dict:
+    """Return fixed-sleep and condition-wait seconds spent by one booking per site."""
+    result = {}
+    for site, fixed, (low, high) in WAIT_SITES:
+        ready_at = rng.uniform(low, high)
+        clock = SimulatedClock()
+        wait_until(lambda: clock() >= ready_at, timeout=fixed, initial_interval=0.02,
+                   sleep=clock.sleep, clock=clock)
+        result[site] = (fixed, clock())
+
+    pauses = sum(1 for _ in range(TYPED_CHARACTERS) if rng.random() < 0.01)
+    result["playwright typing pauses"] = (pauses * TYPING_PAUSE, 0.0)
+
+    if rng.random() < RETRY_PROBABILITY:
+        result["webscrape retry"] = (RETRY_SLEEP, next(backoff_delays(base=1.0, rng=rng)))
+    else:
+        result["webscrape retry"] = (0.0, 0.0)
+    return result
+
+
+def run_model(bookings: int, seed: int = 0) -> dict:
+    """Modelled average fixed versus condition wait time per booking, per site."""
+    rng = random.Random(seed)
+    totals = {}
+    for _ in range(bookings):
+        for site, (fixed, waited) in simulate_booking(rng).items():
+            fixed_total, waited_total = totals.get(site, (0.0, 0.0))
+            totals[site] = (fixed_total + fixed, waited_total + waited)
+    return {site: (fixed / bookings, waited / bookings) for site, (fixed, waited) in totals.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Model fixed sleeps versus condition waits per booking')
+    parser.add_argument('--bookings', type=int, default=1000, help='Simulated bookings')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+
+    args = parser.parse_args()
+
+    averages = run_model(args.bookings, args.seed)
+    print("Modelled on a simulated clock with assumed page delays; not measured")
+    print(f"{'site':<28} {'fixed':>8} {'condition':>10} {'removed':>8}")
+    for site, (fixed, waited) in averages.items():
+        print(f"{site:<28} {fixed:>7.3f}s {waited:>9.3f}s {fixed - waited:>7.3f}s")
+
+    # A booking runs exactly one path, so totals are reported per path
+    print()
+    for path in ("playwright", "selenium", "webscrape"):
+        fixed = sum(value[0] for site, value in averages.items() if site.startswith(path))
+        waited = sum(value[1] for site, value in averages.items() if site.startswith(path))
+        print(f"{path + ' booking':<28} {fixed:>7.3f}s {waited:>9.3f}s {fixed - waited:>7.3f}s")
@@ -0,0 +1,332 @@
+"""
+Benchmark suite for the calendar, API client and form-fill hot paths
+
+Runs a fixed set of micro-benchmarks, writes the results as JSON and can
+compare them against a saved run to fail on regressions:
+
+    calendar.*  generate_mock_calendar, generate_calendar_corpus,
+                find_matching_times and format_matches
+                at several horizons (days) and availability densities
+    api.*       create_booking_url, plus setup_calendly_api and
+                get_calendly_availability against the local replay server
+    browser.*   CalendlyScraper filling the booking form on a local fixture
+                page in headless Chrome (skipped when Chrome is unavailable)
+
+Each case is calibrated to run for roughly --min-time seconds per round;
+the median per-call time of --rounds rounds is what gets compared. Run from
+the repository root:
+
+    python -m benchmarks.suite                                   # saves results/benchmarks/<time>_<commit>.json
+    python -m benchmarks.suite --filter calendar --save baseline.json
+    python -m benchmarks.suite --compare baseline.json --threshold 0.2
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import threading
+from datetime import date, datetime, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# The API cases measure the client, not the adaptive limiter in front of it
+os.environ.setdefault("CALENDLYAI_RATE_CALENDLY", "1000000")
+
+from utils.calendar_utils import (  # noqa: E402
+    find_matching_times, format_matches, generate_calendar_corpus, generate_mock_calendar
+)
+from utils.calendly_api import create_booking_url, get_calendly_availability, setup_calendly_api  # noqa: E402
+from utils.replay import ReplaySession, synthetic_cassette  # noqa: E402
+
+TIMEZONE = "America/Los_Angeles"
+CALENDLY_URL = "https://calendly.com/robertjandali/30min"
+HORIZONS = (7, 30, 90)
+DENSITIES = (0.2, 0.5, 0.9)
+DEFAULT_THRESHOLD = 0.2
+CALENDAR_START = date(2025, 3, 3)
+
+FIXTURE_PAGE = """<!doctype html>
+<html><body>
+<form onsubmit="event.preventDefault(); document.getElementById('done').style.display = 'block';">
+  <label>Name <input name="full_name" id="full_name"></label>
+  <label>Email <input name="email" id="email" type="email"></label>
+  <label>Phone <input name="phone_number" id="phone_number" type="tel"></label>
+  <label>Additional notes <textarea name="message" id="message"></textarea></label>
+  <button type="submit">Schedule Event</button>
+</form>
+<div id="done" class="confirmation" style="display: none">You are scheduled - confirmed</div>
+</body></html>
+"""
+
+
+class SkipCase(Exception):
+    """Raised by a case's setup when it cannot run here (e.g. no Chrome)."""
+
+
+def density_calendar(days: int, density: float, seed: int, start: date = CALENDAR_START) -> dict:
+    """Seeded Calendly-format calendar whose weekday 9-17h spots are each available with probability density."""
+    return generate_mock_calendar(TIMEZONE, days=days, busy_rate=1 - density, seed=seed, start=start)
+
+
+def calendar_cases():
+    """Yield (name, setup) pairs; setup() returns the function to time."""
+    for days in HORIZONS:
+        yield f"calendar.generate_mock_calendar[days={days}]", lambda days=days: (
+            lambda: generate_mock_calendar(TIMEZONE, days=days, seed=1, start=CALENDAR_START))
+    yield "calendar.generate_calendar_corpus[count=100,days=30]", lambda: (
+        lambda: generate_calendar_corpus(100, TIMEZONE, days=30, busy_rate=(0.5, 0.9), seed=1, start=CALENDAR_START))
+    for days in HORIZONS:
+        for density in DENSITIES:
+            def setup(days=days, density=density):
+                host, invitee = density_calendar(days, density, 1), density_calendar(days, density, 2)
+                return lambda: find_matching_times(host, invitee)
+            yield f"calendar.find_matching_times[days={days},density={density}]", setup
+    for days in HORIZONS:
+        def setup(days=days):
+            matches = find_matching_times(density_calendar(days, 0.9, 1), density_calendar(days, 0.9, 2))
+            return lambda: format_matches(matches, TIMEZONE)
+        yield f"calendar.format_matches[days={days}]", setup
+
+
+def api_cases(replay_session):
+    """API client cases; the replay session serves the Calendly endpoints locally."""
+    yield "api.create_booking_url", lambda: (
+        lambda: create_booking_url(CALENDLY_URL, "2025-03-04T10:30:00-08:00", TIMEZONE))
+
+    def needs_replay():
+        if replay_session is None:
+            raise SkipCase("replay server not started")
+
+    def lookup():
+        needs_replay()
+        return lambda: setup_calendly_api(CALENDLY_URL)
+
+    def availability():
+        needs_replay()
+        uuid = setup_calendly_api(CALENDLY_URL)
+        return lambda: get_calendly_availability(uuid, TIMEZONE)
+
+    yield "api.setup_calendly_api[local]", lookup
+    yield "api.get_calendly_availability[local]", availability
+
+
+class FixtureServer:
+    """Serves FIXTURE_PAGE on a local port."""
+
+    def __init__(self):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = FIXTURE_PAGE.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="fixture-server", daemon=True).start()
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/booking"
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class BrowserFixture:
+    """One headless Chrome and fixture server shared by the browser cases, started on first use."""
+
+    def __init__(self):
+        self.driver = None
+        self.server = None
+        self.error = None
+
+    def start(self):
+        if self.driver is None and self.error is None:
+            try:
+                from browser.driver_pool import launch_chrome_driver
+                self.server = FixtureServer()
+                self.driver = launch_chrome_driver(headless=True)
+            except Exception as e:
+                self.error = f"local Chrome unavailable: {type(e).__name__}: {e}"
+        if self.error:
+            raise SkipCase(self.error)
+        return self
+
+    def close(self) -> None:
+        if self.driver is not None:
+            self.driver.quit()
+        if self.server is not None:
+            self.server.stop()
+
+
+def browser_cases(fixture: BrowserFixture):
+    """Form-fill cases through CalendlyScraper, driving local Chrome instead of Browserbase."""
+
+    def scraper():
+        from browser.browserbase_handler import CalendlyScraper
+        fixture.start()
+        instance = CalendlyScraper()
+        instance.driver = fixture.driver
+        instance.navigate_to_url(fixture.server.url)
+        return instance
+
+    def fill_form():
+        instance = scraper()
+
+        def run():
+            instance.fill_name("Bench User")
+            instance.fill_email("bench@example.com")
+            instance.fill_phone("5109198404")
+            instance.fill_additional_info("Benchmark booking")
+        return run
+
+    def fill_and_submit():
+        instance = scraper()
+
+        def run():
+            instance.navigate_to_url(fixture.server.url)
+            instance.fill_name("Bench User")
+            instance.fill_email("bench@example.com")
+            instance.fill_phone("5109198404")
+            instance.submit_form()
+        return run
+
+    yield "browser.fill_form[fixture]", fill_form
+    yield "browser.fill_and_submit[fixture]", fill_and_submit
+
+
+def measure(fn, rounds: int, min_time: float) -> dict:
+    """Time fn, calling it `number` times per round so each round lasts about min_time seconds."""
+    fn()  # warm-up
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "mean_s": statistics.fmean(samples),
+        "stdev_s": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "rounds": rounds,
+        "number": number,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suite(name_filter: str = None, rounds: int = 5, min_time: float = 0.1) -> dict:
+    """Run every case whose name contains name_filter and return the results document."""
+    scratch = tempfile.TemporaryDirectory(prefix="calendlyai-suite-")
+    replay_path = os.path.join(scratch.name, "cassette.json")
+    synthetic_cassette(CALENDLY_URL, TIMEZONE).save(replay_path)
+    replay_session = ReplaySession(replay_path).start()
+    fixture = BrowserFixture()
+
+    results = {}
+    try:
+        cases = [*calendar_cases(), *api_cases(replay_session), *browser_cases(fixture)]
+        for name, setup in cases:
+            if name_filter and name_filter not in name:
+                continue
+            try:
+                fn = setup()
+            except SkipCase as e:
+                results[name] = {"skipped": str(e)}
+                print(f"{name:<58} skipped ({e})")
+                continue
+            results[name] = measure(fn, rounds, min_time)
+            print(f"{name:<58} {results[name]['median_s'] * 1e6:>12.1f} us")
+    finally:
+        fixture.close()
+        replay_session.stop()
+        scratch.cleanup()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(dt_timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "rounds": rounds,
+            "min_time_s": min_time,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """
+    Print current vs baseline medians and return the names of cases slower by more than threshold.
+    """
+    regressions = []
+    print(f"\nCompared with {baseline['meta']['commit']} ({baseline['meta']['timestamp']}), threshold {threshold:.0%}:")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if "median_s" not in result or not before or "median_s" not in before:
+            continue
+        ratio = result["median_s"] / before["median_s"]
+        regressed = ratio > 1 + threshold
+        if regressed:
+            regressions.append(name)
+        marker = "REGRESSION" if regressed else ("faster" if ratio < 1 - threshold else "")
+        print(f"{name:<58} {ratio:>7.2f}x {marker}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run the benchmark suite and compare against a baseline')
+    parser.add_argument('--filter', help='Only run cases whose name contains this text')
+    parser.add_argument('--rounds', type=int, default=5, help='Timed rounds per case')
+    parser.add_argument('--min-time', type=float, default=0.1, help='Target seconds per round')
+    parser.add_argument('--save', help='Results file (default: results/benchmarks/<time>_<commit>.json)')
+    parser.add_argument('--compare', help='Baseline results file to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='Allowed slowdown of the median before a case counts as a regression')
+
+    args = parser.parse_args()
+
+    document = run_suite(args.filter, args.rounds, args.min_time)
+
+    path = args.save
+    if path is None:
+        stamp = datetime.now(dt_timezone.utc).strftime("%Y%m%d_%H%M%S")
+        path = os.path.join("results", "benchmarks", f"{stamp}_{document['meta']['commit']}.json")
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+    print(f"\nSaved {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(document, json.load(f), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            sys.exit(1)
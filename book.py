@@ -8,32 +8,106 @@ for a streamlined booking system.
 
 import logging
 import os
+import time
 from datetime import datetime
 
 # Import components from organized modules
-from utils.calendar_utils import generate_mock_calendar, find_matching_times, format_matches
-from utils.calendly_api import setup_calendly_api, get_calendly_availability, create_booking_url, get_suggested_time
+from utils.calendar_utils import (
+    generate_mock_calendar, iter_available_spots, merge_intersect, take_acceptable, select_candidates
+)
+from utils.calendly_api import (
+    setup_calendly_api, create_booking_url, find_scheduled_booking, reserve_suggested_time
+)
+from utils.availability_index import get_availability_index
+from utils.calendar_sources import invitee_calendar_from_env
+from utils.booking_ledger import FAILED, UncertainBookingError, booking_key, get_default_ledger
+from utils.slot_reservations import DEFAULT_LEASE_SECONDS, get_reservation_table, new_owner_id, slot_id
+from utils.metrics import BOOKINGS, BOOKING_SECONDS, PHASE_SECONDS
+from utils.logging_setup import (
+    configure_from_env, current_booking_id, log_context, new_booking_id
+)
 from browser.browserbase_handler import CalendlyScraper
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('calendly_integrated.log'),
-        logging.StreamHandler()
-    ]
-)
+# Logging is configured by the entry point (main(), test.py, the worker);
+# set CALENDLYAI_LOG_AUTOCONFIG=1 to configure it from the environment on import
+configure_from_env()
 
 logger = logging.getLogger(__name__)
 
+def _submit_booking(final_url: str, name: str, email: str, phone: str, additional_info: str = None,
+                    scraper_factory=None):
+    """
+    Fill and submit the booking form in a Browserbase browser
+    
+    Args:
+        scraper_factory: Callable returning a scraper (defaults to CalendlyScraper; replay passes its own)
+    
+    Returns:
+        str: The booking URL on success, None if the form was never submitted
+        
+    Raises:
+        UncertainBookingError: If the form was submitted but success could not be confirmed
+    """
+    # Create CalendlyScraper instance for form filling and submission
+    logger.info("Creating CalendlyScraper instance with Browserbase")
+    scraper = (scraper_factory or CalendlyScraper)()
+    
+    # Initialize browser
+    logger.info("Initializing Browserbase browser")
+    with PHASE_SECONDS.time(phase="browser_init"):
+        initialized = scraper.initialize_browser()
+    if not initialized:
+        logger.error("Failed to initialize Browserbase browser")
+        return None
+    
+    try:
+        with PHASE_SECONDS.time(phase="fill"):
+            # Navigate to the booking URL
+            logger.info(f"Navigating to booking URL: {final_url}")
+            scraper.navigate_to_url(final_url)
+            
+            # Fill in the form
+            logger.info("Filling out booking form")
+            scraper.fill_name(name)
+            scraper.fill_email(email)
+            scraper.fill_phone(phone)
+            
+            if additional_info:
+                scraper.fill_additional_info(additional_info)
+        
+        # Submit the form
+        logger.info("Submitting booking form")
+        with PHASE_SECONDS.time(phase="submit"):
+            submitted = scraper.submit_form()
+        if submitted:
+            return final_url
+        if scraper.submitted:
+            raise UncertainBookingError(f"Booking form submitted but not confirmed: {final_url}")
+        return None
+            
+    finally:
+        # Close the browser regardless of success or failure
+        logger.info("Closing browser")
+        scraper.close_browser()
+
 def book_calendly_meeting(
     calendly_url: str,
     name: str,
     email: str,
     phone: str,
     additional_info: str = None,
-    timezone: str = "America/Los_Angeles"
+    timezone: str = "America/Los_Angeles",
+    max_candidates: int = None,
+    prompt_candidates: int = 20,
+    llm=None,
+    ledger=None,
+    reservations=None,
+    reservation_lease: float = DEFAULT_LEASE_SECONDS,
+    booking_id: str = None,
+    calendar: dict = None,
+    scraper_factory=None,
+    availability_index=None,
+    calendar_source=None
 ):
     """
     Main integrated workflow function
@@ -45,82 +119,152 @@ def book_calendly_meeting(
         phone: Phone number for the booking
         additional_info: Additional information for the booking
         timezone: Timezone to use for booking
+        max_candidates: Stop matching once this many candidate slots are found (None for all)
+        prompt_candidates: Number of pre-ranked slots passed to the LLM (None for all)
+        llm: Chat model used for slot selection (defaults to utils.llm_providers.get_chat_model())
+        ledger: BookingLedger guarding against duplicate submissions (defaults to the process-wide ledger)
+        reservations: Slot reservation table shared by concurrent bookings (defaults to get_reservation_table())
+        reservation_lease: Seconds a chosen slot stays reserved while it is submitted
+        booking_id: ID attached to every log record of this booking (defaults to the caller's
+            log context or a new ID)
+        calendar: The invitee's own availability in Calendly format (defaults to calendar_source's
+            availability, or generate_mock_calendar() without one)
+        scraper_factory: Callable returning the form-filling scraper (defaults to CalendlyScraper)
+        availability_index: AvailabilityIndex serving the host's free slots (defaults to get_availability_index())
+        calendar_source: InviteeCalendar whose real events give the invitee's availability (one delta sync)
         
     Returns:
-        str: URL of the booked appointment or None if booking failed
+        str: URL of the booked appointment, or None if booking failed or its outcome is uncertain
     """
-    logger.info("Starting integrated Calendly workflow")
+    with log_context(booking_id=booking_id or current_booking_id() or new_booking_id()):
+        logger.info("Starting integrated Calendly workflow")
+        started = time.perf_counter()
+        outcome = "error"
     
-    try:
-        # Get mock calendar data
-        logger.info("Generating mock calendar data")
-        mock_calendar = generate_mock_calendar()
-        
-        # Set up Calendly API and get availability
-        uuid = setup_calendly_api(calendly_url)
-        calendly_data = get_calendly_availability(uuid, timezone)
-        
-        # Find matching times
-        matches = find_matching_times(mock_calendar, calendly_data)
-        formatted_matches = format_matches(matches)
+        try:
+            # Get the invitee's availability from their synced calendar, or mock it
+            if calendar is None and calendar_source is not None:
+                logger.info("Syncing invitee calendar")
+                # The invitee's working hours are in their own timezone; slots compare as absolute times
+                calendar = calendar_source.availability()
+            if calendar is None:
+                logger.info("Generating mock calendar data")
+                calendar = generate_mock_calendar(timezone)
         
-        # Get suggested time from LLM
-        suggested_time = get_suggested_time(formatted_matches)
-        logger.info(f"Suggested time: {suggested_time}")
+            # Set up Calendly API and read availability from the per-host index,
+            # which only fetches when its snapshot of this host is missing or stale
+            with PHASE_SECONDS.time(phase="uuid_lookup"):
+                uuid = setup_calendly_api(calendly_url)
+            availability_index = availability_index or get_availability_index()
+            with PHASE_SECONDS.time(phase="availability"):
+                availability = availability_index.lookup(uuid, timezone)
         
-        # Create final booking URL
-        final_url = create_booking_url(calendly_url, suggested_time)
+            # Stream matching times (UTC internally, presented in the caller's timezone),
+            # skip slots other workers hold a reservation on, and stop as soon as
+            # enough candidates are collected
+            with PHASE_SECONDS.time(phase="match"):
+                reservations = reservations or get_reservation_table()
+                owner = new_owner_id()
+                reserved = reservations.reserved_slots(uuid, exclude_owner=owner)
+                matches = take_acceptable(
+                    merge_intersect(iter_available_spots(calendar), availability.iter_slots()),
+                    max_candidates,
+                    predicate=lambda slot: slot_id(slot) not in reserved
+                )
         
-        # Create CalendlyScraper instance for form filling and submission
-        logger.info("Creating CalendlyScraper instance with Browserbase")
-        scraper = CalendlyScraper()
+                # Pre-rank locally so only the top candidates reach the prompt
+                candidates = select_candidates(matches, prompt_candidates, timezone)
         
-        # Initialize browser
-        logger.info("Initializing Browserbase browser")
-        if not scraper.initialize_browser():
-            logger.error("Failed to initialize Browserbase browser")
-            return None
+            # Get suggested time from LLM and hold it under a lease while submitting
+            with PHASE_SECONDS.time(phase="llm"):
+                suggested_time = reserve_suggested_time(uuid, candidates, timezone, reservations, owner, llm=llm,
+                                                        lease_seconds=reservation_lease)
+            if suggested_time is None:
+                logger.error("No unreserved slot left to book")
+                outcome = "no_slot"
+                return None
+            logger.info(f"Suggested time: {suggested_time}")
         
-        try:
-            # Navigate to the booking URL
-            logger.info(f"Navigating to booking URL: {final_url}")
-            scraper.navigate_to_url(final_url)
+            result = None
+            key = None
+            ledger = ledger or get_default_ledger()
+            try:
+                # Create final booking URL
+                final_url = create_booking_url(calendly_url, suggested_time, timezone)
             
-            # Fill in the form
-            logger.info("Filling out booking form")
-            scraper.fill_name(name)
-            scraper.fill_email(email)
-            scraper.fill_phone(phone)
+                # Submit at most once per (event, slot, invitee); a previous attempt with an
+                # unknown outcome is reconciled against the Calendly API and availability first
+                key = booking_key(uuid, suggested_time, email)
             
-            if additional_info:
-                scraper.fill_additional_info(additional_info)
+                def submit():
+                    return _submit_booking(final_url, name, email, phone, additional_info, scraper_factory)
             
-            # Submit the form
-            logger.info("Submitting booking form")
-            success = scraper.submit_form()
+                def verify():
+                    # The host's scheduled events are the positive evidence; without API access
+                    # a slot still offered shows the earlier submission did not land, while a
+                    # slot that is gone may have been taken by anyone, so it stays uncertain
+                    found = find_scheduled_booking(uuid, suggested_time, email, timezone)
+                    if found is not None:
+                        return found
+                    host = availability_index.refresh(uuid, timezone)
+                    if not host.covers(suggested_time):
+                        return None
+                    return False if host.is_free(suggested_time) else None
             
-            if success:
-                logger.info("Booking successful")
-                return final_url
-            else:
-                logger.error("Booking failed")
-                return None
-                
-        finally:
-            # Close the browser regardless of success or failure
-            logger.info("Closing browser")
-            scraper.close_browser()
+                result = ledger.run_once(key, submit, verify)
+                if result:
+                    logger.info("Booking successful")
+                    outcome = "booked"
+                    availability_index.mark_taken(uuid, timezone, suggested_time)
+                elif _definitely_failed(ledger, key):
+                    logger.error("Booking failed")
+                    outcome = "failed"
+                else:
+                    logger.warning(f"Booking outcome uncertain for {key}; it is not resubmitted until it is "
+                                   f"reconciled (python -m utils.booking_ledger reconcile)")
+                    outcome = "uncertain"
+                return result
+            finally:
+                # A booked slot stays reserved until its lease runs out so workers holding
+                # an older availability snapshot keep skipping it; so does a slot whose
+                # submission may have landed, until the lease expires or it is reconciled
+                if not result and _definitely_failed(ledger, key):
+                    reservations.release(uuid, suggested_time, owner)
         
+        except UncertainBookingError as e:
+            logger.warning(f"Booking outcome uncertain: {e}; it is not resubmitted until it is "
+                           f"reconciled (python -m utils.booking_ledger reconcile)")
+            outcome = "uncertain"
+            return None
+        except Exception as e:
+            logger.error(f"Workflow failed: {str(e)}", exc_info=True)
+            return None
+        finally:
+            BOOKINGS.inc(outcome=outcome)
+            BOOKING_SECONDS.observe(time.perf_counter() - started)
+
+def _definitely_failed(ledger, key) -> bool:
+    """
+    Whether a booking that returned no URL provably did not land
+    
+    True when it failed before reaching the ledger or the ledger recorded it as
+    failed; False while it is uncertain or in flight (or the ledger cannot be read).
+    """
+    if key is None:
+        return True
+    try:
+        record = ledger.get(key)
     except Exception as e:
-        logger.error(f"Workflow failed: {str(e)}")
-        import traceback
-        logger.error(f"Traceback: {traceback.format_exc()}")
-        return None
+        logger.warning(f"Could not read booking {key} from the ledger: {e}")
+        return False
+    return record is None or record["state"] == FAILED
 
 def main():
     """
     Main function to run the integrated Calendly booking workflow
     """
+    configure_from_env(force=True, log_file='calendly_integrated.log')
+
     # Example usage
     calendly_url = "https://calendly.com/robertjandali/30min"
     name = "John Doe"
@@ -133,7 +277,8 @@ def main():
         name=name,
         email=email,
         phone=phone,
-        additional_info=additional_info
+        additional_info=additional_info,
+        calendar_source=invitee_calendar_from_env()
     )
     
     if result:
@@ -0,0 +1,204 @@
+"""
+Sampled, off-thread screenshot capture for booking runs
+
+Pulling a full PNG from a remote browser and writing it to disk used to
+block the booking at every debug checkpoint. ArtifactRecorder decides per
+checkpoint whether a capture is needed at all:
+
+    always      - capture every checkpoint
+    on_failure  - capture only checkpoints marked as failures (default)
+    sample:N    - capture every checkpoint of 1 in N runs, failures always
+
+Only the screenshot pull itself stays on the booking thread (WebDriver and
+Playwright handles are not thread-safe); compression and disk writes happen
+on a background writer thread, and each run is capped in bytes on disk.
+
+The policy, output directory and cap come from the constructor or from
+CALENDLYAI_ARTIFACT_POLICY, CALENDLYAI_ARTIFACT_DIR and
+CALENDLYAI_ARTIFACT_MAX_MB.
+"""
+
+import os
+import gzip
+import time
+import queue
+import logging
+import itertools
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+ALWAYS = "always"
+ON_FAILURE = "on_failure"
+SAMPLE = "sample"
+DEFAULT_POLICY = ON_FAILURE
+DEFAULT_MAX_MB = 50
+DEFAULT_ARTIFACT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "artifacts")
+
+# Shared across recorders so "1 in N" means one in N runs of this process
+_run_counter = itertools.count()
+
+
+def parse_policy(spec: str = None) -> tuple:
+    """
+    Parse a policy spec ("always", "on_failure" or "sample:N") into (policy, N).
+
+    Raises:
+        ValueError: If the spec is unknown or N is not a positive integer
+    """
+    spec = (spec or os.getenv("CALENDLYAI_ARTIFACT_POLICY") or DEFAULT_POLICY).strip().lower()
+    name, _, every = spec.partition(":")
+    if name in (ALWAYS, ON_FAILURE) and not every:
+        return name, 1
+    if name == SAMPLE:
+        try:
+            every = int(every or 10)
+        except ValueError:
+            every = 0
+        if every > 0:
+            return SAMPLE, every
+    raise ValueError(f"Unknown artifact policy: {spec} (expected always, on_failure or sample:N)")
+
+
+class ArtifactRecorder:
+    """Per-run screenshot recorder with a sampling policy and a background writer."""
+
+    def __init__(self, policy: str = None, output_dir: str = None, max_bytes: int = None,
+                 compress: bool = True, run_id: str = None):
+        """
+        Initialize the recorder (the writer thread starts on the first capture).
+
+        Args:
+            policy: "always", "on_failure" or "sample:N" (defaults to CALENDLYAI_ARTIFACT_POLICY, then on_failure)
+            output_dir: Base directory for run folders (defaults to CALENDLYAI_ARTIFACT_DIR, then ./artifacts)
+            max_bytes: Disk cap for this run (defaults to CALENDLYAI_ARTIFACT_MAX_MB, then 50 MB)
+            compress: Gzip artifacts before writing
+            run_id: Folder name for this run (defaults to a timestamp plus the run number)
+        """
+        self.policy, self.sample_every = parse_policy(policy)
+        run_number = next(_run_counter)
+        self.sampled = self.policy == ALWAYS or (self.policy == SAMPLE and run_number % self.sample_every == 0)
+        self.output_dir = output_dir or os.getenv("CALENDLYAI_ARTIFACT_DIR") or DEFAULT_ARTIFACT_DIR
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("CALENDLYAI_ARTIFACT_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.run_id = run_id or f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{run_number}"
+        self._queue = queue.Queue()
+        self._writer = None
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+        self.stats = {"captured": 0, "skipped": 0, "dropped": 0, "errors": 0,
+                      "bytes_written": 0, "capture_s": 0.0}
+
+    @property
+    def run_dir(self) -> str:
+        return os.path.join(self.output_dir, self.run_id)
+
+    def should_capture(self, failure: bool = False) -> bool:
+        """Return True when the policy wants this checkpoint captured."""
+        return failure or self.sampled
+
+    def capture(self, name: str, grab, failure: bool = False) -> bool:
+        """
+        Capture one artifact if the policy asks for it.
+
+        Args:
+            name: Artifact file name (e.g. "submission_error.png")
+            grab: Callable returning the artifact bytes (e.g. driver.get_screenshot_as_png)
+            failure: Whether this checkpoint records a failure
+
+        Returns:
+            bool: True if the artifact was queued for writing
+        """
+        if not self.should_capture(failure):
+            with self._lock:
+                self.stats["skipped"] += 1
+            return False
+
+        with self._lock:
+            over_cap = self.stats["bytes_written"] >= self.max_bytes
+        if over_cap:
+            self._drop(name)
+            return False
+
+        start = time.perf_counter()
+        try:
+            data = grab()
+        except Exception as e:
+            with self._lock:
+                self.stats["errors"] += 1
+            logger.warning(f"Error capturing artifact {name}: {e}")
+            return False
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.stats["captured"] += 1
+            self.stats["capture_s"] += elapsed
+        self._ensure_writer()
+        self._queue.put((next(self._sequence), name, data))
+        return True
+
+    def _drop(self, name: str) -> None:
+        with self._lock:
+            self.stats["dropped"] += 1
+            first = self.stats["dropped"] == 1
+        if first:
+            logger.warning(f"Artifact cap of {self.max_bytes} bytes reached for run {self.run_id}, dropping {name}")
+
+    def _ensure_writer(self) -> None:
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="artifact-writer", daemon=True)
+                self._writer.start()
+
+    def _write_loop(self) -> None:
+        """Compress and write queued artifacts until a None sentinel arrives."""
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, sequence: int, name: str, data: bytes) -> None:
+        payload = gzip.compress(data, compresslevel=6) if self.compress else data
+        with self._lock:
+            if self.stats["bytes_written"] + len(payload) > self.max_bytes:
+                over_cap = True
+            else:
+                over_cap = False
+                self.stats["bytes_written"] += len(payload)
+        if over_cap:
+            self._drop(name)
+            return
+
+        filename = f"{sequence:03d}_{name}" + (".gz" if self.compress else "")
+        path = os.path.join(self.run_dir, filename)
+        try:
+            os.makedirs(self.run_dir, exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(payload)
+            logger.debug(f"Artifact saved to {path}")
+        except Exception as e:
+            with self._lock:
+                self.stats["errors"] += 1
+            logger.warning(f"Error writing artifact {path}: {e}")
+
+    def flush(self) -> None:
+        """Block until every queued artifact has been written."""
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        """Flush pending artifacts and stop the writer thread."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+        if self.stats["captured"]:
+            logger.info(f"Artifacts for run {self.run_id}: {self.stats}")
@@ -1,41 +1,77 @@
 """
 Browser automation utilities using Browserbase
+
+selenium, the Browserbase SDK and .env are loaded when a scraper is first
+created, so importing this module (and book.py) does not pay for them.
 """
 
 import os
 import logging
-import traceback
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.remote.remote_connection import RemoteConnection
-from browserbase import Browserbase
-import dotenv
+import threading
+from functools import lru_cache
+
+from utils.env import load_env
+from utils.metrics import BROWSER_POOL
+from utils.rate_limit import get_upstream
 
-dotenv.load_dotenv()
+# selenium.webdriver.common.by.XPATH, kept as a literal so lookups don't import selenium
+XPATH = "xpath"
 
 
 logger = logging.getLogger(__name__)
 
-class BrowserbaseConnection(RemoteConnection):
-    """Manage a single session with Browserbase."""
+# Scrapers holding a live Browserbase session, so shutdown can release them
+_open_scrapers = set()
+_open_scrapers_lock = threading.Lock()
+
+def open_session_count():
+    """Return the number of Browserbase sessions currently held by scrapers."""
+    with _open_scrapers_lock:
+        return len(_open_scrapers)
+
+BROWSER_POOL.set_function(lambda: {("browserbase", "open"): open_session_count()})
+
+def release_open_sessions():
+    """
+    Close every scraper that still holds a Browserbase session.
+
+    Returns:
+        int: Number of sessions released
+    """
+    with _open_scrapers_lock:
+        scrapers = list(_open_scrapers)
+    for scraper in scrapers:
+        scraper.close_browser()
+    if scrapers:
+        logger.warning(f"Released {len(scrapers)} open Browserbase session(s)")
+    return len(scrapers)
+
+@lru_cache(maxsize=1)
+def browserbase_connection_class():
+    """Build the RemoteConnection subclass for Browserbase on first use (imports selenium)."""
+    from selenium.webdriver.remote.remote_connection import RemoteConnection
 
-    def __init__(self, session_id, *args, **kwargs):
-        self.session_id = session_id
-        super().__init__(*args, **kwargs)
+    class BrowserbaseConnection(RemoteConnection):
+        """Manage a single session with Browserbase."""
 
-    def get_remote_connection_headers(self, parsed_url, keep_alive=False):
-        headers = super().get_remote_connection_headers(parsed_url, keep_alive)
-        headers.update({
-            "x-bb-api-key": os.getenv('BROWSERBASE_API_KEY'),
-            "session-id": self.session_id,
-        })
-        return headers
+        def __init__(self, session_id, *args, **kwargs):
+            self.session_id = session_id
+            super().__init__(*args, **kwargs)
+
+        def get_remote_connection_headers(self, parsed_url, keep_alive=False):
+            headers = super().get_remote_connection_headers(parsed_url, keep_alive)
+            headers.update({
+                "x-bb-api-key": os.getenv('BROWSERBASE_API_KEY'),
+                "session-id": self.session_id,
+            })
+            return headers
+
+    return BrowserbaseConnection
 
 class CalendlyScraper:
     """Class to handle Calendly form filling and submission with Browserbase."""
     
-    def __init__(self, browserbase_api_key=os.getenv('BROWSERBASE_API_KEY'), 
-                 browserbase_project_id=os.getenv('BROWSERBASE_PROJECT_ID')):
+    def __init__(self, browserbase_api_key=None, browserbase_project_id=None):
         """
         Initialize the Calendly scraper with Browserbase.
         
@@ -43,24 +79,32 @@ class CalendlyScraper:
             browserbase_api_key: API key for Browserbase (defaults to environment variable)
             browserbase_project_id: Project ID for Browserbase (defaults to environment variable)
         """
-        self.browserbase_api_key = browserbase_api_key
-        self.browserbase_project_id = browserbase_project_id
+        load_env()
+        self.browserbase_api_key = browserbase_api_key or os.getenv('BROWSERBASE_API_KEY')
+        self.browserbase_project_id = browserbase_project_id or os.getenv('BROWSERBASE_PROJECT_ID')
         self.driver = None
         self.bb_session = None
+        self.submitted = False  # set once the submit button was clicked
     
     def initialize_browser(self):
         """Initialize the browser using Browserbase."""
         try:
             logger.info("Setting up Browserbase WebDriver")
+            from browserbase import Browserbase
+            from selenium import webdriver
             
             # Initialize Browserbase client
             bb = Browserbase(api_key=self.browserbase_api_key)
             
             # Create a new browser session with default settings
-            self.bb_session = bb.sessions.create(project_id=self.browserbase_project_id)
+            self.bb_session = get_upstream("browserbase").call(
+                bb.sessions.create, project_id=self.browserbase_project_id
+            )
+            with _open_scrapers_lock:
+                _open_scrapers.add(self)
             
             # Use the updated remote connection approach
-            custom_conn = BrowserbaseConnection(
+            custom_conn = browserbase_connection_class()(
                 self.bb_session.id, 
                 self.bb_session.selenium_remote_url
             )
@@ -71,8 +115,8 @@ class CalendlyScraper:
             return True
             
         except Exception as e:
-            logger.error(f"Error setting up Browserbase: {e}")
-            logger.error(traceback.format_exc())
+            logger.error(f"Error setting up Browserbase: {e}", exc_info=True)
+            self.close_browser()
             return False
     
     def navigate_to_url(self, url):
@@ -99,7 +143,7 @@ class CalendlyScraper:
             for selector in selectors:
                 try:
                     # Try to find and fill without explicit wait
-                    name_field = self.driver.find_element(By.XPATH, selector)
+                    name_field = self.driver.find_element(XPATH, selector)
                     name_field.clear()
                     name_field.send_keys(name)
                     logger.info("Name filled successfully")
@@ -129,7 +173,7 @@ class CalendlyScraper:
             for selector in selectors:
                 try:
                     # Try to find and fill without explicit wait
-                    email_field = self.driver.find_element(By.XPATH, selector)
+                    email_field = self.driver.find_element(XPATH, selector)
                     email_field.clear()
                     email_field.send_keys(email)
                     logger.info("Email filled successfully")
@@ -167,7 +211,7 @@ class CalendlyScraper:
             for selector in selectors:
                 try:
                     # Try to find and fill without explicit wait
-                    phone_field = self.driver.find_element(By.XPATH, selector)
+                    phone_field = self.driver.find_element(XPATH, selector)
                     phone_field.clear()
                     phone_field.send_keys(phone)
                     logger.info("Phone filled successfully")
@@ -197,7 +241,7 @@ class CalendlyScraper:
             for selector in selectors:
                 try:
                     # Try to find and fill without explicit wait
-                    info_field = self.driver.find_element(By.XPATH, selector)
+                    info_field = self.driver.find_element(XPATH, selector)
                     info_field.clear()
                     info_field.send_keys(additional_info)
                     logger.info("Additional info filled successfully")
@@ -228,10 +272,11 @@ class CalendlyScraper:
             for selector in selectors:
                 try:
                     # Try to find and click without explicit wait
-                    submit_button = self.driver.find_element(By.XPATH, selector)
+                    submit_button = self.driver.find_element(XPATH, selector)
                     if submit_button.is_displayed() and submit_button.is_enabled():
                         logger.info(f"Found submit button with selector: {selector}")
                         submit_button.click()
+                        self.submitted = True
                         logger.info("Form submitted")
                         break
                 except:
@@ -251,7 +296,7 @@ class CalendlyScraper:
             
             for selector in confirmation_selectors:
                 try:
-                    confirmed = self.driver.find_element(By.XPATH, selector)
+                    confirmed = self.driver.find_element(XPATH, selector)
                     if confirmed.is_displayed():
                         logger.info("Confirmation page detected")
                         return True
@@ -268,12 +313,27 @@ class CalendlyScraper:
     
     def close_browser(self):
         """Close the browser and release resources."""
+        session_released = False
         if self.driver:
             try:
                 self.driver.quit()
+                session_released = True
                 logger.info("Browser closed")
             except Exception as e:
                 logger.error(f"Error closing browser: {str(e)}")
+            self.driver = None
         
-        # Browserbase session is automatically closed when the driver quits
-        self.bb_session = None 
\ No newline at end of file
+        # Browserbase session is automatically closed when the driver quits;
+        # otherwise ask Browserbase to release it so it does not linger
+        if self.bb_session and not session_released:
+            try:
+                from browserbase import Browserbase
+                Browserbase(api_key=self.browserbase_api_key).sessions.update(
+                    self.bb_session.id, status="REQUEST_RELEASE", project_id=self.browserbase_project_id
+                )
+                logger.info(f"Requested release of Browserbase session {self.bb_session.id}")
+            except Exception as e:
+                logger.error(f"Error releasing Browserbase session: {str(e)}")
+        self.bb_session = None
+        with _open_scrapers_lock:
+            _open_scrapers.discard(self)
@@ -0,0 +1,370 @@
+"""
+Pool of pre-launched local Chrome WebDrivers
+
+Resolving chromedriver through webdriver-manager can hit the network and
+disk, and launching Chrome plus the anti-detection setup costs several
+round trips. The pool resolves the driver binary once per process,
+pre-launches headless instances with the setup already applied, and leases
+them to bookings. Leased drivers are health-checked and crashed instances
+are replaced in the background. Each lease gets a fresh random User-Agent,
+as an unpooled driver launched per booking would, and a released driver
+has its cookies and site storage cleared before the next booking.
+"""
+
+import os
+import queue
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+from utils.metrics import BROWSER_POOL
+
+logger = logging.getLogger(__name__)
+
+WINDOW_SIZE = (1366, 768)
+# Origins whose storage is cleared on release besides the page the booking ended on
+BOOKING_ORIGINS = ("https://calendly.com",)
+
+STEALTH_SCRIPTS = [
+    "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})",
+    """
+    // Overwrite the 'navigator.languages' property
+    Object.defineProperty(navigator, 'languages', {
+        get: () => ['en-US', 'en', 'es'],
+    });
+
+    // Overwrite the 'plugins' property
+    Object.defineProperty(navigator, 'plugins', {
+        get: () => [1, 2, 3, 4, 5],
+    });
+    """,
+]
+
+
+@lru_cache(maxsize=1)
+def resolve_chromedriver_path() -> str:
+    """
+    Resolve the chromedriver binary once per process.
+
+    CHROMEDRIVER_PATH wins when set; otherwise webdriver-manager is asked once
+    and the result is reused for every later launch.
+    """
+    driver_path = os.getenv("CHROMEDRIVER_PATH")
+    if driver_path:
+        return driver_path
+    from webdriver_manager.chrome import ChromeDriverManager
+    driver_path = ChromeDriverManager().install()
+    logger.info(f"Resolved chromedriver at {driver_path}")
+    return driver_path
+
+
+@lru_cache(maxsize=1)
+def _user_agents():
+    from fake_useragent import UserAgent
+    return UserAgent()
+
+
+def random_user_agent() -> str:
+    """Return a random real-browser User-Agent string, rotated per booking."""
+    return _user_agents().random
+
+
+def build_chrome_options(headless: bool = True, proxy: str = None, user_agent: str = None) -> Options:
+    """
+    Build Chrome options with the anti-detection flags used for bookings.
+
+    Args:
+        headless: Whether to run Chrome in headless mode
+        proxy: Optional proxy server to use
+        user_agent: Optional User-Agent override
+
+    Returns:
+        Options: Configured Chrome options
+    """
+    options = Options()
+    if user_agent:
+        options.add_argument(f'user-agent={user_agent}')
+    if headless:
+        options.add_argument('--headless=new')  # Using the new headless mode
+    if proxy:
+        options.add_argument(f'--proxy-server={proxy}')
+
+    # Additional options to avoid detection
+    options.add_argument('--disable-blink-features=AutomationControlled')
+    options.add_argument('--disable-extensions')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-infobars')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-browser-side-navigation')
+    options.add_argument('--disable-gpu')
+    options.add_experimental_option('excludeSwitches', ['enable-automation'])
+    options.add_experimental_option('useAutomationExtension', False)
+    return options
+
+
+def apply_driver_setup(driver) -> None:
+    """Apply window size, automation-masking scripts and network settings to a fresh driver."""
+    driver.set_window_size(*WINDOW_SIZE)
+    for script in STEALTH_SCRIPTS:
+        driver.execute_script(script)
+
+    # Set up cookies to appear more like a returning user
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setCacheDisabled', {'cacheDisabled': False})
+
+
+def launch_chrome_driver(headless: bool = True, proxy: str = None, user_agent: str = None):
+    """Launch a local Chrome WebDriver with the booking setup applied."""
+    driver = webdriver.Chrome(
+        service=Service(resolve_chromedriver_path()),
+        options=build_chrome_options(headless, proxy, user_agent)
+    )
+    apply_driver_setup(driver)
+    return driver
+
+
+def is_driver_alive(driver) -> bool:
+    """Return True when the driver process and its browser still respond."""
+    try:
+        process = getattr(getattr(driver, "service", None), "process", None)
+        if process is not None and process.poll() is not None:
+            return False
+        driver.execute_script("return 1")
+        return True
+    except Exception:
+        return False
+
+
+class ChromeDriverPool:
+    """Process-level pool of pre-launched, pre-configured Chrome WebDrivers."""
+
+    def __init__(self, size: int = 2, headless: bool = True, proxy: str = None, user_agent: str = None,
+                 launcher=None):
+        """
+        Initialize the pool (call start() to pre-launch browsers).
+
+        Args:
+            size: Number of Chrome instances kept warm
+            headless: Whether to run Chrome in headless mode
+            proxy: Optional proxy server for every instance
+            user_agent: Optional User-Agent for every instance (defaults to a random one per lease)
+            launcher: Optional callable returning a ready driver (defaults to launch_chrome_driver)
+        """
+        self.size = size
+        self.rotate_user_agent = user_agent is None
+        self._resolve_driver = launcher is None
+        self.launcher = launcher or (lambda: launch_chrome_driver(headless, proxy, user_agent))
+        self._idle = queue.Queue()
+        self._leased = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {"launches": 0, "respawns": 0, "leases": 0, "launch_failures": 0}
+
+    def start(self, wait: bool = True) -> "ChromeDriverPool":
+        """
+        Resolve chromedriver and pre-launch every instance in parallel.
+
+        Args:
+            wait: Block until all instances are launched
+        """
+        if self._resolve_driver:
+            try:
+                resolve_chromedriver_path()
+            except Exception as e:
+                logger.warning(f"Could not pre-resolve chromedriver: {e}")
+        threads = [self._spawn_async() for _ in range(self.size)]
+        if wait:
+            for thread in threads:
+                thread.join()
+        logger.info(f"Chrome driver pool started with {self._idle.qsize()}/{self.size} instances")
+        return self
+
+    def _spawn(self) -> None:
+        """Launch one driver and add it to the idle queue."""
+        try:
+            driver = self.launcher()
+        except Exception as e:
+            with self._lock:
+                self.stats["launch_failures"] += 1
+            logger.error(f"Error launching pooled Chrome driver: {e}")
+            return
+        with self._lock:
+            self.stats["launches"] += 1
+            closed = self._closed
+        if closed:
+            self._quit(driver)
+        else:
+            self._idle.put(driver)
+
+    def _spawn_async(self) -> threading.Thread:
+        """Launch one driver on a background thread."""
+        thread = threading.Thread(target=self._spawn, name="chrome-pool-spawn", daemon=True)
+        thread.start()
+        return thread
+
+    def _respawn(self, driver) -> None:
+        """Discard a broken driver and replace it in the background."""
+        with self._lock:
+            self.stats["respawns"] += 1
+        self._quit(driver)
+        if not self._closed:
+            self._spawn_async()
+
+    @staticmethod
+    def _quit(driver) -> None:
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.debug(f"Error quitting pooled driver: {e}")
+
+    def lease(self, timeout: float = 60):
+        """
+        Lease a healthy driver, replacing crashed instances on the way.
+
+        Args:
+            timeout: Maximum seconds to wait for a driver
+
+        Returns:
+            A ready WebDriver
+
+        Raises:
+            TimeoutError: If no healthy driver becomes available in time
+        """
+        if self._closed:
+            raise RuntimeError("Chrome driver pool is closed")
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"No pooled Chrome driver available within {timeout}s")
+            try:
+                driver = self._idle.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            if is_driver_alive(driver):
+                if self.rotate_user_agent:
+                    self._set_user_agent(driver)
+                with self._lock:
+                    self._leased.add(driver)
+                    self.stats["leases"] += 1
+                return driver
+            logger.warning("Pooled Chrome driver crashed, respawning")
+            self._respawn(driver)
+
+    @staticmethod
+    def _set_user_agent(driver) -> None:
+        """Give a leased driver a fresh random User-Agent for its booking."""
+        try:
+            user_agent = random_user_agent()
+            driver.execute_cdp_cmd("Network.setUserAgentOverride", {"userAgent": user_agent})
+            logger.info(f"Using User-Agent: {user_agent}")
+        except Exception as e:
+            logger.warning(f"Could not rotate the pooled driver's User-Agent: {e}")
+
+    @staticmethod
+    def _reset(driver) -> None:
+        """Leave the page and clear cookies and site storage left by the last booking."""
+        origin = driver.execute_script("return window.location.origin")
+        driver.get("about:blank")
+        origins = set(BOOKING_ORIGINS)
+        if origin and origin.startswith("http"):
+            origins.add(origin)
+        for value in origins:
+            driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": value, "storageTypes": "all"})
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+
+    def release(self, driver, discard: bool = False) -> None:
+        """
+        Return a leased driver, resetting its state for the next booking.
+
+        The driver navigates to about:blank and its cookies and the storage of
+        the booking's origins are cleared over CDP; a driver that cannot be
+        reset is replaced.
+
+        Args:
+            driver: Driver obtained from lease()
+            discard: Replace the driver instead of reusing it
+        """
+        with self._lock:
+            self._leased.discard(driver)
+        if self._closed:
+            self._quit(driver)
+            return
+        if not discard:
+            try:
+                self._reset(driver)
+            except Exception as e:
+                logger.warning(f"Error resetting pooled driver, respawning: {e}")
+                discard = True
+        if discard:
+            self._respawn(driver)
+        else:
+            self._idle.put(driver)
+
+    @contextmanager
+    def leased(self, timeout: float = 60):
+        """Context manager leasing a driver and returning it afterwards."""
+        driver = self.lease(timeout)
+        try:
+            yield driver
+        except Exception:
+            self.release(driver, discard=not is_driver_alive(driver))
+            raise
+        else:
+            self.release(driver)
+
+    def utilization(self) -> dict:
+        """Return pool size, idle and leased counts."""
+        with self._lock:
+            leased = len(self._leased)
+        return {"size": self.size, "idle": self._idle.qsize(), "leased": leased}
+
+    def close(self) -> None:
+        """Quit every idle and leased driver."""
+        self._closed = True
+        while True:
+            try:
+                self._quit(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        with self._lock:
+            leased = list(self._leased)
+            self._leased.clear()
+        for driver in leased:
+            self._quit(driver)
+        logger.info("Chrome driver pool closed")
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_default_pool(size: int = None, **kwargs) -> ChromeDriverPool:
+    """
+    Return the process-wide pool, starting it on first use.
+
+    The size defaults to CHROME_POOL_SIZE (or 2).
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            size = size or int(os.getenv("CHROME_POOL_SIZE", "2"))
+            _default_pool = ChromeDriverPool(size=size, **kwargs).start()
+        return _default_pool
+
+
+def _default_pool_gauge() -> dict:
+    """Report the process-wide pool's utilization to the metrics registry."""
+    pool = _default_pool
+    if pool is None:
+        return {}
+    return {("chrome", state): count for state, count in pool.utilization().items()}
+
+
+BROWSER_POOL.set_function(_default_pool_gauge)
@@ -0,0 +1,92 @@
+"""
+Typing strategies and per-field fill timing for booking forms
+
+Filling a field one keystroke at a time costs one remote round trip per
+character over a remote WebDriver. The scrapers pick one of:
+
+    per_char  - the original human-like, one keystroke at a time typing
+    bulk      - a single send_keys()/fill() call with the whole value
+    js        - set the value through the native setter in one script call
+                and dispatch synthetic input/change events for React forms
+
+The strategy comes from the scraper argument or CALENDLYAI_TYPING_STRATEGY.
+Every fill is timed per field so the gain shows up in booking latency.
+"""
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+PER_CHAR = "per_char"
+BULK = "bulk"
+JS = "js"
+TYPING_STRATEGIES = (PER_CHAR, BULK, JS)
+DEFAULT_TYPING_STRATEGY = BULK
+
+# Uses the prototype's native value setter so React's value tracker sees the change
+SET_VALUE_SCRIPT = """
+const element = arguments[0];
+const value = arguments[1];
+const prototype = element.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+Object.getOwnPropertyDescriptor(prototype, 'value').set.call(element, value);
+element.dispatchEvent(new Event('input', { bubbles: true }));
+element.dispatchEvent(new Event('change', { bubbles: true }));
+return element.value;
+"""
+
+# Same setter for Playwright's element.evaluate(fn, arg)
+SET_VALUE_FUNCTION = """(element, value) => {
+    const prototype = element.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+    Object.getOwnPropertyDescriptor(prototype, 'value').set.call(element, value);
+    element.dispatchEvent(new Event('input', { bubbles: true }));
+    element.dispatchEvent(new Event('change', { bubbles: true }));
+    return element.value;
+}"""
+
+_stats_lock = threading.Lock()
+_field_stats = {}
+
+
+def resolve_typing_strategy(strategy: str = None) -> str:
+    """
+    Resolve the typing strategy from the argument, CALENDLYAI_TYPING_STRATEGY or the default.
+
+    Raises:
+        ValueError: If the strategy is unknown
+    """
+    strategy = (strategy or os.getenv("CALENDLYAI_TYPING_STRATEGY") or DEFAULT_TYPING_STRATEGY).lower()
+    if strategy not in TYPING_STRATEGIES:
+        raise ValueError(f"Unknown typing strategy: {strategy} (expected one of {', '.join(TYPING_STRATEGIES)})")
+    return strategy
+
+
+@contextmanager
+def timed_field_fill(field: str, strategy: str, characters: int = 0):
+    """Time one field fill and record it under (field, strategy)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _stats_lock:
+            entry = _field_stats.setdefault((field, strategy), {"count": 0, "total_s": 0.0, "characters": 0})
+            entry["count"] += 1
+            entry["total_s"] += elapsed
+            entry["characters"] += characters
+        logger.info(f"Filled '{field}' ({characters} chars) with {strategy} typing in {elapsed:.3f}s")
+
+
+def field_fill_stats() -> dict:
+    """Return per-(field, strategy) fill counts, total seconds and characters typed."""
+    with _stats_lock:
+        return {f"{field}:{strategy}": dict(entry) for (field, strategy), entry in _field_stats.items()}
+
+
+def reset_field_fill_stats() -> None:
+    """Clear recorded field fill timings."""
+    with _stats_lock:
+        _field_stats.clear()
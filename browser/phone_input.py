@@ -0,0 +1,230 @@
+"""
+Phone-field fill engine for the booking forms
+
+The interactive path opens the country dropdown, searches, scrolls and clicks
+the calling code, one remote call per step. This module parses the number
+once into E.164 and sets the country and the number through the widget's
+underlying inputs in a single script call, then verifies the result. The
+scrapers fall back to the interactive path only when verification fails.
+
+Fast-path hits, fallbacks and the time spent on each path are recorded in
+phone_fill_stats(), including an estimate of the time saved by the fast path.
+"""
+
+import re
+import logging
+import threading
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COUNTRY_CODE = "1"
+
+# Calling code -> ISO region for the countries the booking forms see most;
+# unknown codes still normalize, they just carry no region hint.
+CALLING_CODE_REGIONS = {
+    "1": "US",
+    "7": "RU",
+    "20": "EG",
+    "27": "ZA",
+    "30": "GR",
+    "31": "NL",
+    "32": "BE",
+    "33": "FR",
+    "34": "ES",
+    "39": "IT",
+    "41": "CH",
+    "44": "GB",
+    "46": "SE",
+    "47": "NO",
+    "48": "PL",
+    "49": "DE",
+    "52": "MX",
+    "55": "BR",
+    "61": "AU",
+    "64": "NZ",
+    "65": "SG",
+    "81": "JP",
+    "82": "KR",
+    "86": "CN",
+    "91": "IN",
+    "353": "IE",
+    "351": "PT",
+    "358": "FI",
+    "852": "HK",
+    "971": "AE",
+    "972": "IL",
+}
+
+PhoneNumber = namedtuple("PhoneNumber", ["country_code", "national", "e164", "region"])
+
+
+def normalize_phone(number: str, default_country_code: str = DEFAULT_COUNTRY_CODE) -> PhoneNumber:
+    """
+    Parse a phone number once into its calling code, national digits and E.164 form.
+
+    Numbers without a leading "+" (or "00") are treated as national numbers
+    of default_country_code; a North American number written with its
+    leading 1 is recognised as such.
+
+    Args:
+        number: Phone number as entered (spaces, dashes, dots and parentheses allowed)
+        default_country_code: Calling code assumed for national numbers
+
+    Returns:
+        PhoneNumber: country_code ("+1"), national digits, E.164 string and ISO region (or None)
+
+    Raises:
+        ValueError: If the number has too few or too many digits
+    """
+    raw = (number or "").strip()
+    international = raw.startswith("+") or raw.startswith("00")
+    digits = re.sub(r"\D", "", raw)
+    if raw.startswith("00"):
+        digits = digits[2:]
+
+    if international:
+        code = next((digits[:length] for length in (1, 2, 3) if digits[:length] in CALLING_CODE_REGIONS), None)
+        if code is None:
+            # Unknown code: assume the longest prefix that leaves a plausible national number
+            code = digits[:3] if len(digits) > 10 else digits[:1]
+        national = digits[len(code):]
+    else:
+        code = default_country_code
+        national = digits
+        if code == "1" and len(national) == 11 and national.startswith("1"):
+            national = national[1:]
+
+    if not 4 <= len(national) <= 14 or len(code) + len(national) > 15:
+        raise ValueError(f"Invalid phone number: {number!r}")
+    return PhoneNumber(f"+{code}", national, f"+{code}{national}", CALLING_CODE_REGIONS.get(code))
+
+
+# Sets the country (hidden <select> or data attribute on the widget) and the
+# number through the native value setter, dispatches React-visible events
+# and returns what the widget holds afterwards for verification: the number
+# input, the selected country, the dial code it shows and its hidden E.164 value.
+PHONE_FILL_FUNCTION = """(phone) => {
+    const input = document.querySelector(
+        "input[type='tel'], input[name*='phone' i], input[id*='phone' i], input[placeholder*='phone' i]");
+    if (!input) {
+        return {ok: false, reason: 'no phone input'};
+    }
+    const fire = (element) => {
+        element.dispatchEvent(new Event('input', {bubbles: true}));
+        element.dispatchEvent(new Event('change', {bubbles: true}));
+    };
+    const container = input.closest("[class*='phone' i]") || input.parentElement;
+    let countrySet = false;
+    const select = container ? container.querySelector('select') : null;
+    if (select && phone.region) {
+        const option = Array.from(select.options).find(
+            (o) => o.value.toUpperCase() === phone.region || o.value === phone.country_code);
+        if (option) {
+            Object.getOwnPropertyDescriptor(HTMLSelectElement.prototype, 'value').set.call(select, option.value);
+            fire(select);
+            countrySet = true;
+        }
+    }
+    // Without a country control the widget parses the international form itself
+    const value = countrySet ? phone.national : phone.e164;
+    Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set.call(input, value);
+    fire(input);
+    input.dispatchEvent(new Event('blur', {bubbles: true}));
+    const selected = select && select.selectedIndex >= 0 ? select.options[select.selectedIndex] : null;
+    const dial = container ? container.querySelector(
+        "[data-dial-code], [class*='dial' i], [class*='calling-code' i], [class*='country-code' i]") : null;
+    const hidden = container ? container.querySelector("input[type='hidden']") : null;
+    return {
+        ok: true,
+        value: input.value,
+        countrySet: countrySet,
+        country: selected ? selected.value : null,
+        dialCode: dial ? (dial.getAttribute('data-dial-code') || dial.textContent)
+                       : (selected ? selected.textContent : null),
+        hiddenValue: hidden ? hidden.value : null,
+    };
+}"""
+
+# Selenium wrapper around the same function (arguments[0] is the phone dict)
+PHONE_FILL_SCRIPT = f"return ({PHONE_FILL_FUNCTION})(arguments[0]);"
+
+
+def phone_payload(phone: PhoneNumber) -> dict:
+    """Return the argument passed to PHONE_FILL_FUNCTION / PHONE_FILL_SCRIPT."""
+    return phone._asdict()
+
+
+def verify_phone_fill(result, phone: PhoneNumber) -> bool:
+    """
+    Check the script result: the input must hold the national digits and the
+    widget must have phone.country_code selected.
+
+    The country is read back from the widget's hidden E.164 value, the dial
+    code it shows, an international value in the input itself or the selected
+    region, in that order; a fill whose country cannot be read back fails, so
+    the interactive path picks the country instead. Widgets reformat values
+    ("(510) 919-8404"), so only the digits are compared.
+    """
+    if not isinstance(result, dict) or not result.get("ok"):
+        return False
+    value = (result.get("value") or "").strip()
+    digits = re.sub(r"\D", "", value)
+    if not digits.endswith(phone.national):
+        return False
+
+    hidden = re.sub(r"\D", "", result.get("hiddenValue") or "")
+    if hidden:
+        return f"+{hidden}" == phone.e164
+    dial_code = re.search(r"\+\s*(\d{1,3})", result.get("dialCode") or "")
+    if dial_code:
+        return f"+{dial_code.group(1)}" == phone.country_code
+    if value.startswith("+"):
+        return f"+{digits}" == phone.e164
+    country = (result.get("country") or "").strip()
+    if country and phone.region:
+        return country.upper() == phone.region or country == phone.country_code
+    return False
+
+
+_stats_lock = threading.Lock()
+_stats = {"fast_hits": 0, "fallbacks": 0, "fast_s": 0.0, "fallback_s": 0.0}
+
+
+def record_phone_fill(fast_path: bool, elapsed: float) -> None:
+    """Record one phone fill completed via the fast path or the interactive fallback."""
+    with _stats_lock:
+        if fast_path:
+            _stats["fast_hits"] += 1
+            _stats["fast_s"] += elapsed
+        else:
+            _stats["fallbacks"] += 1
+            _stats["fallback_s"] += elapsed
+
+
+def phone_fill_stats() -> dict:
+    """
+    Return fast-path hit rate, average time per path and estimated time saved.
+
+    Time saved assumes every fast-path hit would otherwise have cost the
+    average measured fallback time; it is None until both paths were seen.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    total = stats["fast_hits"] + stats["fallbacks"]
+    fast_avg = stats["fast_s"] / stats["fast_hits"] if stats["fast_hits"] else None
+    fallback_avg = stats["fallback_s"] / stats["fallbacks"] if stats["fallbacks"] else None
+    stats["hit_rate"] = stats["fast_hits"] / total if total else None
+    stats["fast_avg_s"] = fast_avg
+    stats["fallback_avg_s"] = fallback_avg
+    stats["time_saved_s"] = (
+        stats["fast_hits"] * (fallback_avg - fast_avg)
+        if fast_avg is not None and fallback_avg is not None else None
+    )
+    return stats
+
+
+def reset_phone_fill_stats() -> None:
+    """Clear recorded phone fill statistics."""
+    with _stats_lock:
+        _stats.update({"fast_hits": 0, "fallbacks": 0, "fast_s": 0.0, "fallback_s": 0.0})
@@ -1,16 +1,37 @@
-from langchain.prompts import ChatPromptTemplate
-
 def scheduling_prompt():
+    # Imported on first use: langchain takes a large share of book.py's cold start
+    from langchain.prompts import ChatPromptTemplate
+
     template = """
     You are a scheduling assistant. Please analyze the following available meeting times and suggest the best option.
 
     Overlapping Available Times:
     {overlapping_availability}
 
-    Based on the available times, please suggest the best meeting time. Choose a time that is during business hours (09:00:00-07:00 to 17:00:00-07:00 in ISO 8601 format) if possible, and preferably not too early or too late in the day.
+    Based on the available times, please suggest the best meeting time. Choose a time that is during business hours (09:00 to 17:00 in the local time of the listed ISO 8601 offsets) if possible, and preferably not too early or too late in the day. Return the time exactly as listed, including its UTC offset.
 
     {format_instructions}
     """
     
     return ChatPromptTemplate.from_template(template)
 
+
+
+def batch_scheduling_prompt():
+    from langchain.prompts import ChatPromptTemplate
+
+    template = """
+    You are a scheduling assistant booking several meetings onto the same calendar. Please analyze the following available meeting times and assign one time to each booking request.
+
+    Overlapping Available Times:
+    {overlapping_availability}
+
+    Booking Requests:
+    {booking_requests}
+
+    Assign every booking request a different time from the list above, honouring each request's preferences where possible. Prefer times during business hours (09:00 to 17:00 in the local time of the listed ISO 8601 offsets), and preferably not too early or too late in the day. Never assign the same time twice. Return each time exactly as listed, including its UTC offset.
+
+    {format_instructions}
+    """
+    
+    return ChatPromptTemplate.from_template(template)
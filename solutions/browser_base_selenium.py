@@ -6,8 +6,8 @@ This script automates filling out Calendly booking forms, handling reCAPTCHA cha
 using 2Captcha service, and automatically closes when the booking is confirmed.
 """
 
-import time
 import random
+import time
 import argparse
 import logging
 import sys
@@ -16,7 +16,6 @@ import re
 from typing import Dict, Any, Optional, List, Tuple
 
 from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
@@ -24,8 +23,15 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException,
 from selenium.webdriver.common.action_chains import ActionChains
 from browserbase import Browserbase
 from selenium.webdriver.remote.remote_connection import RemoteConnection
-from webdriver_manager.chrome import ChromeDriverManager
+from browser.driver_pool import (
+    ChromeDriverPool, build_chrome_options, apply_driver_setup, random_user_agent, resolve_chromedriver_path
+)
+from browser.artifacts import ArtifactRecorder
+from browser.form_fill import BULK, JS, TYPING_STRATEGIES, SET_VALUE_SCRIPT, resolve_typing_strategy, timed_field_fill
+from browser.phone_input import PHONE_FILL_SCRIPT, normalize_phone, phone_payload, record_phone_fill, verify_phone_fill
 from selenium.webdriver.chrome.service import Service
+from utils.rate_limit import get_upstream
+from utils.waits import wait_until
 
 # Configure logging
 logging.basicConfig(
@@ -58,7 +64,9 @@ class CalendlyScraper:
     """Class to handle Calendly form filling and submission with Browserbase integration."""
     
     def __init__(self, headless: bool = False, proxy: Optional[str] = None, captcha_api_key: Optional[str] = None,
-                 browserbase_api_key: Optional[str] = None, browserbase_project_id: Optional[str] = None):
+                 browserbase_api_key: Optional[str] = None, browserbase_project_id: Optional[str] = None,
+                 driver_pool: Optional[ChromeDriverPool] = None, typing_strategy: Optional[str] = None,
+                 artifacts: Optional[ArtifactRecorder] = None):
         """
         Initialize the Calendly scraper.
         
@@ -68,6 +76,9 @@ class CalendlyScraper:
             captcha_api_key: API key for 2Captcha service
             browserbase_api_key: API key for Browserbase
             browserbase_project_id: Project ID for Browserbase
+            driver_pool: Optional pool of pre-launched local Chrome drivers to lease from
+            typing_strategy: "per_char", "bulk" or "js" (defaults to CALENDLYAI_TYPING_STRATEGY, then bulk)
+            artifacts: Screenshot recorder for this run (defaults to the on-failure policy)
         """
         self.headless = headless
         self.proxy = proxy
@@ -77,6 +88,10 @@ class CalendlyScraper:
         self.driver = None
         self.wait_time = 10  # Default wait time in seconds
         self.bb_session = None
+        self.driver_pool = driver_pool
+        self._pooled_driver = False
+        self.typing_strategy = resolve_typing_strategy(typing_strategy)
+        self.artifacts = artifacts or ArtifactRecorder()
         
         # Initialize 2Captcha solver if API key is provided and we're not using Browserbase
         self.solver = None
@@ -92,7 +107,9 @@ class CalendlyScraper:
                 bb = Browserbase(api_key=self.browserbase_api_key)
                 
                 # Create a new browser session with advanced settings
-                self.bb_session = bb.sessions.create(project_id=self.browserbase_project_id)
+                self.bb_session = get_upstream("browserbase").call(
+                    bb.sessions.create, project_id=self.browserbase_project_id
+                )
                 
                 # Use the updated remote connection approach
                 custom_conn = BrowserbaseConnection(
@@ -113,62 +130,25 @@ class CalendlyScraper:
     
     def _setup_standard_driver(self) -> None:
         """Set up a standard Chrome WebDriver with anti-detection measures."""
-        options = Options()
+        # Lease a pre-launched, already configured driver when a pool is available
+        if self.driver_pool:
+            self.driver = self.driver_pool.lease()
+            self._pooled_driver = True
+            logger.info("Leased Chrome WebDriver from pool")
+            return
         
-        # Rotate user agent to avoid detection
-        ua = UserAgent()
-        user_agent = ua.random
+        # Rotate user agent to avoid detection (pooled drivers are rotated per lease)
+        user_agent = random_user_agent()
         logger.info(f"Using User-Agent: {user_agent}")
-        options.add_argument(f'user-agent={user_agent}')
-        
-        if self.headless:
-            options.add_argument('--headless=new')  # Using the new headless mode
         
-        # Add proxy if specified
-        if self.proxy:
-            options.add_argument(f'--proxy-server={self.proxy}')
-        
-        # Additional options to avoid detection
-        options.add_argument('--disable-blink-features=AutomationControlled')
-        options.add_argument('--disable-extensions')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-infobars')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--disable-browser-side-navigation')
-        options.add_argument('--disable-gpu')
-        options.add_experimental_option('excludeSwitches', ['enable-automation'])
-        options.add_experimental_option('useAutomationExtension', False)
-        
-        # Create and configure the WebDriver
+        # Create and configure the WebDriver (chromedriver is resolved once per process)
         self.driver = webdriver.Chrome(
-            service=Service(ChromeDriverManager().install()),
-            options=options
-        )
-        
-        # Set window size to a common resolution
-        self.driver.set_window_size(1366, 768)
-        
-        # Execute JavaScript to hide automation indicators
-        self.driver.execute_script(
-            "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+            service=Service(resolve_chromedriver_path()),
+            options=build_chrome_options(self.headless, self.proxy, user_agent)
         )
         
-        # Add additional JavaScript to mask automation
-        self.driver.execute_script("""
-            // Overwrite the 'navigator.languages' property
-            Object.defineProperty(navigator, 'languages', {
-                get: () => ['en-US', 'en', 'es'],
-            });
-            
-            // Overwrite the 'plugins' property
-            Object.defineProperty(navigator, 'plugins', {
-                get: () => [1, 2, 3, 4, 5],
-            });
-        """)
-        
-        # Set up cookies to appear more like a returning user
-        self.driver.execute_cdp_cmd('Network.enable', {})
-        self.driver.execute_cdp_cmd('Network.setCacheDisabled', {'cacheDisabled': False})
+        # Window size, automation-masking scripts and network settings
+        apply_driver_setup(self.driver)
         
     def navigate_to_url(self, url: str) -> bool:
         """
@@ -200,7 +180,7 @@ class CalendlyScraper:
             return True
         except Exception as e:
             logger.error(f"Error navigating to URL: {e}")
-            self._take_screenshot("navigation_error.png")
+            self._take_screenshot("navigation_error.png", failure=True)
             return False
     
     def fill_form(self, form_data: Dict[str, Any]) -> bool:
@@ -236,7 +216,7 @@ class CalendlyScraper:
             return True
         except Exception as e:
             logger.error(f"Error filling form: {e}")
-            self._take_screenshot("form_fill_error.png")
+            self._take_screenshot("form_fill_error.png", failure=True)
             return False
     
     def submit_form(self) -> bool:
@@ -293,7 +273,7 @@ class CalendlyScraper:
                     return True
                 else:
                     logger.warning("Could not confirm successful submission")
-                    self._take_screenshot("submission_timeout.png")
+                    self._take_screenshot("submission_timeout.png", failure=True)
                     
                     # Check for error messages
                     error_elements = self.driver.find_elements(By.XPATH, "//div[contains(@class, 'error')]")
@@ -304,12 +284,12 @@ class CalendlyScraper:
                     return False
             except TimeoutException:
                 logger.warning("Timeout waiting for confirmation page")
-                self._take_screenshot("submission_timeout.png")
+                self._take_screenshot("submission_timeout.png", failure=True)
                 return False
                 
         except Exception as e:
             logger.error(f"Error submitting form: {e}")
-            self._take_screenshot("submission_error.png")
+            self._take_screenshot("submission_error.png", failure=True)
             return False
     
     def _wait_for_confirmation_page(self, timeout: int = 30) -> bool:
@@ -380,7 +360,7 @@ class CalendlyScraper:
             
             # Clear the field and enter the value with human-like typing
             input_field.clear()
-            self._human_like_typing(input_field, value)
+            self._type_text(input_field, value, label_text)
             
             # Move mouse away from the field after typing
             ActionChains(self.driver).move_by_offset(random.randint(50, 100), random.randint(50, 100)).perform()
@@ -419,7 +399,7 @@ class CalendlyScraper:
             
             # Clear the field and enter the value with human-like typing
             textarea.clear()
-            self._human_like_typing(textarea, value)
+            self._type_text(textarea, value, label_text)
             
             # Move mouse away from the field after typing
             ActionChains(self.driver).move_by_offset(random.randint(50, 100), random.randint(50, 100)).perform()
@@ -432,22 +412,44 @@ class CalendlyScraper:
         """
         Fill the phone number field, handling country code selection if needed.
         
+        The number is normalized once and set through the widget's inputs in a
+        single script call; the interactive dropdown path only runs when that
+        cannot be verified.
+        
         Args:
             phone_number: Phone number to enter (with or without country code)
         """
         try:
-            # Format phone number if it doesn't have a country code
-            if not phone_number.startswith("+"):
-                # Assume US number if no country code is provided
-                phone_number = "+1 " + phone_number
-            
-                # Extract country code and phone digits
-                parts = phone_number.split(" ", 1)
-                country_code = parts[0]
-            phone_digits = parts[1] if len(parts) > 1 else phone_number[len(country_code):]
-            
-            logger.info(f"Processing phone: country code={country_code}, digits={phone_digits}")
+            phone = normalize_phone(phone_number)
+            logger.info(f"Processing phone: country code={phone.country_code}, digits={phone.national}")
             
+            start = time.perf_counter()
+            try:
+                result = self.driver.execute_script(PHONE_FILL_SCRIPT, phone_payload(phone))
+            except Exception as e:
+                logger.warning(f"Phone fast path failed: {e}")
+                result = None
+            if verify_phone_fill(result, phone):
+                record_phone_fill(True, time.perf_counter() - start)
+                logger.info(f"Filled phone {phone.e164} via fast path")
+                return
+            
+            logger.info(f"Phone fast path not verified ({result}), using interactive country selection")
+            self._fill_phone_number_interactive(phone.country_code, phone.national)
+            record_phone_fill(False, time.perf_counter() - start)
+        except Exception as e:
+            logger.error(f"Error filling phone number: {e}")
+            raise
+    
+    def _fill_phone_number_interactive(self, country_code: str, phone_digits: str) -> None:
+        """
+        Fill the phone number by selecting the country in the dropdown and typing the digits.
+        
+        Args:
+            country_code: Calling code including the plus sign (e.g. "+1")
+            phone_digits: National number digits
+        """
+        try:
             # Find the country code selector - try multiple approaches
             country_selectors = self.driver.find_elements(
                 By.XPATH, 
@@ -500,7 +502,7 @@ class CalendlyScraper:
                         try:
                             search_input = search_inputs[0]
                             search_input.clear()
-                            self._human_like_typing(search_input, "United States")
+                            self._type_text(search_input, "United States", "Country search")
                             
                             # Look for United States in the filtered results
                             us_options = self.driver.find_elements(
@@ -586,7 +588,7 @@ class CalendlyScraper:
             
             # Clear the field and enter the phone number with human-like typing
             phone_input.clear()
-            self._human_like_typing(phone_input, phone_digits)
+            self._type_text(phone_input, phone_digits, "Phone")
             
         except Exception as e:
             logger.error(f"Error filling phone number: {e}")
@@ -660,7 +662,7 @@ class CalendlyScraper:
             
         except Exception as e:
             logger.error(f"Error handling reCAPTCHA: {e}")
-            self._take_screenshot("recaptcha_error.png")
+            self._take_screenshot("recaptcha_error.png", failure=True)
             return False
     
     def _extract_recaptcha_site_key(self) -> Optional[str]:
@@ -800,6 +802,23 @@ class CalendlyScraper:
         except Exception as e:
             logger.warning(f"Error handling cookie dialogs: {e}")
     
+    def _type_text(self, element, text: str, field: str) -> None:
+        """
+        Enter text into an element using the configured typing strategy, timing the fill.
+        
+        Args:
+            element: The web element to type into
+            text: The text to type
+            field: Field name used for the fill timing
+        """
+        with timed_field_fill(field, self.typing_strategy, len(text)):
+            if self.typing_strategy == BULK:
+                element.send_keys(text)
+            elif self.typing_strategy == JS:
+                self.driver.execute_script(SET_VALUE_SCRIPT, element, text)
+            else:
+                self._human_like_typing(element, text)
+    
     def _human_like_typing(self, element, text: str) -> None:
         """
         Type text into an element with random delays to simulate human typing.
@@ -841,27 +860,29 @@ class CalendlyScraper:
                 else:
                     logger.debug(f"Retry {attempt+1}/{max_retries} finding element {by}={value}")
     
-    def _take_screenshot(self, filename: str) -> None:
+    def _take_screenshot(self, filename: str, failure: bool = False) -> None:
         """
-        Take a screenshot for debugging purposes.
+        Capture a debugging screenshot if the artifact policy asks for it.
+        
+        The pull happens here; compression and the disk write happen on the
+        recorder's background writer.
         
         Args:
             filename: Name of the screenshot file
+            failure: Whether this checkpoint records a failure
         """
-        try:
-            if self.driver:
-                screenshot_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'screenshots')
-                os.makedirs(screenshot_dir, exist_ok=True)
-                screenshot_path = os.path.join(screenshot_dir, filename)
-                self.driver.save_screenshot(screenshot_path)
-                logger.debug(f"Screenshot saved to {screenshot_path}")
-        except Exception as e:
-            logger.warning(f"Error taking screenshot: {e}")
+        if self.driver:
+            self.artifacts.capture(filename, self.driver.get_screenshot_as_png, failure=failure)
     
     def close(self) -> None:
-        """Close the WebDriver and release resources."""
+        """Close the WebDriver (or return it to the pool) and release resources."""
+        self.artifacts.close()
         if self.driver:
-            self.driver.quit()
+            if self._pooled_driver:
+                self.driver_pool.release(self.driver)
+                self._pooled_driver = False
+            else:
+                self.driver.quit()
             self.driver = None
             
         # Browserbase session is automatically closed when the driver quits,
@@ -883,6 +904,8 @@ def main():
                         help='API key for 2Captcha service (default: provided key)')
     parser.add_argument('--browserbase-api-key', default=os.getenv('BROWSERBASE_API_KEY'), help='API key for Browserbase')
     parser.add_argument('--browserbase-project-id', default=os.getenv('BROWSERBASE_PROJECT_ID'), help='Project ID for Browserbase')
+    parser.add_argument('--artifact-policy', help='Screenshot policy: always, on_failure or sample:N (default: on_failure)')
+    parser.add_argument('--typing-strategy', choices=TYPING_STRATEGIES, help='How form fields are typed (default: bulk)')
     parser.add_argument('--debug', action='store_true', help='Enable debug logging')
     
     args = parser.parse_args()
@@ -907,7 +930,9 @@ def main():
         proxy=args.proxy,
         captcha_api_key=args.captcha_api_key,
         browserbase_api_key=args.browserbase_api_key,
-        browserbase_project_id=args.browserbase_project_id
+        browserbase_project_id=args.browserbase_project_id,
+        typing_strategy=args.typing_strategy,
+        artifacts=ArtifactRecorder(policy=args.artifact_policy)
     )
     
     try:
@@ -927,8 +952,9 @@ def main():
         # Submit the form
         if scraper.submit_form():
             logger.info("Successfully submitted the Calendly booking form")
-            # Wait a moment to ensure the confirmation page is fully loaded
-            time.sleep(3)  # Add a short delay to view the confirmation
+            # Wait until the confirmation page is fully loaded instead of a fixed 3s
+            wait_until(lambda: scraper.driver.execute_script("return document.readyState") == "complete",
+                       timeout=3, name="confirmation_loaded")
             logger.info("Closing browser after successful submission")
             scraper.close()  # Explicitly close the browser after success
             return 0
@@ -6,8 +6,8 @@ This script automates filling out Calendly booking forms, handling reCAPTCHA cha
 using 2Captcha service, and automatically closes when the booking is confirmed.
 """
 
-import time
 import random
+import time
 import argparse
 import logging
 import sys
@@ -19,6 +19,11 @@ from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeo
 from fake_useragent import UserAgent
 from dotenv import load_dotenv
 
+from browser.artifacts import ArtifactRecorder
+from browser.form_fill import BULK, JS, TYPING_STRATEGIES, SET_VALUE_FUNCTION, resolve_typing_strategy, timed_field_fill
+from browser.phone_input import PHONE_FILL_FUNCTION, normalize_phone, phone_payload, record_phone_fill, verify_phone_fill
+from utils.waits import wait_until
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -43,7 +48,9 @@ class CalendlyScraper:
         self, 
         headless: bool = False, 
         proxy: Optional[str] = None, 
-        hyperbrowser_api_key: Optional[str] = None
+        hyperbrowser_api_key: Optional[str] = None,
+        typing_strategy: Optional[str] = None,
+        artifacts: Optional[ArtifactRecorder] = None
     ):
         self.headless = headless
         self.proxy = proxy
@@ -53,6 +60,8 @@ class CalendlyScraper:
         self.context = None
         self.page = None
         self.wait_time = 10  # seconds
+        self.typing_strategy = resolve_typing_strategy(typing_strategy)
+        self.artifacts = artifacts or ArtifactRecorder()
     
     def setup_driver(self) -> None:
         """Set up the Playwright browser with Hyperbrowser integration."""
@@ -109,7 +118,7 @@ class CalendlyScraper:
             return True
         except Exception as e:
             logger.error(f"Error navigating to URL: {e}")
-            self._take_screenshot("navigation_error.png")
+            self._take_screenshot("navigation_error.png", failure=True)
             return False
     
     def fill_form(self, form_data: Dict[str, Any]) -> bool:
@@ -136,7 +145,7 @@ class CalendlyScraper:
             return True
         except Exception as e:
             logger.error(f"Error filling form: {e}")
-            self._take_screenshot("form_fill_error.png")
+            self._take_screenshot("form_fill_error.png", failure=True)
             return False
     
     def submit_form(self) -> bool:
@@ -170,14 +179,14 @@ class CalendlyScraper:
                 return True
             else:
                 logger.warning("Could not confirm successful submission")
-                self._take_screenshot("submission_timeout.png")
+                self._take_screenshot("submission_timeout.png", failure=True)
                 error_elements = self.page.query_selector_all("//div[contains(@class, 'error')]")
                 for error in error_elements:
                     logger.error(f"Form error: {error.inner_text()}")
                 return False
         except Exception as e:
             logger.error(f"Error submitting form: {e}")
-            self._take_screenshot("submission_error.png")
+            self._take_screenshot("submission_error.png", failure=True)
             return False
     
     def _wait_for_confirmation_page(self, timeout: int = 30) -> bool:
@@ -224,7 +233,7 @@ class CalendlyScraper:
                 raise Exception(f"Could not find input field for label: {label_text}")
             
             input_field.fill("")
-            self._human_like_typing(input_field, value)
+            self._type_text(input_field, value, label_text)
         except Exception as e:
             logger.error(f"Error filling input field '{label_text}': {e}")
             raise
@@ -246,7 +255,7 @@ class CalendlyScraper:
                 raise Exception(f"Could not find textarea for label: {label_text}")
             
             textarea.fill("")
-            self._human_like_typing(textarea, value)
+            self._type_text(textarea, value, label_text)
         except Exception as e:
             logger.error(f"Error filling textarea '{label_text}': {e}")
             raise
@@ -255,17 +264,44 @@ class CalendlyScraper:
         """
         Fill the phone number field, handling country code selection if needed.
         
+        The number is normalized once and set through the widget's inputs in a
+        single evaluate call; the interactive dropdown path only runs when that
+        cannot be verified.
+        
         Args:
             phone_number: Phone number to enter (with or without country code).
         """
         try:
-            if not phone_number.startswith("+"):
-                phone_number = "+1 " + phone_number
-            parts = phone_number.split(" ", 1)
-            country_code = parts[0]
-            phone_digits = parts[1] if len(parts) > 1 else phone_number[len(country_code):]
-            logger.info(f"Processing phone: country code={country_code}, digits={phone_digits}")
+            phone = normalize_phone(phone_number)
+            logger.info(f"Processing phone: country code={phone.country_code}, digits={phone.national}")
+            
+            start = time.perf_counter()
+            try:
+                result = self.page.evaluate(PHONE_FILL_FUNCTION, phone_payload(phone))
+            except Exception as e:
+                logger.warning(f"Phone fast path failed: {e}")
+                result = None
+            if verify_phone_fill(result, phone):
+                record_phone_fill(True, time.perf_counter() - start)
+                logger.info(f"Filled phone {phone.e164} via fast path")
+                return
             
+            logger.info(f"Phone fast path not verified ({result}), using interactive country selection")
+            self._fill_phone_number_interactive(phone.country_code, phone.national)
+            record_phone_fill(False, time.perf_counter() - start)
+        except Exception as e:
+            logger.error(f"Error filling phone number: {e}")
+            raise
+    
+    def _fill_phone_number_interactive(self, country_code: str, phone_digits: str) -> None:
+        """
+        Fill the phone number by selecting the country in the dropdown and typing the digits.
+        
+        Args:
+            country_code: Calling code including the plus sign (e.g. "+1").
+            phone_digits: National number digits.
+        """
+        try:
             # Find country code selector
             country_selectors = self.page.query_selector_all(
                 "//div[contains(@class, 'phone-field-flag') or contains(@class, 'country-select') or contains(@role, 'combobox')]"
@@ -286,7 +322,7 @@ class CalendlyScraper:
                         try:
                             search_input = search_inputs[0]
                             search_input.fill("")
-                            self._human_like_typing(search_input, "United States")
+                            self._type_text(search_input, "United States", "Country search")
                             us_options = self.page.query_selector_all("//span[contains(text(), 'United States')]")
                             if us_options:
                                 us_options[0].click()
@@ -338,7 +374,7 @@ class CalendlyScraper:
                 raise Exception("Could not find phone number input field")
             
             phone_input.fill("")
-            self._human_like_typing(phone_input, phone_digits)
+            self._type_text(phone_input, phone_digits, "Phone")
         except Exception as e:
             logger.error(f"Error filling phone number: {e}")
             raise
@@ -367,7 +403,9 @@ class CalendlyScraper:
                     if button and button.is_visible():
                         logger.info(f"Found visible cookie dialog, clicking: {xpath}")
                         self.page.click(xpath, force=True, timeout=5000)
-                        time.sleep(0.5)  # Short pause after clicking
+                        # Wait until the dialog is gone instead of pausing blindly
+                        wait_until(lambda: not button.is_visible(), timeout=0.5, initial_interval=0.02,
+                                   name="cookie_dialog_dismissed")
                         return
                 except Exception as e:
                     logger.debug(f"Standard click on {xpath} failed: {e}")
@@ -380,7 +418,8 @@ class CalendlyScraper:
                         try:
                             logger.info(f"Attempting JavaScript click on cookie button: {xpath}")
                             self.page.evaluate("element => element.click()", button)
-                            time.sleep(0.5)  # Short pause after clicking
+                            wait_until(lambda: not button.is_visible(), timeout=0.5, initial_interval=0.02,
+                                       name="cookie_dialog_dismissed")
                             return
                         except Exception as e:
                             logger.debug(f"JavaScript click failed: {e}")
@@ -402,6 +441,23 @@ class CalendlyScraper:
         except Exception as e:
             logger.warning(f"Error handling cookie dialogs: {e}")
     
+    def _type_text(self, element, text: str, field: str) -> None:
+        """
+        Enter text into an element using the configured typing strategy, timing the fill.
+        
+        Args:
+            element: The element to type into.
+            text: The text to type.
+            field: Field name used for the fill timing.
+        """
+        with timed_field_fill(field, self.typing_strategy, len(text)):
+            if self.typing_strategy == BULK:
+                element.fill(text)
+            elif self.typing_strategy == JS:
+                element.evaluate(SET_VALUE_FUNCTION, text)
+            else:
+                self._human_like_typing(element, text)
+    
     def _human_like_typing(self, element, text: str) -> None:
         """
         Type text into an element with random delays to simulate human typing.
@@ -412,8 +468,6 @@ class CalendlyScraper:
         """
         for char in text:
             element.type(char, delay=random.randint(30, 100))
-            if random.random() < 0.01:
-                time.sleep(0.5)
     
     def _find_element_with_retry(self, selector: str, max_retries: int = 3):
         """
@@ -437,24 +491,23 @@ class CalendlyScraper:
                     return None
         return None
     
-    def _take_screenshot(self, filename: str) -> None:
+    def _take_screenshot(self, filename: str, failure: bool = False) -> None:
         """
-        Take a screenshot for debugging purposes.
+        Capture a debugging screenshot if the artifact policy asks for it.
+        
+        The pull happens here; compression and the disk write happen on the
+        recorder's background writer.
         
         Args:
             filename: Name of the screenshot file.
+            failure: Whether this checkpoint records a failure.
         """
-        try:
-            screenshot_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "screenshots")
-            os.makedirs(screenshot_dir, exist_ok=True)
-            screenshot_path = os.path.join(screenshot_dir, filename)
-            self.page.screenshot(path=screenshot_path)
-            logger.debug(f"Screenshot saved to {screenshot_path}")
-        except Exception as e:
-            logger.warning(f"Error taking screenshot: {e}")
+        if self.page:
+            self.artifacts.capture(filename, self.page.screenshot, failure=failure)
     
     def close(self) -> None:
         """Close the Playwright browser and release resources."""
+        self.artifacts.close()
         if self.browser:
             self.browser.close()
         if self.playwright:
@@ -472,6 +525,8 @@ def main():
     parser.add_argument("--proxy", help="Proxy server to use (optional)")
     parser.add_argument("--hyperbrowser-api-key", default=os.getenv("HYPERBROWSER_API_KEY"), 
                         help="API key for Hyperbrowser")
+    parser.add_argument("--artifact-policy", help="Screenshot policy: always, on_failure or sample:N (default: on_failure)")
+    parser.add_argument("--typing-strategy", choices=TYPING_STRATEGIES, help="How form fields are typed (default: bulk)")
     parser.add_argument("--debug", action="store_true", help="Enable debug logging")
     
     args = parser.parse_args()
@@ -490,7 +545,9 @@ def main():
     scraper = CalendlyScraper(
         headless=args.headless,
         proxy=args.proxy,
-        hyperbrowser_api_key=args.hyperbrowser_api_key
+        hyperbrowser_api_key=args.hyperbrowser_api_key,
+        typing_strategy=args.typing_strategy,
+        artifacts=ArtifactRecorder(policy=args.artifact_policy)
     )
     
     success = False
@@ -506,7 +563,9 @@ def main():
         
         if scraper.submit_form():
             logger.info("Successfully submitted the Calendly booking form")
-            time.sleep(3)
+            # Let the confirmation page finish loading rather than sleeping a fixed 3s
+            wait_until(lambda: scraper.page.evaluate("document.readyState") == "complete",
+                       timeout=3, name="confirmation_loaded")
             success = True
             return 0
         else:
@@ -4,7 +4,6 @@ import os
 import traceback
 from datetime import datetime, timedelta
 from pprint import pformat
-import time
 
 import pytz
 import requests
@@ -17,6 +16,9 @@ from selenium.webdriver.common.by import By
 from selenium_recaptcha_solver import RecaptchaSolver
 
 from prompts.scheduling_prompts import scheduling_prompt
+from utils.waits import backoff_delays, sleep_backoff
+from utils.booking_ledger import FAILED, UncertainBookingError, booking_key, get_default_ledger
+from utils.calendly_api import find_scheduled_booking, is_slot_available
 from utils.calendar_utils import (
     generate_mock_calendar,
     format_calendar_data,
@@ -264,12 +266,35 @@ def solve_recaptcha(driver, solver, url):
         logger.error(f"Traceback: {traceback.format_exc()}")
         return False
 
-def book_with_retry(url, name, email, phone, additional_info, max_retries=3):
+def book_with_retry(url, name, email, phone, additional_info, max_retries=3, ledger=None):
     """
     Attempt to book a Calendly appointment with retries for reCAPTCHA
+    
+    Submissions go through the booking ledger, so a retry after an
+    unconfirmed submission first checks whether the slot was taken instead
+    of booking the same meeting twice.
     """
     logger.info(f"Attempting to book appointment at {url} with up to {max_retries} retries")
     
+    ledger = ledger or get_default_ledger()
+    event_url, _, slot = url.split('?')[0].rstrip('/').rpartition('/')
+    key = booking_key(event_url, slot, email)
+    if ledger.booked_url(key) is not None:
+        logger.info("Appointment already booked according to the ledger")
+        return True
+    
+    def verify():
+        # The host's scheduled events settle it; otherwise only a slot still offered is
+        # evidence, and a slot that is gone stays uncertain
+        uuid = setup_calendly_api(event_url)
+        found = find_scheduled_booking(uuid, slot, email)
+        if found is not None:
+            return found
+        return False if is_slot_available(uuid, slot) else None
+    
+    # Jittered exponential backoff between attempts instead of a fixed 5s
+    retry_delays = backoff_delays(base=1.0, factor=2.0, max_delay=10.0)
+    
     for attempt in range(1, max_retries + 1):
         logger.info(f"Booking attempt {attempt} of {max_retries}")
         
@@ -286,8 +311,8 @@ def book_with_retry(url, name, email, phone, additional_info, max_retries=3):
                 driver.quit()
                 
                 if attempt < max_retries:
-                    logger.info(f"Waiting 5 seconds before retry {attempt + 1}")
-                    time.sleep(5)  # Add a delay before retrying
+                    delay = sleep_backoff(retry_delays, name="booking_retry_backoff")
+                    logger.info(f"Waited {delay:.2f} seconds before retry {attempt + 1}")
                     continue
                 else:
                     logger.error("Max retries reached, falling back to direct booking method")
@@ -302,23 +327,29 @@ def book_with_retry(url, name, email, phone, additional_info, max_retries=3):
             # For now, close this browser and use the imported function
             driver.quit()
             
-            booking_success = book_calendly_appointment(
-                url=url,
-                name=name,
-                email=email,
-                phone=phone,
-                additional_info=additional_info,
-                debug=True,
-                headless=False
-            )
+            def submit():
+                if book_calendly_appointment(
+                    url=url,
+                    name=name,
+                    email=email,
+                    phone=phone,
+                    additional_info=additional_info,
+                    debug=True,
+                    headless=False
+                ):
+                    return url
+                # The form may have been submitted even though success was not confirmed
+                raise UncertainBookingError(f"Booking not confirmed on attempt {attempt}")
             
-            if booking_success:
+            if ledger.run_once(key, submit, verify):
                 logger.info("Calendly appointment booked successfully")
                 return True
-            else:
-                logger.error(f"Booking failed on attempt {attempt}")
-                if attempt < max_retries:
-                    continue
+            if ledger.get(key)["state"] != FAILED:
+                logger.error("Booking outcome could not be reconciled, not resubmitting")
+                return False
+            logger.error(f"Booking failed on attempt {attempt}")
+            if attempt < max_retries:
+                continue
         
         except Exception as e:
             logger.error(f"Error during booking attempt {attempt}: {str(e)}")
@@ -331,8 +362,8 @@ def book_with_retry(url, name, email, phone, additional_info, max_retries=3):
                 pass
             
             if attempt < max_retries:
-                logger.info(f"Waiting 5 seconds before retry {attempt + 1}")
-                time.sleep(5)
+                delay = sleep_backoff(retry_delays, name="booking_retry_backoff")
+                logger.info(f"Waited {delay:.2f} seconds before retry {attempt + 1}")
                 continue
     
     logger.error("All booking attempts failed")
@@ -4,40 +4,47 @@ import json
 import os
 from datetime import datetime
 from book import book_calendly_meeting
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler()
-    ]
-)
+from utils.llm_providers import get_chat_model
+from utils.rate_limit import upstream_stats
+from utils.metrics import snapshot as metrics_snapshot
+from utils.replay import Recorder, ReplaySession, parse_latency
+from utils.logging_setup import add_log_file, configure_from_env, log_context, remove_log_handler
 
 logger = logging.getLogger(__name__)
 
-def run_test_suite(num_runs, delay_between_runs=0):
+def run_test_suite(num_runs, delay_between_runs=0, llm_provider=None, record=None, replay=None, replay_latency=None):
     """
     Run the Calendly workflow multiple times and collect statistics
     
     Args:
         num_runs (int): Number of test runs to perform
-        delay_between_runs (int): Delay in seconds between runs to avoid rate limiting
+        delay_between_runs (int): Optional pause in seconds between runs (upstream rate limits are
+            handled by utils.rate_limit, so this defaults to 0)
+        llm_provider (str): LLM provider ("openai", "local" or "fake"); defaults to CALENDLYAI_LLM_PROVIDER
+        record (str): Record the live Calendly, LLM and booking-page traffic to this cassette
+        replay (str): Run offline against this cassette instead of live services
+        replay_latency (dict): Seconds injected per replayed "http" response, "llm" call and "browser" step
     """
     # Create timestamp for this test run
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     results_dir = os.path.join('results', timestamp)
     os.makedirs(results_dir, exist_ok=True)
 
-    # Set up file logging
+    # Set up file logging; the suite's file receives every module's records, tagged with run IDs
     log_file = os.path.join(results_dir, f'calendly_test_{timestamp}.log')
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-    logger.addHandler(file_handler)
+    file_handler = add_log_file(log_file)
+
+    # One model instance is shared by every run so fake latency/failure streams stay reproducible
+    recorder = Recorder(record).start() if record else None
+    replay_session = ReplaySession(replay, latency=replay_latency).start() if replay else None
+    llm = None if replay_session else get_chat_model(llm_provider)
 
     results = {
         'successful': 0,
         'failed': 0,
         'total_runs': num_runs,
+        'llm_provider': 'replay' if replay else llm_provider or os.getenv('CALENDLYAI_LLM_PROVIDER', 'openai'),
+        'replay': replay,
         'start_time': datetime.now().isoformat(),
         'runs': [],  # List to store individual run results
         'errors': []
@@ -63,7 +70,14 @@ def run_test_suite(num_runs, delay_between_runs=0):
             
             # Run the workflow using book_calendly_meeting instead
             start_time = time.time()
-            result = book_calendly_meeting(**test_data)
+            if replay_session:
+                services = replay_session.booking_kwargs()
+            elif recorder:
+                services = recorder.booking_kwargs(llm, test_data["timezone"])
+            else:
+                services = {"llm": llm}
+            with log_context(run_id=f"{timestamp}-{run_num}"):
+                result = book_calendly_meeting(**test_data, **services)
             end_time = time.time()
             
             run_result = {
@@ -103,7 +117,7 @@ def run_test_suite(num_runs, delay_between_runs=0):
             logger.info(f"Run {run_num} completed in {end_time - start_time:.2f} seconds")
             
             # Wait between runs unless it's the last run
-            if run_num < num_runs:
+            if run_num < num_runs and delay_between_runs:
                 logger.info(f"Waiting {delay_between_runs} seconds before next run...")
                 time.sleep(delay_between_runs)
                 
@@ -115,6 +129,13 @@ def run_test_suite(num_runs, delay_between_runs=0):
     
     # Calculate and log final statistics
     results['end_time'] = datetime.now().isoformat()
+    results['upstreams'] = upstream_stats()
+    results['metrics'] = metrics_snapshot()
+    if recorder:
+        recorder.stop()
+    if replay_session:
+        results['replay_stats'] = replay_session.stats()
+        replay_session.stop()
     
     # Convert ISO format strings to datetime objects
     start_time = datetime.fromisoformat(results['start_time'])
@@ -142,7 +163,7 @@ def run_test_suite(num_runs, delay_between_runs=0):
         json.dump(results, f, indent=2)
 
     # Remove file handler
-    logger.removeHandler(file_handler)
+    remove_log_handler(file_handler)
     
     return results
 
@@ -151,8 +172,15 @@ if __name__ == "__main__":
     
     parser = argparse.ArgumentParser(description='Run Calendly workflow test suite')
     parser.add_argument('--runs', type=int, default=5, help='Number of test runs to perform')
-    parser.add_argument('--delay', type=int, default=10, help='Delay between runs in seconds')
+    parser.add_argument('--delay', type=int, default=0, help='Optional pause between runs in seconds')
+    parser.add_argument('--llm', choices=['openai', 'local', 'fake'], help='LLM provider (default: CALENDLYAI_LLM_PROVIDER or openai)')
+    replay_group = parser.add_mutually_exclusive_group()
+    replay_group.add_argument('--record', help='Record live traffic to this cassette file')
+    replay_group.add_argument('--replay', help='Run offline against this cassette file (see utils/replay.py)')
+    parser.add_argument('--replay-latency', default='', help='Injected replay latency, e.g. "http=0.05,llm=0.8,browser=0.2"')
     
     args = parser.parse_args()
+    configure_from_env(force=True)
     
-    run_test_suite(args.runs, args.delay)
\ No newline at end of file
+    run_test_suite(args.runs, args.delay, args.llm, record=args.record, replay=args.replay,
+                   replay_latency=parse_latency(args.replay_latency))
\ No newline at end of file
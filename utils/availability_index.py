@@ -0,0 +1,323 @@
+"""
+Per-host availability index kept warm in the background
+
+Instead of every booking fetching and parsing the host's availability, the
+index keeps one immutable HostAvailability per (event type UUID, timezone):
+the bookable slot starts as a sorted array of epoch minutes plus the merged
+free intervals they cover. Queries are binary searches over those arrays:
+
+    is_free(slot)              is this slot still offered?
+    covers(slot)               did the fetch cover the slot's day?
+    next_free(after, n)        the next n free slots after a time
+    overlapping(start, end)    free slots overlapping a window
+
+lookup() serves a snapshot younger than max_age and otherwise refreshes it
+from get_calendly_availability, one refresh per host at a time. A refresh
+splices the fetched days into the previous snapshot (elapsed days are
+dropped, unchanged days are kept) and swaps the new snapshot in, so readers
+never lock. Hosts looked up recently are refreshed every refresh_interval
+by a background thread, which keeps high-traffic hosts warm; hosts idle
+for idle_timeout stop being refreshed.
+
+get_availability_index() returns the process-wide index, tuned with
+CALENDLYAI_INDEX_MAX_AGE, CALENDLYAI_INDEX_REFRESH and
+CALENDLYAI_INDEX_IDLE (seconds; a refresh interval of 0 disables the
+background thread, a max age of 0 fetches on every lookup).
+"""
+
+import os
+import time
+import logging
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timezone as dt_timezone
+
+from utils.calendar_utils import iter_available_spots
+from utils.calendly_api import get_calendly_availability
+from utils.metrics import AVAILABILITY_INDEX
+from utils.timezone_utils import DEFAULT_TIMEZONE, parse_slot, utc_to_local
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOT_MINUTES = 30
+DEFAULT_MAX_AGE = 120.0
+DEFAULT_REFRESH_INTERVAL = 30.0
+DEFAULT_IDLE_TIMEOUT = 600.0
+
+
+def to_minute(value) -> int:
+    """Epoch minute of an aware datetime, an ISO 8601 slot string or an epoch minute."""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = parse_slot(value)
+    return int(value.timestamp()) // 60
+
+
+def from_minute(minute: int) -> datetime:
+    """Aware UTC datetime of an epoch minute."""
+    return datetime.fromtimestamp(minute * 60, dt_timezone.utc)
+
+
+def day_minutes(calendar: dict) -> dict:
+    """
+    Group a Calendly-format calendar's bookable spots by day.
+
+    Returns:
+        dict: date -> tuple of sorted epoch minutes
+    """
+    return {
+        date.fromisoformat(day["date"]): tuple(to_minute(slot) for slot in iter_available_spots({"days": [day]}))
+        for day in calendar.get("days", [])
+    }
+
+
+class HostAvailability:
+    """Immutable snapshot of one host's free slots; every query is a binary search."""
+
+    def __init__(self, uuid: str, timezone: str, days: dict, slot_minutes: int = DEFAULT_SLOT_MINUTES,
+                 fetched_at: float = None):
+        """
+        Args:
+            uuid: Calendly event type UUID
+            timezone: IANA timezone the days are expressed in
+            days: date -> sorted tuple of free slot starts in epoch minutes
+            slot_minutes: Length of a slot, used for window overlap and interval merging
+            fetched_at: Epoch seconds of the availability fetch the snapshot reflects
+        """
+        self.uuid = uuid
+        self.timezone = timezone
+        self.days = days
+        self.slot_minutes = slot_minutes
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+        self.slots = array("q", sorted({minute for minutes in days.values() for minute in minutes}))
+
+        starts, ends = array("q"), array("q")
+        for minute in self.slots:
+            if ends and minute <= ends[-1]:
+                ends[-1] = max(ends[-1], minute + slot_minutes)
+            else:
+                starts.append(minute)
+                ends.append(minute + slot_minutes)
+        self.interval_starts, self.interval_ends = starts, ends
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def is_free(self, slot) -> bool:
+        """Whether slot (datetime, ISO string or epoch minute) is offered."""
+        minute = to_minute(slot)
+        index = bisect_left(self.slots, minute)
+        return index < len(self.slots) and self.slots[index] == minute
+
+    def covers(self, slot) -> bool:
+        """Whether slot falls on a day the availability fetch covered, so is_free() can be trusted."""
+        return utc_to_local(from_minute(to_minute(slot)), self.timezone).date() in self.days
+
+    def next_free(self, after=None, n: int = 1) -> list:
+        """
+        The next n free slots starting at or after a time.
+
+        Args:
+            after: Datetime, ISO string or epoch minute (defaults to now)
+            n: Number of slots
+
+        Returns:
+            list: Aware UTC datetimes in ascending order
+        """
+        index = bisect_left(self.slots, to_minute(after or datetime.now(dt_timezone.utc)))
+        return [from_minute(minute) for minute in self.slots[index:index + n]]
+
+    def overlapping(self, start, end) -> list:
+        """
+        Free slots whose [start, start + slot_minutes) overlaps the window [start, end).
+
+        Returns:
+            list: Aware UTC datetimes in ascending order
+        """
+        low = bisect_right(self.slots, to_minute(start) - self.slot_minutes)
+        high = bisect_left(self.slots, to_minute(end))
+        return [from_minute(minute) for minute in self.slots[low:high]]
+
+    def free_intervals(self, start=None, end=None) -> list:
+        """
+        Merged free intervals, optionally limited to those overlapping [start, end).
+
+        Returns:
+            list: (start, end) pairs of aware UTC datetimes
+        """
+        low = 0 if start is None else bisect_right(self.interval_ends, to_minute(start))
+        high = len(self.interval_starts) if end is None else bisect_left(self.interval_starts, to_minute(end))
+        return [(from_minute(self.interval_starts[index]), from_minute(self.interval_ends[index]))
+                for index in range(low, high)]
+
+    def iter_slots(self, after=None):
+        """
+        Lazily yield free slots at or after a time (defaults to now), for merge_intersect().
+
+        Slots of a snapshot that have since started are skipped, so a stale
+        snapshot never offers a time in the past.
+
+        Yields:
+            datetime: Aware UTC datetimes in ascending order
+        """
+        index = bisect_left(self.slots, to_minute(after or datetime.now(dt_timezone.utc)))
+        for minute in self.slots[index:]:
+            yield from_minute(minute)
+
+    def without(self, slot) -> "HostAvailability":
+        """A copy of this snapshot with slot removed (e.g. after booking it)."""
+        minute = to_minute(slot)
+        days = {day: tuple(value for value in minutes if value != minute) for day, minutes in self.days.items()}
+        return HostAvailability(self.uuid, self.timezone, days, self.slot_minutes, self.fetched_at)
+
+
+class AvailabilityIndex:
+    """Per-host HostAvailability snapshots, refreshed on demand and in the background."""
+
+    def __init__(self, fetch=None, max_age: float = DEFAULT_MAX_AGE,
+                 refresh_interval: float = DEFAULT_REFRESH_INTERVAL, idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+                 slot_minutes: int = DEFAULT_SLOT_MINUTES, clock=time.time):
+        """
+        Args:
+            fetch: Callable (uuid, timezone) -> Calendly-format availability
+                (defaults to get_calendly_availability)
+            max_age: Seconds a snapshot is served before lookup() refreshes it (0 refreshes every lookup)
+            refresh_interval: Seconds between background refreshes of recently used hosts (0 disables them)
+            idle_timeout: Seconds without a lookup after which a host is no longer refreshed in the background
+            slot_minutes: Length of a slot
+            clock: Time source in epoch seconds
+        """
+        self.fetch = fetch or get_calendly_availability
+        self.max_age = max_age
+        self.refresh_interval = refresh_interval
+        self.idle_timeout = idle_timeout
+        self.slot_minutes = slot_minutes
+        self.clock = clock
+        self._hosts = {}
+        self._last_used = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def get(self, uuid: str, timezone: str = DEFAULT_TIMEZONE):
+        """The current snapshot of a host, however old, or None."""
+        return self._hosts.get((uuid, timezone))
+
+    def lookup(self, uuid: str, timezone: str = DEFAULT_TIMEZONE) -> HostAvailability:
+        """
+        Return a host's availability, refreshing it first when missing or older than max_age.
+
+        Concurrent lookups of the same stale host wait for a single refresh.
+
+        Args:
+            uuid: Calendly event type UUID
+            timezone: IANA timezone availability is fetched in
+
+        Returns:
+            HostAvailability: Snapshot of the host's free slots
+        """
+        key = (uuid, timezone)
+        self._last_used[key] = self.clock()
+        if self.refresh_interval > 0:
+            self._start()
+
+        current = self._hosts.get(key)
+        if current is not None and self.clock() - current.fetched_at < self.max_age:
+            AVAILABILITY_INDEX.inc(result="hit")
+            return current
+        with self._host_lock(key):
+            current = self._hosts.get(key)
+            if current is not None and self.clock() - current.fetched_at < self.max_age:
+                AVAILABILITY_INDEX.inc(result="hit")
+                return current
+            AVAILABILITY_INDEX.inc(result="refresh" if current is not None else "miss")
+            return self._refresh(key)
+
+    def refresh(self, uuid: str, timezone: str = DEFAULT_TIMEZONE) -> HostAvailability:
+        """Fetch a host's availability now and splice it into the index."""
+        key = (uuid, timezone)
+        with self._host_lock(key):
+            return self._refresh(key)
+
+    def _host_lock(self, key: tuple) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _refresh(self, key: tuple) -> HostAvailability:
+        uuid, timezone = key
+        fetched_at = self.clock()
+        try:
+            fetched = day_minutes(self.fetch(uuid, timezone))
+        except Exception as e:
+            logger.error(f"Error refreshing availability index for {uuid}: {e}")
+            raise
+
+        previous = self._hosts.get(key)
+        today = utc_to_local(datetime.fromtimestamp(fetched_at, dt_timezone.utc), timezone).date()
+        days = {day: minutes for day, minutes in (previous.days.items() if previous else ()) if day >= today}
+        changed = sum(1 for day, minutes in fetched.items() if days.get(day) != minutes)
+        days.update(fetched)
+
+        if previous is not None and not changed and days.keys() == previous.days.keys():
+            snapshot = HostAvailability(uuid, timezone, previous.days, self.slot_minutes, fetched_at)
+        else:
+            snapshot = HostAvailability(uuid, timezone, days, self.slot_minutes, fetched_at)
+        self._hosts[key] = snapshot
+        logger.debug(f"Refreshed availability index for {uuid}: {changed} of {len(fetched)} fetched day(s) "
+                     f"changed, {len(snapshot)} free slot(s)")
+        return snapshot
+
+    def mark_taken(self, uuid: str, timezone: str, slot) -> None:
+        """Remove a slot this process has just booked, ahead of the next refresh."""
+        key = (uuid, timezone)
+        with self._host_lock(key):
+            current = self._hosts.get(key)
+            if current is not None and current.is_free(slot):
+                self._hosts[key] = current.without(slot)
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="availability-index", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        """Background loop: refresh every recently used host once per refresh_interval."""
+        while not self._stop.wait(self.refresh_interval):
+            now = self.clock()
+            for key, last_used in list(self._last_used.items()):
+                if now - last_used > self.idle_timeout:
+                    self._last_used.pop(key, None)
+                    continue
+                try:
+                    self.refresh(*key)
+                except Exception as e:
+                    logger.warning(f"Background availability refresh failed for {key[0]}: {e}")
+
+    def stop(self):
+        """Stop the background refresh thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def get_availability_index() -> AvailabilityIndex:
+    """Return the process-wide availability index, configured from CALENDLYAI_INDEX_* variables."""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = AvailabilityIndex(
+                max_age=float(os.getenv("CALENDLYAI_INDEX_MAX_AGE", DEFAULT_MAX_AGE)),
+                refresh_interval=float(os.getenv("CALENDLYAI_INDEX_REFRESH", DEFAULT_REFRESH_INTERVAL)),
+                idle_timeout=float(os.getenv("CALENDLYAI_INDEX_IDLE", DEFAULT_IDLE_TIMEOUT)),
+            )
+        return _default_index
@@ -0,0 +1,405 @@
+"""
+Durable, idempotent booking ledger
+
+Every booking attempt is keyed by (event UUID, slot, invitee email) and moves
+through these states:
+
+    pending -> submitting -> booked
+                          -> failed      (safe to retry)
+                          -> uncertain   (the submission may have landed)
+
+A key that is already booked short-circuits through an in-memory index
+without touching the database. A key left submitting or uncertain (a
+timeout, a crash, a missing confirmation page) is reconciled against a
+verifier before anything is resubmitted, so a retry never books the same
+meeting twice.
+
+Records and their state history live in SQLite with WAL journaling; each
+thread gets its own connection so reads do not queue behind writes.
+
+Keys no verifier could settle stay uncertain and are never resubmitted;
+operators list and settle them from the command line (reconcile asks the
+Calendly API, see utils.calendly_api.find_scheduled_booking):
+
+    python -m utils.booking_ledger list --state uncertain
+    python -m utils.booking_ledger reconcile
+    python -m utils.booking_ledger resolve EVENT SLOT EMAIL booked --url https://calendly.com/...
+"""
+
+import os
+import json
+import time
+import argparse
+import sqlite3
+import logging
+import threading
+
+from utils.timezone_utils import parse_slot
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+SUBMITTING = "submitting"
+BOOKED = "booked"
+FAILED = "failed"
+UNCERTAIN = "uncertain"
+
+TRANSITIONS = {
+    PENDING: {SUBMITTING, FAILED},
+    SUBMITTING: {BOOKED, FAILED, UNCERTAIN},
+    UNCERTAIN: {BOOKED, FAILED},
+    FAILED: {PENDING},
+    BOOKED: set(),
+}
+
+DEFAULT_LEDGER_PATH = "booking_ledger.db"
+
+
+class UncertainBookingError(RuntimeError):
+    """Raised by a submission whose outcome is unknown (e.g. submitted but not confirmed)."""
+
+
+def booking_key(event_uuid: str, slot: str, email: str) -> tuple:
+    """
+    Normalize a ledger key: slot as a UTC ISO string, email lowercased.
+
+    Slots that do not parse as ISO datetimes (e.g. a raw URL segment) are kept as given.
+    """
+    try:
+        slot = parse_slot(slot).isoformat()
+    except (TypeError, ValueError):
+        pass
+    return (event_uuid, slot, email.strip().lower())
+
+
+class BookingLedger:
+    """SQLite-backed ledger of booking attempts with O(1) short-circuit for booked keys."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS bookings (
+            event_uuid TEXT NOT NULL,
+            slot TEXT NOT NULL,
+            email TEXT NOT NULL,
+            state TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 1,
+            booking_url TEXT,
+            error TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (event_uuid, slot, email)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS booking_events (
+            event_uuid TEXT NOT NULL,
+            slot TEXT NOT NULL,
+            email TEXT NOT NULL,
+            from_state TEXT,
+            to_state TEXT NOT NULL,
+            detail TEXT,
+            at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path: str = None, stale_after: float = 600):
+        """
+        Open (and create if needed) the ledger.
+
+        Args:
+            path: SQLite database file (defaults to CALENDLYAI_LEDGER_PATH, then booking_ledger.db)
+            stale_after: Seconds after which a pending (never submitted) claim may be re-claimed
+        """
+        self.path = path or os.getenv("CALENDLYAI_LEDGER_PATH", DEFAULT_LEDGER_PATH)
+        self.stale_after = stale_after
+        self._local = threading.local()
+        self._booked = {}
+        self._booked_lock = threading.Lock()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(self.SCHEMA)
+        for event_uuid, slot, email, url in conn.execute(
+            "SELECT event_uuid, slot, email, booking_url FROM bookings WHERE state = ?", (BOOKED,)
+        ):
+            self._booked[(event_uuid, slot, email)] = url
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _record(row) -> dict:
+        if row is None:
+            return None
+        keys = ("event_uuid", "slot", "email", "state", "attempts", "booking_url", "error", "created_at", "updated_at")
+        return dict(zip(keys, row))
+
+    def _select(self, conn, key: tuple):
+        return conn.execute(
+            "SELECT event_uuid, slot, email, state, attempts, booking_url, error, created_at, updated_at "
+            "FROM bookings WHERE event_uuid = ? AND slot = ? AND email = ?", key
+        ).fetchone()
+
+    def booked_url(self, key: tuple):
+        """Return the booking URL if the key is booked (O(1), no database access), else None."""
+        with self._booked_lock:
+            return self._booked.get(key)
+
+    def get(self, key: tuple) -> dict:
+        """Return the ledger record for a key, or None."""
+        return self._record(self._select(self._connection(), key))
+
+    def keys(self, state: str = None) -> list:
+        """Return the records in a state (all records without one), oldest first."""
+        query = "SELECT event_uuid, slot, email, state, attempts, booking_url, error, created_at, updated_at " \
+                "FROM bookings"
+        params = ()
+        if state is not None:
+            query += " WHERE state = ?"
+            params = (state,)
+        return [self._record(row) for row in self._connection().execute(query + " ORDER BY created_at", params)]
+
+    def history(self, key: tuple) -> list:
+        """Return the state transitions recorded for a key, oldest first."""
+        rows = self._connection().execute(
+            "SELECT from_state, to_state, detail, at FROM booking_events "
+            "WHERE event_uuid = ? AND slot = ? AND email = ? ORDER BY at, rowid", key
+        ).fetchall()
+        return [{"from": row[0], "to": row[1], "detail": row[2], "at": row[3]} for row in rows]
+
+    def begin(self, key: tuple) -> tuple:
+        """
+        Claim a key for a booking attempt.
+
+        A new key is created as pending; a failed key, or a pending claim older
+        than stale_after whose owner never submitted, is re-claimed (attempts
+        incremented). Any other state is returned unclaimed so the caller can
+        short-circuit (booked) or reconcile (submitting/uncertain).
+
+        Returns:
+            tuple: (claimed, record)
+        """
+        url = self.booked_url(key)
+        if url is not None:
+            return False, {"event_uuid": key[0], "slot": key[1], "email": key[2], "state": BOOKED, "booking_url": url}
+
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._select(conn, key)
+            claimed = False
+            if row is None:
+                conn.execute(
+                    "INSERT INTO bookings (event_uuid, slot, email, state, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", (*key, PENDING, now, now)
+                )
+                self._log(conn, key, None, PENDING, None, now)
+                claimed = True
+            elif row[3] == FAILED or (row[3] == PENDING and now - row[8] > self.stale_after):
+                conn.execute(
+                    "UPDATE bookings SET state = ?, attempts = attempts + 1, error = NULL, updated_at = ? "
+                    "WHERE event_uuid = ? AND slot = ? AND email = ?", (PENDING, now, *key)
+                )
+                self._log(conn, key, row[3], PENDING, "retry", now)
+                claimed = True
+            if claimed:
+                row = self._select(conn, key)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return claimed, self._record(row)
+
+    def transition(self, key: tuple, state: str, booking_url: str = None, error: str = None,
+                   detail: str = None) -> dict:
+        """
+        Move a key to a new state, enforcing the allowed transitions.
+
+        Raises:
+            KeyError: If the key is not in the ledger
+            ValueError: If the transition is not allowed
+        """
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._select(conn, key)
+            if row is None:
+                raise KeyError(f"No ledger entry for {key}")
+            current = row[3]
+            if state not in TRANSITIONS[current]:
+                raise ValueError(f"Invalid booking transition {current} -> {state} for {key}")
+            conn.execute(
+                "UPDATE bookings SET state = ?, booking_url = COALESCE(?, booking_url), error = ?, updated_at = ? "
+                "WHERE event_uuid = ? AND slot = ? AND email = ?", (state, booking_url, error, now, *key)
+            )
+            self._log(conn, key, current, state, detail or error, now)
+            row = self._select(conn, key)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if state == BOOKED:
+            with self._booked_lock:
+                self._booked[key] = row[5] or ""
+        return self._record(row)
+
+    @staticmethod
+    def _log(conn, key: tuple, from_state: str, to_state: str, detail: str, at: float) -> None:
+        conn.execute(
+            "INSERT INTO booking_events (event_uuid, slot, email, from_state, to_state, detail, at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", (*key, from_state, to_state, detail, at)
+        )
+
+    def reconcile(self, key: tuple, verify=None) -> str:
+        """
+        Resolve an uncertain key (or a stale submitting one) before any retry.
+
+        A submission updated less than stale_after seconds ago is treated as
+        still in flight and left alone.
+
+        Args:
+            key: Ledger key
+            verify: Callable returning True (the booking landed), False (it did not)
+                or None (still unknown); without a verifier the key stays uncertain
+
+        Returns:
+            str: The key's state after reconciliation
+        """
+        record = self.get(key)
+        if record is None:
+            return None
+        if record["state"] == SUBMITTING:
+            if time.time() - record["updated_at"] <= self.stale_after:
+                return SUBMITTING
+            # A submission that never reported back is as uncertain as a timeout
+            if not self._try_transition(key, UNCERTAIN, detail="unfinished submission"):
+                return self.get(key)["state"]
+        elif record["state"] != UNCERTAIN:
+            return record["state"]
+
+        outcome = None
+        if verify is not None:
+            try:
+                outcome = verify()
+            except Exception as e:
+                logger.warning(f"Error verifying booking {key}: {e}")
+        if outcome is True:
+            self._try_transition(key, BOOKED, detail="reconciled: booking found")
+        elif outcome is False:
+            self._try_transition(key, FAILED, detail="reconciled: booking not found")
+        return self.get(key)["state"]
+
+    def _try_transition(self, key: tuple, state: str, **kwargs) -> bool:
+        """Transition unless another caller already moved the key on."""
+        try:
+            self.transition(key, state, **kwargs)
+            return True
+        except ValueError:
+            return False
+
+    def run_once(self, key: tuple, submit, verify=None):
+        """
+        Run submit() at most once per key unless a previous attempt provably failed.
+
+        Args:
+            key: Ledger key from booking_key()
+            submit: Callable performing the submission; returns the booking URL
+                (truthy) on success, falsy when the form was not submitted, and
+                raises when the outcome is unknown (e.g. a timeout after submitting)
+            verify: Optional reconciliation callable, see reconcile()
+
+        Returns:
+            The booking URL, or None when the booking failed or is still uncertain
+        """
+        claimed, record = self.begin(key)
+        if not claimed:
+            if record["state"] == BOOKED:
+                logger.info(f"Booking {key} already recorded, skipping submission")
+                return record["booking_url"] or None
+            state = self.reconcile(key, verify)
+            if state == BOOKED:
+                return self.get(key)["booking_url"] or None
+            if state in (PENDING, SUBMITTING):
+                logger.info(f"Booking {key} is already in flight ({state}), not submitting again")
+                return None
+            if state != FAILED:
+                logger.warning(f"Booking {key} is {state}; not resubmitting until it is reconciled")
+                return None
+            claimed, record = self.begin(key)
+            if not claimed:
+                return record["booking_url"] if record["state"] == BOOKED else None
+
+        self.transition(key, SUBMITTING)
+        try:
+            result = submit()
+        except Exception as e:
+            self.transition(key, UNCERTAIN, error=f"{type(e).__name__}: {e}")
+            raise
+        if result:
+            self.transition(key, BOOKED, booking_url=result if isinstance(result, str) else None)
+            return result
+        self.transition(key, FAILED, error="submission returned no booking")
+        return None
+
+    def close(self) -> None:
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_default_ledger = None
+_default_ledger_lock = threading.Lock()
+
+
+def get_default_ledger() -> BookingLedger:
+    """Return the process-wide ledger at CALENDLYAI_LEDGER_PATH (or booking_ledger.db)."""
+    global _default_ledger
+    with _default_ledger_lock:
+        if _default_ledger is None:
+            _default_ledger = BookingLedger()
+        return _default_ledger
+
+
+def _verify_with_calendly_api(key: tuple):
+    """Verifier for an uncertain key: look the booking up through the Calendly API."""
+    from utils.calendly_api import find_scheduled_booking, setup_calendly_api
+    event, slot, email = key
+    # Keys recorded by webscrape.book_with_retry hold the event URL instead of its UUID
+    uuid = setup_calendly_api(event) if event.startswith(("http://", "https://")) else event
+    return find_scheduled_booking(uuid, slot, email)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Inspect and settle booking ledger entries')
+    parser.add_argument('--ledger', help='Ledger database (defaults to CALENDLYAI_LEDGER_PATH or booking_ledger.db)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    list_parser = subparsers.add_parser('list', help='Print ledger records as JSON lines')
+    list_parser.add_argument('--state', choices=sorted(TRANSITIONS), help='Only records in this state')
+    subparsers.add_parser('reconcile', help='Settle uncertain and stale submitting keys through the Calendly API')
+    resolve_parser = subparsers.add_parser('resolve', help='Settle a key by hand')
+    resolve_parser.add_argument('event', help='Event type UUID (or event URL) of the key')
+    resolve_parser.add_argument('slot', help='Slot of the key (ISO 8601)')
+    resolve_parser.add_argument('email', help='Invitee email of the key')
+    resolve_parser.add_argument('state', choices=[BOOKED, FAILED], help='Outcome of the booking')
+    resolve_parser.add_argument('--url', help='Booking URL, for a booked key')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    ledger = BookingLedger(args.ledger)
+    if args.command == 'list':
+        for record in ledger.keys(args.state):
+            print(json.dumps(record))
+    elif args.command == 'reconcile':
+        for record in ledger.keys(UNCERTAIN) + ledger.keys(SUBMITTING):
+            key = (record["event_uuid"], record["slot"], record["email"])
+            state = ledger.reconcile(key, lambda key=key: _verify_with_calendly_api(key))
+            print(f"{state:<10} {' '.join(key)}")
+    else:
+        key = booking_key(args.event, args.slot, args.email)
+        record = ledger.transition(key, args.state, booking_url=args.url, detail="resolved by operator")
+        print(json.dumps(record))
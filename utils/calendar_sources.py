@@ -0,0 +1,516 @@
+"""
+Invitee calendar sources with incremental sync and a local event cache
+
+A CalendarSource returns the events that changed since a sync token:
+
+    ICSSource     a local .ics file or an http(s) ICS feed; the token is the
+                  file's mtime/size or the feed's ETag, so an unchanged
+                  calendar costs a stat or a 304, a changed one a re-parse
+    CalDAVSource  a CalDAV collection synced with the WebDAV sync-collection
+                  REPORT (RFC 6578); only resources changed or deleted since
+                  the token are transferred
+
+EventCache keeps the synced events and each source's token in SQLite, and
+InviteeCalendar ties the two together: every availability() call is one
+delta sync followed by a query of the cache, whose events the free/busy
+engine (utils/freebusy.py) turns into a Calendly-format calendar the
+matcher consumes:
+
+    invitee = InviteeCalendar(CalDAVSource("http://localhost:5232/alice/calendar/"),
+                              cache=EventCache("invitee_cache.db"))
+    book_calendly_meeting(..., calendar_source=invitee)
+
+Only what free/busy needs is parsed from iCalendar: UID, DTSTART, DTEND or
+DURATION, TRANSP, STATUS, RRULE, EXDATE and RECURRENCE-ID. TZID parameters
+must name IANA zones; anything else falls back to the calendar's timezone,
+and UTC times recur in UTC.
+"""
+
+import os
+import re
+import abc
+import time
+import sqlite3
+import logging
+import threading
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from utils.calendar_utils import DEFAULT_WORKING_HOURS
+from utils.env import load_env
+from utils.freebusy import free_busy
+from utils.timezone_utils import DEFAULT_TIMEZONE, get_zone, localize
+
+logger = logging.getLogger(__name__)
+
+DAV = "{DAV:}"
+CALDAV = "{urn:ietf:params:xml:ns:caldav}"
+SYNC_COLLECTION = (
+    '<?xml version="1.0" encoding="utf-8"?>'
+    '<d:sync-collection xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:caldav">'
+    '<d:sync-token>{token}</d:sync-token><d:sync-level>1</d:sync-level>'
+    '<d:prop><d:getetag/><c:calendar-data/></d:prop>'
+    '</d:sync-collection>'
+)
+MAX_SYNC_PAGES = 100  # truncated sync-collection responses followed before giving up
+DURATION_PATTERN = re.compile(r"^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+
+CalendarEvent = namedtuple(
+    "CalendarEvent", "resource uid start end busy timezone rrule exdates recurrence_id")
+CalendarEvent.__doc__ = (
+    "One VEVENT: start/end are aware UTC datetimes, exdates and recurrence_id epoch seconds; "
+    "resource is the file, feed or CalDAV href it came from.")
+
+SyncResult = namedtuple("SyncResult", "resources deleted token full")
+SyncResult.__doc__ = (
+    "Changes since a sync token: resources maps each changed resource to its events, deleted lists "
+    "removed resources; full means resources is the whole calendar and replaces the cache.")
+
+
+class InvalidSyncToken(Exception):
+    """Raised by a source that no longer accepts a sync token; the caller resyncs from scratch."""
+
+
+def unfold(text: str) -> list:
+    """Split iCalendar text into logical lines, joining folded continuation lines."""
+    lines = []
+    for line in text.replace("\r\n", "\n").split("\n"):
+        if line[:1] in (" ", "\t") and lines:
+            lines[-1] += line[1:]
+        elif line:
+            lines.append(line)
+    return lines
+
+
+def _parse_property(line: str) -> tuple:
+    """Split 'NAME;PARAM=VALUE:value' into (name, params, value)."""
+    head, _, value = line.partition(":")
+    name, *params = head.split(";")
+    return name.upper(), dict(param.split("=", 1) for param in params if "=" in param), value
+
+
+def _zone_name(tz_name: str, default: str) -> str:
+    """Return tz_name if it is an IANA zone, else default."""
+    if not tz_name:
+        return default
+    try:
+        get_zone(tz_name.strip('"'))
+        return tz_name.strip('"')
+    except Exception:
+        logger.warning(f"Unknown TZID {tz_name}, using {default}")
+        return default
+
+
+def parse_ical_datetime(value: str, params: dict, default_timezone: str) -> tuple:
+    """
+    Parse a DATE or DATE-TIME value.
+
+    Returns:
+        tuple: (aware UTC datetime, timezone name the value is expressed in, whether it is a DATE)
+    """
+    tz_name = _zone_name(params.get("TZID"), default_timezone)
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return localize(datetime.strptime(value, "%Y%m%d"), tz_name).astimezone(dt_timezone.utc), tz_name, True
+    if value.endswith("Z"):
+        return datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=dt_timezone.utc), "UTC", False
+    naive = datetime.strptime(value, "%Y%m%dT%H%M%S")
+    return localize(naive, tz_name).astimezone(dt_timezone.utc), tz_name, False
+
+
+def parse_duration(value: str) -> timedelta:
+    """Parse an iCalendar DURATION such as PT30M or P1DT2H."""
+    match = DURATION_PATTERN.match(value)
+    if not match:
+        raise ValueError(f"Invalid DURATION {value}")
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    duration = timedelta(weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+                         minutes=int(minutes or 0), seconds=int(seconds or 0))
+    return -duration if sign == "-" else duration
+
+
+def parse_ics(text: str, default_timezone: str = DEFAULT_TIMEZONE, resource: str = None) -> list:
+    """
+    Parse the VEVENTs of an iCalendar document.
+
+    Args:
+        text: iCalendar text
+        default_timezone: Timezone of floating times and unknown TZIDs
+        resource: Resource the events are attributed to (defaults to each event's UID)
+
+    Returns:
+        list: CalendarEvent entries; cancelled and transparent events are kept with busy=False
+    """
+    events = []
+    properties = None
+    nested = 0
+    for line in unfold(text):
+        upper = line.upper()
+        if upper == "BEGIN:VEVENT":
+            properties = []
+        elif properties is not None and upper.startswith("BEGIN:"):
+            # Components inside an event (VALARM) carry their own DURATION etc.
+            nested += 1
+        elif properties is not None and nested and upper.startswith("END:"):
+            nested -= 1
+        elif nested:
+            continue
+        elif upper == "END:VEVENT" and properties is not None:
+            try:
+                events.append(_event_from_properties(properties, default_timezone, resource))
+            except (KeyError, ValueError) as e:
+                logger.warning(f"Skipping unparsable VEVENT in {resource or 'calendar'}: {e}")
+            properties = None
+        elif properties is not None:
+            properties.append(_parse_property(line))
+    return events
+
+
+def _event_from_properties(properties: list, default_timezone: str, resource: str) -> CalendarEvent:
+    values = {}
+    exdates = []
+    for name, params, value in properties:
+        if name == "EXDATE":
+            exdates.extend(parse_ical_datetime(item, params, default_timezone)[0].timestamp()
+                           for item in value.split(","))
+        elif name not in values:
+            values[name] = (params, value)
+
+    start, tz_name, is_date = parse_ical_datetime(values["DTSTART"][1], values["DTSTART"][0], default_timezone)
+    if "DTEND" in values:
+        end = parse_ical_datetime(values["DTEND"][1], values["DTEND"][0], default_timezone)[0]
+    elif "DURATION" in values:
+        end = start + parse_duration(values["DURATION"][1])
+    else:
+        end = start + (timedelta(days=1) if is_date else timedelta(0))
+
+    recurrence_id = None
+    if "RECURRENCE-ID" in values:
+        params, value = values["RECURRENCE-ID"]
+        recurrence_id = parse_ical_datetime(value, params, default_timezone)[0].timestamp()
+
+    uid = values["UID"][1]
+    busy = (values.get("TRANSP", ({}, "OPAQUE"))[1].upper() != "TRANSPARENT"
+            and values.get("STATUS", ({}, ""))[1].upper() != "CANCELLED")
+    return CalendarEvent(resource or uid, uid, start, end, busy, tz_name,
+                         values.get("RRULE", ({}, None))[1], tuple(exdates), recurrence_id)
+
+
+class CalendarSource(abc.ABC):
+    """A calendar that can report what changed since a sync token."""
+
+    name = "calendar"
+
+    @abc.abstractmethod
+    def sync(self, token: str = None) -> SyncResult:
+        """
+        Return the changes since token (everything when token is None).
+
+        Raises:
+            InvalidSyncToken: The token expired; sync again with token=None
+        """
+
+
+class ICSSource(CalendarSource):
+    """A local .ics file or an http(s) ICS feed, re-read only when it changed."""
+
+    def __init__(self, location: str, timezone: str = DEFAULT_TIMEZONE, session=None):
+        """
+        Args:
+            location: Path of an .ics file or an http(s) URL
+            timezone: Timezone of floating times and unknown TZIDs
+            session: requests session for feeds (defaults to a new one)
+        """
+        self.location = location
+        self.name = location
+        self.timezone = timezone
+        self.session = session
+        self.remote = location.startswith(("http://", "https://"))
+
+    def sync(self, token: str = None) -> SyncResult:
+        try:
+            if self.remote:
+                return self._sync_feed(token)
+            stat = os.stat(self.location)
+            current = f"{stat.st_mtime_ns}:{stat.st_size}"
+            if current == token:
+                return SyncResult({}, [], token, False)
+            with open(self.location, encoding="utf-8") as handle:
+                text = handle.read()
+            return self._full(text, current)
+        except Exception as e:
+            logger.error(f"Error syncing calendar {self.location}: {e}")
+            raise
+
+    def _sync_feed(self, token: str) -> SyncResult:
+        if self.session is None:
+            import requests
+            self.session = requests.Session()
+        headers = {"If-None-Match": token} if token else {}
+        response = self.session.get(self.location, headers=headers, timeout=30)
+        if response.status_code == 304:
+            return SyncResult({}, [], token, False)
+        response.raise_for_status()
+        current = response.headers.get("ETag") or response.headers.get("Last-Modified")
+        return self._full(response.text, current)
+
+    def _full(self, text: str, token: str) -> SyncResult:
+        resources = {}
+        for event in parse_ics(text, self.timezone):
+            resources.setdefault(event.resource, []).append(event)
+        return SyncResult(resources, [], token, True)
+
+
+class CalDAVSource(CalendarSource):
+    """A CalDAV calendar collection synced incrementally with the sync-collection REPORT."""
+
+    def __init__(self, url: str, timezone: str = DEFAULT_TIMEZONE, session=None, auth=None):
+        """
+        Args:
+            url: Collection URL
+            timezone: Timezone of floating times and unknown TZIDs
+            session: requests session (defaults to a new one)
+            auth: requests auth for the server
+        """
+        self.url = url
+        self.name = url
+        self.timezone = timezone
+        self.session = session
+        self.auth = auth
+
+    def sync(self, token: str = None) -> SyncResult:
+        """
+        Return the changes since token, following truncated responses.
+
+        A server that limits the result size answers with part of the changes,
+        a 507 number-of-matches-within-limits marker and a token for that
+        part (RFC 6578 section 3.6); the REPORT is repeated from that token
+        until a complete response arrives, and the pages are merged.
+        """
+        if self.session is None:
+            import requests
+            self.session = requests.Session()
+        try:
+            resources, deleted = {}, {}
+            current = token
+            for _ in range(MAX_SYNC_PAGES):
+                result, truncated = self._report(current)
+                for href in result.deleted:
+                    resources.pop(href, None)
+                    deleted[href] = None
+                for href, events in result.resources.items():
+                    deleted.pop(href, None)
+                    resources[href] = events
+                if not truncated:
+                    return SyncResult(resources, list(deleted), result.token, not token)
+                if not result.token or result.token == current:
+                    raise ValueError("truncated sync-collection response without a new sync token")
+                logger.info(f"Sync of {self.url} truncated by the server, continuing from the partial token")
+                current = result.token
+            raise ValueError(f"sync-collection still truncated after {MAX_SYNC_PAGES} requests")
+        except InvalidSyncToken:
+            raise
+        except Exception as e:
+            logger.error(f"Error syncing CalDAV collection {self.url}: {e}")
+            raise
+
+    def _report(self, token: str) -> tuple:
+        """Run one sync-collection REPORT; returns (SyncResult, whether the response was truncated)."""
+        response = self.session.request(
+            "REPORT", self.url, data=SYNC_COLLECTION.format(token=token or "").encode(), auth=self.auth,
+            headers={"Content-Type": "application/xml; charset=utf-8", "Depth": "1"}, timeout=30)
+        if token and response.status_code in (403, 409) and b"valid-sync-token" in response.content:
+            raise InvalidSyncToken(token)
+        response.raise_for_status()
+        return self._parse_multistatus(response.content, full=not token)
+
+    def _parse_multistatus(self, content: bytes, full: bool) -> tuple:
+        root = ET.fromstring(content)
+        resources, deleted = {}, []
+        truncated = root.find(f".//{DAV}number-of-matches-within-limits") is not None
+        for response in root.findall(f"{DAV}response"):
+            href = response.findtext(f"{DAV}href")
+            status = response.findtext(f"{DAV}status") or ""
+            if " 507 " in status:
+                # The collection itself: the server stopped before listing every change
+                truncated = True
+                continue
+            if " 404 " in status:
+                deleted.append(href)
+                continue
+            data = response.findtext(f".//{CALDAV}calendar-data")
+            if data:
+                resources[href] = parse_ics(data, self.timezone, resource=href)
+        return SyncResult(resources, deleted, root.findtext(f"{DAV}sync-token"), full), truncated
+
+
+class EventCache:
+    """SQLite cache of synced events and the sync token of each source."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS events (
+            source TEXT NOT NULL,
+            resource TEXT NOT NULL,
+            uid TEXT NOT NULL,
+            start REAL NOT NULL,
+            end REAL NOT NULL,
+            busy INTEGER NOT NULL,
+            timezone TEXT NOT NULL,
+            rrule TEXT,
+            exdates TEXT NOT NULL,
+            recurrence_id REAL
+        );
+        CREATE INDEX IF NOT EXISTS events_by_resource ON events (source, resource);
+        CREATE INDEX IF NOT EXISTS events_by_start ON events (source, start);
+        CREATE TABLE IF NOT EXISTS sync_state (
+            source TEXT PRIMARY KEY,
+            token TEXT,
+            synced_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        """
+        Args:
+            path: SQLite database file (in memory by default)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+
+    def token(self, source: str):
+        """Sync token stored for a source, or None before its first sync."""
+        with self._lock:
+            row = self._conn.execute("SELECT token FROM sync_state WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else None
+
+    def apply(self, source: str, result: SyncResult) -> None:
+        """Apply a sync result: replace changed resources, drop deleted ones and store the new token."""
+        rows = [
+            (source, event.resource, event.uid, event.start.timestamp(), event.end.timestamp(), int(event.busy),
+             event.timezone, event.rrule, ",".join(repr(value) for value in event.exdates), event.recurrence_id)
+            for events in result.resources.values() for event in events
+        ]
+        with self._lock, self._conn:
+            if result.full:
+                self._conn.execute("DELETE FROM events WHERE source = ?", (source,))
+            else:
+                self._conn.executemany("DELETE FROM events WHERE source = ? AND resource = ?",
+                                       [(source, resource) for resource in (*result.resources, *result.deleted)])
+            self._conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?, ?)", (source, result.token, time.time()))
+
+    def events(self, source: str, start: float = None, end: float = None) -> list:
+        """
+        Cached events of a source, limited to those that may overlap [start, end).
+
+        Recurring events and RECURRENCE-ID overrides are always returned: occurrences
+        are filtered on expansion, and an override moved out of the window must
+        still suppress the instance it replaces.
+        """
+        query = "SELECT resource, uid, start, end, busy, timezone, rrule, exdates, recurrence_id FROM events " \
+                "WHERE source = ?"
+        params = [source]
+        if start is not None and end is not None:
+            query += " AND (rrule IS NOT NULL OR recurrence_id IS NOT NULL OR (end > ? AND start < ?))"
+            params += [start, end]
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [
+            CalendarEvent(resource, uid, datetime.fromtimestamp(event_start, dt_timezone.utc),
+                          datetime.fromtimestamp(event_end, dt_timezone.utc), bool(busy), tz_name, rrule,
+                          tuple(float(value) for value in exdates.split(",") if value), recurrence_id)
+            for resource, uid, event_start, event_end, busy, tz_name, rrule, exdates, recurrence_id in rows
+        ]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class InviteeCalendar:
+    """A calendar source plus its cache: one delta sync per availability() call."""
+
+    def __init__(self, source: CalendarSource, cache: EventCache = None, timezone: str = DEFAULT_TIMEZONE,
+                 working_hours=DEFAULT_WORKING_HOURS):
+        """
+        Args:
+            source: Calendar source to sync from
+            cache: Event cache (defaults to an in-memory one)
+            timezone: Timezone of the invitee's working hours
+            working_hours: (start_hour, end_hour) for Monday-Friday, or {weekday: (start_hour, end_hour)}
+        """
+        self.source = source
+        self.cache = cache or EventCache()
+        self.timezone = timezone
+        self.working_hours = working_hours
+        self._sync_lock = threading.Lock()
+
+    def sync(self) -> SyncResult:
+        """
+        Fetch the changes since the cached token and apply them.
+
+        If the source is unreachable but an earlier sync is cached, the cached
+        events are kept and a warning is logged.
+        """
+        with self._sync_lock:
+            token = self.cache.token(self.source.name)
+            try:
+                try:
+                    result = self.source.sync(token)
+                except InvalidSyncToken:
+                    logger.info(f"Sync token of {self.source.name} expired, resyncing from scratch")
+                    result = self.source.sync(None)
+            except Exception as e:
+                if token is None:
+                    raise
+                logger.warning(f"Using cached events of {self.source.name}, sync failed: {e}")
+                return SyncResult({}, [], token, False)
+            self.cache.apply(self.source.name, result)
+            logger.info(f"Synced {self.source.name}: {len(result.resources)} changed, "
+                        f"{len(result.deleted)} deleted{' (full)' if result.full else ''}")
+            return result
+
+    def availability(self, timezone: str = None, days: int = 7, slot_minutes: int = 30, start=None,
+                     sync: bool = True) -> dict:
+        """
+        The invitee's free working-hours slots in Calendly format, after one delta sync.
+
+        Args:
+            timezone: Timezone of the returned calendar (defaults to the invitee's)
+            days: Number of days, starting at start
+            slot_minutes: Slot length in minutes
+            start: First day (defaults to today)
+            sync: Sync with the source first
+
+        Returns:
+            dict: Calendar data in Calendly format
+        """
+        if sync:
+            self.sync()
+        timezone = timezone or self.timezone
+        start = start or datetime.now().date()
+        window_start = localize(datetime(start.year, start.month, start.day), timezone)
+        window_end = localize(datetime.combine(start + timedelta(days=days), datetime.min.time()), timezone)
+        events = self.cache.events(self.source.name, window_start.timestamp(), window_end.timestamp())
+        return free_busy(events, timezone, days=days, slot_minutes=slot_minutes,
+                         working_hours=self.working_hours, start=start)
+
+
+def invitee_calendar_from_env():
+    """
+    The invitee calendar configured by CALENDLYAI_INVITEE_ICS (file or feed URL) or
+    CALENDLYAI_INVITEE_CALDAV (collection URL), cached in CALENDLYAI_INVITEE_CACHE; None if unset.
+    """
+    load_env()
+    timezone = os.getenv("CALENDLYAI_INVITEE_TIMEZONE", DEFAULT_TIMEZONE)
+    if os.getenv("CALENDLYAI_INVITEE_CALDAV"):
+        source = CalDAVSource(os.environ["CALENDLYAI_INVITEE_CALDAV"], timezone)
+    elif os.getenv("CALENDLYAI_INVITEE_ICS"):
+        source = ICSSource(os.environ["CALENDLYAI_INVITEE_ICS"], timezone)
+    else:
+        return None
+    return InviteeCalendar(source, EventCache(os.getenv("CALENDLYAI_INVITEE_CACHE", ":memory:")), timezone)
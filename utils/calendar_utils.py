@@ -1,122 +1,429 @@
+import heapq
 import random
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from itertools import islice
 
-def generate_mock_calendar():
+from utils.timezone_utils import DEFAULT_TIMEZONE, localize, parse_slot, utc_to_local
+
+DEFAULT_WORKING_HOURS = (9, 17)
+WORKDAYS = (0, 1, 2, 3, 4)  # Monday-Friday
+
+
+def _normalize_working_hours(working_hours) -> tuple:
     """
-    Generate a mock calendar in Calendly API format with mostly busy time slots during business hours.
+    Expand a working-hours profile to one (start_hour, end_hour) or None per weekday.
     
-    Returns:
-        dict: Formatted calendar data matching Calendly API structure
+    Accepts (start, end) for Monday-Friday, or {weekday: (start, end)} where
+    Monday is 0 and missing weekdays are off. Hours may be fractional (8.5).
     """
-    # Calculate today and format it properly
-    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_str = today.strftime("%Y-%m-%d")
+    if isinstance(working_hours, dict):
+        return tuple(tuple(working_hours[weekday]) if weekday in working_hours else None for weekday in range(7))
+    return tuple(tuple(working_hours) if weekday in WORKDAYS else None for weekday in range(7))
+
+
+@lru_cache(maxsize=32)
+def _slot_grid(timezone: str, start: date, days: int, slot_minutes: int, working_hours: tuple) -> tuple:
+    """
+    Build the candidate slots of every day once, as (date string, slot ISO strings) pairs.
     
+    Every calendar generated on the same grid reuses these strings, so a
+    corpus only pays for localizing and formatting each slot once.
+    """
+    grid = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        hours = working_hours[day.weekday()]
+        slots = ()
+        if hours is not None:
+            midnight = datetime(day.year, day.month, day.day)
+            first, last = int(hours[0] * 60), int(hours[1] * 60)
+            slots = tuple(
+                localize(midnight + timedelta(minutes=minute), timezone).isoformat(timespec="seconds")
+                for minute in range(first, last, slot_minutes)
+            )
+        grid.append((day.isoformat(), slots))
+    return tuple(grid)
+
+
+@lru_cache(maxsize=32)
+def _slot_starts(timezone: str, start: date, days: int, slot_minutes: int, working_hours: tuple) -> tuple:
+    """Epoch seconds of every slot of a grid, in grid order."""
+    return tuple(parse_slot(slot).timestamp()
+                 for _, slots in _slot_grid(timezone, start, days, slot_minutes, working_hours) for slot in slots)
+
+
+def _calendar_from_grid(grid: tuple, today: str, timezone: str, available) -> dict:
+    """Assemble a Calendly-format calendar from a slot grid and a flat per-slot availability sequence."""
     calendly_data = {
         "invitee_publisher_error": False,
-        "today": today_str,
-        "availability_timezone": "America/Los_Angeles",
+        "today": today,
+        "availability_timezone": timezone,
         "days": []
     }
+    index = 0
+    for day_str, slots in grid:
+        if not slots:
+            # Days off are unavailable
+            calendly_data["days"].append({"date": day_str, "status": "unavailable", "spots": [], "enabled": False})
+            continue
+        spots = [
+            {"status": "available", "start_time": slot, "invitees_remaining": 1}
+            for slot, free in zip(slots, available[index:index + len(slots)]) if free
+        ]
+        index += len(slots)
+        calendly_data["days"].append({
+            "date": day_str,
+            "status": "available" if spots else "unavailable",
+            "spots": spots,
+            "enabled": True
+        })
+    return calendly_data
+
+
+def _busy_rate(busy_rate, rng: random.Random) -> float:
+    """Draw one calendar's busy rate from a constant or a (low, high) uniform range."""
+    if isinstance(busy_rate, (tuple, list)):
+        return rng.uniform(*busy_rate)
+    return busy_rate
+
+
+def generate_calendar_corpus(count: int, timezone: str = DEFAULT_TIMEZONE, days: int = 7, slot_minutes: int = 30,
+                             working_hours=DEFAULT_WORKING_HOURS, busy_rate=0.8, seed: int = None,
+                             start: date = None) -> list:
+    """
+    Generate many synthetic calendars in Calendly API format.
     
-    # Business hours - 9:00 to 17:00 (5 PM) in 30-minute increments
-    business_start = 9
-    business_end = 17
+    All calendars share one slot grid; only their availability differs.
+    With numpy installed the availability of the whole corpus is drawn in
+    one vectorized call, otherwise slot by slot from random.Random. A given
+    seed reproduces the same corpus with the same backend.
     
-    # Process each day (today + 7 days)
-    for i in range(7):
-        current_date = today + timedelta(days=i)
-        current_date_str = current_date.strftime("%Y-%m-%d")
+    Args:
+        count: Number of calendars
+        timezone: IANA timezone the working hours are expressed in
+        days: Horizon in days, starting at start
+        slot_minutes: Slot granularity in minutes
+        working_hours: (start_hour, end_hour) for Monday-Friday, or {weekday: (start_hour, end_hour)}
+        busy_rate: Probability a slot is busy, or a (low, high) range each calendar draws its rate from
+        seed: Seed for reproducible corpora (None for a random one)
+        start: First day (defaults to today)
         
-        # Weekend days are unavailable
-        if current_date.weekday() >= 5:  # Saturday or Sunday
-            day_data = {
-                "date": current_date_str,
-                "status": "unavailable",
-                "spots": [],
-                "enabled": False
-            }
-            calendly_data["days"].append(day_data)
-            continue
+    Returns:
+        list: count calendars in Calendly format
+    """
+    start = start or datetime.now().date()
+    grid = _slot_grid(timezone, start, days, slot_minutes, _normalize_working_hours(working_hours))
+    slots_per_calendar = sum(len(slots) for _, slots in grid)
+    rng = random.Random(seed)
+    rates = [_busy_rate(busy_rate, rng) for _ in range(count)]
+
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+
+    today = start.isoformat()
+    if np is not None:
+        draws = np.random.default_rng(seed).random((count, slots_per_calendar))
+        masks = (draws >= np.asarray(rates)[:, None]).tolist()
+    else:
+        masks = [[rng.random() >= rate for _ in range(slots_per_calendar)] for rate in rates]
+    return [_calendar_from_grid(grid, today, timezone, mask) for mask in masks]
+
+
+def generate_mock_calendar(timezone: str = DEFAULT_TIMEZONE, days: int = 7, slot_minutes: int = 30,
+                           working_hours=DEFAULT_WORKING_HOURS, busy_rate=0.8, seed: int = None,
+                           start: date = None):
+    """
+    Generate a mock calendar in Calendly API format with mostly busy time slots during business hours.
+    
+    Args:
+        timezone: IANA timezone the business hours are expressed in
+        days: Number of days to generate, starting today
+        slot_minutes: Slot granularity in minutes
+        working_hours: (start_hour, end_hour) for Monday-Friday, or {weekday: (start_hour, end_hour)}
+        busy_rate: Probability a slot is busy, or a (low, high) range to draw it from
+        seed: Seed for a reproducible calendar (None draws from the global random module)
+        start: First day (defaults to today)
         
-        # Create available spots for weekdays
-        spots = []
+    Returns:
+        dict: Formatted calendar data matching Calendly API structure
+    """
+    start = start or datetime.now().date()
+    grid = _slot_grid(timezone, start, days, slot_minutes, _normalize_working_hours(working_hours))
+    rng = random.Random(seed) if seed is not None else random
+    rate = _busy_rate(busy_rate, rng)
+    available = [rng.random() >= rate for _, slots in grid for _ in slots]
+    return _calendar_from_grid(grid, start.isoformat(), timezone, available)
+
+
+def free_intervals(busy, start: float, end: float):
+    """
+    Lazily yield the gaps between busy intervals within [start, end).
+    
+    Args:
+        busy: Sorted, disjoint (start, end) epoch-second pairs (e.g. from utils.freebusy.iter_busy())
+        start: Window start in epoch seconds
+        end: Window end in epoch seconds, exclusive
         
-        # Generate all possible time slots
-        for hour in range(business_start, business_end):
-            for minute in [0, 30]:
-                # Create datetime with timezone info
-                slot_time = current_date.replace(hour=hour, minute=minute)
-                # Format with timezone offset (-07:00 for PDT)
-                slot_time_str = slot_time.strftime("%Y-%m-%dT%H:%M:00-07:00")
-                
-                # Make most slots busy (80% chance of being busy)
-                if random.random() < 0.8:
-                    continue
-                
-                # Add available spot
-                spots.append({
-                    "status": "available",
-                    "start_time": slot_time_str,
-                    "invitees_remaining": 1
-                })
+    Yields:
+        tuple: (start, end) free intervals in epoch seconds, ascending
+    """
+    cursor = start
+    for busy_start, busy_end in busy:
+        if busy_end <= cursor:
+            continue
+        if busy_start >= end:
+            break
+        if busy_start > cursor:
+            yield cursor, busy_start
+        cursor = busy_end
+        if cursor >= end:
+            return
+    if cursor < end:
+        yield cursor, end
+
+
+def calendar_from_free(free, timezone: str = DEFAULT_TIMEZONE, days: int = 7, slot_minutes: int = 30,
+                       working_hours=DEFAULT_WORKING_HOURS, start: date = None) -> dict:
+    """
+    Build a Calendly-format calendar from free intervals, so real calendars plug into the matcher.
+    
+    A working-hours slot is available when it fits inside one free interval.
+    Slots and intervals are swept together once, so the cost is linear in
+    both and free is only consumed as far as the last slot.
+    
+    Args:
+        free: Sorted, disjoint (start, end) free intervals in epoch seconds (e.g. from free_intervals())
+        timezone: IANA timezone the working hours are expressed in
+        days: Number of days to cover, starting at start
+        slot_minutes: Slot length in minutes
+        working_hours: (start_hour, end_hour) for Monday-Friday, or {weekday: (start_hour, end_hour)}
+        start: First day (defaults to today)
         
-        # Add day data
-        day_data = {
-            "date": current_date_str,
-            "status": "available" if spots else "unavailable",
-            "spots": spots,
-            "enabled": True
-        }
+    Returns:
+        dict: Calendar data in Calendly format
+    """
+    start = start or datetime.now().date()
+    hours = _normalize_working_hours(working_hours)
+    length = slot_minutes * 60
+    intervals = iter(free)
+    interval = next(intervals, None)
+    available = []
+    for begin in _slot_starts(timezone, start, days, slot_minutes, hours):
+        # Intervals ending before this slot ends cannot hold any later slot either
+        while interval is not None and interval[1] < begin + length:
+            interval = next(intervals, None)
+        available.append(interval is not None and interval[0] <= begin)
+    return _calendar_from_grid(_slot_grid(timezone, start, days, slot_minutes, hours), start.isoformat(),
+                               timezone, available)
+
+
+def iter_available_spots(calendar):
+    """
+    Lazily yield available spot times from a calendar with Calendly-like structure.
+    
+    Days are consumed in date order and each day's spots are sorted on their
+    own, so only one day's spots are held in memory at a time. Calendly
+    returns days in chronological order already, which the sort leaves as is.
+    
+    Args:
+        calendar (dict): Calendar data in Calendly format
         
-        calendly_data["days"].append(day_data)
+    Yields:
+        datetime: Aware UTC datetimes in ascending order
+    """
+    # merge_intersect and the early stops downstream rely on an ascending stream
+    for day in sorted(calendar.get('days', []), key=lambda day: day.get('date', '')):
+        if day['status'] == 'available' and day.get('enabled', True):
+            day_times = sorted(
+                parse_slot(spot['start_time'])
+                for spot in day.get('spots', [])
+                if spot['status'] == 'available' and spot.get('invitees_remaining', 0) > 0
+            )
+            yield from day_times
+
+
+def merge_intersect(*streams):
+    """
+    Lazily intersect ascending streams of comparable values.
     
-    return calendly_data
+    Each stream is advanced at most once per step, so memory stays constant
+    regardless of stream length and duplicates within a stream are skipped.
+    
+    Args:
+        *streams: Iterables sorted in ascending order
+        
+    Yields:
+        Values present in every stream, in ascending order
+    """
+    if not streams:
+        return
+    iterators = [iter(stream) for stream in streams]
+    try:
+        current = [next(iterator) for iterator in iterators]
+        last = None
+        while True:
+            highest = max(current)
+            if all(value == highest for value in current):
+                if highest != last:
+                    yield highest
+                    last = highest
+                current = [next(iterator) for iterator in iterators]
+                continue
+            # Advance every stream that is behind the current maximum
+            for index, iterator in enumerate(iterators):
+                while current[index] < highest:
+                    current[index] = next(iterator)
+    except StopIteration:
+        return
 
 
+def iter_matching_times(calendar1, calendar2):
+    """
+    Lazily yield matching available time slots between two calendars.
+    
+    Returns:
+        generator: Aware UTC datetimes available in both calendars, ascending
+    """
+    return merge_intersect(iter_available_spots(calendar1), iter_available_spots(calendar2))
 
-def find_matching_times(calendar1, calendar2):
+
+def take_acceptable(candidates, limit: int, predicate=None):
     """
-    Find matching available time slots between two calendars with Calendly-like structure.
+    Take the first `limit` candidates that satisfy predicate, stopping early.
+    
+    Args:
+        candidates: Iterable of candidate slots
+        limit (int): Number of candidates to collect (None for all)
+        predicate: Optional callable deciding whether a candidate is acceptable
+        
+    Returns:
+        list: Up to `limit` acceptable candidates in stream order
+    """
+    if predicate is not None:
+        candidates = filter(predicate, candidates)
+    return list(islice(candidates, limit))
+
+
+def top_k(candidates, k: int, key=None):
+    """
+    Rank a stream and keep only the k best candidates (lowest key first).
+    
+    Uses a bounded heap, so memory is O(k) however long the stream is.
+    
+    Args:
+        candidates: Iterable of candidate slots
+        k (int): Number of candidates to keep
+        key: Optional scoring callable; lower scores rank higher
+        
+    Returns:
+        list: Up to k candidates ordered best first
     """
-    # Create sets of available times from both calendars
-    times1 = set()
-    times2 = set()
+    return heapq.nsmallest(k, candidates, key=key)
+
+
+def score_slot(slot, timezone: str = DEFAULT_TIMEZONE, preferred_hour: float = 11.0,
+               business_hours: tuple = (9, 17)) -> float:
+    """
+    Score a slot locally; lower is better.
     
-    # Helper function to extract times from a calendar
-    def extract_times(calendar, time_set):
-        for day in calendar.get('days', []):
-            if day['status'] == 'available' and day.get('enabled', True):
-                for spot in day.get('spots', []):
-                    if spot['status'] == 'available' and spot.get('invitees_remaining', 0) > 0:
-                        # Parse the ISO format time string
-                        time = datetime.fromisoformat(spot['start_time'])
-                        time_set.add(time)
+    Slots close to the preferred local hour score best and slots outside
+    business hours are pushed behind every in-hours slot.
     
-    # Extract times from both calendars
-    extract_times(calendar1, times1)
-    extract_times(calendar2, times2)
+    Args:
+        slot (datetime): Aware UTC datetime
+        timezone (str): IANA timezone business hours are expressed in
+        preferred_hour (float): Ideal local start hour
+        business_hours (tuple): (start_hour, end_hour) in local time
+        
+    Returns:
+        float: Slot score
+    """
+    local_time = utc_to_local(slot, timezone)
+    hour = local_time.hour + local_time.minute / 60
+    score = abs(hour - preferred_hour)
+    if not business_hours[0] <= hour < business_hours[1]:
+        score += 24
+    return score
+
+
+def select_candidates(matching_times, k: int, timezone: str = DEFAULT_TIMEZONE, score=None):
+    """
+    Pre-rank matching times and keep the top k, spread across days.
     
-    # Find intersection of available times
-    matching_times = sorted(times1.intersection(times2))
+    The best k slots of each local day are kept in bounded heaps, then days
+    are visited round-robin (best slot of every day first) until k slots are
+    picked, so the prompt never collapses onto a single day.
     
-    return matching_times
+    Args:
+        matching_times: Iterable of aware UTC datetimes
+        k (int): Number of candidates to keep (None keeps everything)
+        timezone (str): IANA timezone used for day grouping and scoring
+        score: Optional scoring callable taking a slot; lower is better
+        
+    Returns:
+        list: Up to k aware UTC datetimes in chronological order
+    """
+    if k is None:
+        return list(matching_times)
+    if k <= 0:
+        return []
+    score = score or (lambda slot: score_slot(slot, timezone))
+
+    per_day = {}
+    for slot in matching_times:
+        day = utc_to_local(slot, timezone).date()
+        heap = per_day.setdefault(day, [])
+        # Max-heap on score (negated) so the worst kept slot is evicted first
+        entry = (-score(slot), -slot.timestamp(), slot)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    ranked_days = [
+        [entry[2] for entry in sorted(per_day[day], reverse=True)]
+        for day in sorted(per_day)
+    ]
+
+    selected = []
+    for round_index in range(k):
+        for day_slots in ranked_days:
+            if round_index < len(day_slots):
+                selected.append(day_slots[round_index])
+                if len(selected) == k:
+                    return sorted(selected)
+    return sorted(selected)
+
+
+def find_matching_times(calendar1, calendar2):
+    """
+    Find matching available time slots between two calendars with Calendly-like structure.
+    
+    Returns:
+        list: Sorted aware UTC datetimes available in both calendars
+    """
+    return list(iter_matching_times(calendar1, calendar2))
 
 
-def format_matches(matching_times):
+def format_matches(matching_times, timezone: str = DEFAULT_TIMEZONE):
     """
     Format matching times in a readable way.
     
     Args:
-        matching_times (list): List of datetime objects
+        matching_times (iterable): Aware UTC datetime objects
+        timezone (str): IANA timezone the times are presented in
         
     Returns:
         str: Formatted string of times
     """
     formatted_times = []
     for time in matching_times:
-        iso_format = time.strftime("%Y-%m-%dT%H:%M:%S-07:00")
-        readable_format = time.strftime("%A, %B %d, %Y at %I:%M %p")
+        local_time = utc_to_local(time, timezone)
+        iso_format = local_time.isoformat(timespec="seconds")
+        readable_format = local_time.strftime("%A, %B %d, %Y at %I:%M %p")
         formatted_times.append(f"{readable_format} ({iso_format})")
     
     # Join the times with line breaks for better readability in the prompt
@@ -3,16 +3,151 @@ Utility functions for interacting with the Calendly API
 """
 
 import os
-import traceback
+import time
 import logging
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime, timedelta
-from langchain_openai.chat_models import ChatOpenAI
-from langchain.output_parsers import ResponseSchema, StructuredOutputParser
-from prompts.scheduling_prompts import scheduling_prompt
+from functools import lru_cache
+from prompts.scheduling_prompts import scheduling_prompt, batch_scheduling_prompt
+from utils.calendar_utils import format_matches, iter_available_spots, score_slot, select_candidates
+from utils.env import load_env
+from utils.llm_providers import get_chat_model
+from utils.metrics import HTTP_POOL
+from utils.rate_limit import get_upstream
+from utils.slot_reservations import DEFAULT_LEASE_SECONDS
+from utils.snapshot_store import record_snapshot
+from utils.timezone_utils import DEFAULT_TIMEZONE, format_slot, parse_slot, utc_to_local
 
 logger = logging.getLogger(__name__)
 
+HTTP_TIMEOUT = 15  # seconds per Calendly API request
+DEFAULT_CALENDLY_BASE_URL = "https://calendly.com"
+DEFAULT_CALENDLY_API_URL = "https://api.calendly.com"
+
+_http_session = None
+_http_session_lock = threading.Lock()
+_response_hooks = []
+
+def calendly_base_url() -> str:
+    """
+    Return the Calendly API base URL (CALENDLY_BASE_URL, e.g. a local replay server)
+    """
+    return os.getenv("CALENDLY_BASE_URL", DEFAULT_CALENDLY_BASE_URL).rstrip("/")
+
+def add_response_hook(hook) -> None:
+    """
+    Call hook(response, **kwargs) for every response of the shared HTTP session (e.g. to record it)
+    """
+    with _http_session_lock:
+        _response_hooks.append(hook)
+        if _http_session is not None:
+            _http_session.hooks["response"].append(hook)
+
+def remove_response_hook(hook) -> None:
+    """
+    Undo add_response_hook()
+    """
+    with _http_session_lock:
+        if hook in _response_hooks:
+            _response_hooks.remove(hook)
+        if _http_session is not None and hook in _http_session.hooks["response"]:
+            _http_session.hooks["response"].remove(hook)
+
+def get_http_session() -> requests.Session:
+    """
+    Return the process-wide requests.Session used for Calendly API calls
+
+    Keeps TLS connections alive across bookings; the connection pool size
+    comes from CALENDLYAI_HTTP_POOL_SIZE (default 10) so concurrent workers
+    do not discard connections.
+    """
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            pool_size = int(os.getenv("CALENDLYAI_HTTP_POOL_SIZE", "10"))
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.hooks["response"].extend(_response_hooks)
+            _http_session = session
+        return _http_session
+
+def close_http_session() -> None:
+    """
+    Close the shared HTTP session (a new one is created on next use)
+    """
+    global _http_session
+    with _http_session_lock:
+        if _http_session is not None:
+            _http_session.close()
+            _http_session = None
+
+def http_pool_utilization() -> dict:
+    """
+    Return connection counts of the shared HTTP session by state
+
+    The counts come from requests/urllib3 internals (the adapter's pool size
+    and each pool's connection queue), so they are empty if those change shape.
+
+    Returns:
+        dict: {"max": pool size per host, "in_use": checked-out connections, "idle": open idle connections}
+    """
+    with _http_session_lock:
+        session = _http_session
+    if session is None:
+        return {}
+    try:
+        adapter = session.get_adapter("https://")
+        in_use = idle = 0
+        for key in adapter.poolmanager.pools.keys():
+            pool = adapter.poolmanager.pools.get(key)
+            if pool is None or pool.pool is None:
+                continue
+            in_use += pool.pool.maxsize - pool.pool.qsize()
+            idle += sum(1 for conn in list(pool.pool.queue) if conn is not None)
+        return {"max": adapter._pool_maxsize, "in_use": in_use, "idle": idle}
+    except Exception as e:
+        logger.debug(f"Could not read HTTP pool utilization: {e}")
+        return {}
+
+HTTP_POOL.set_function(http_pool_utilization)
+
+_token_encoding_lock = threading.Lock()
+
+def _token_encoding():
+    """
+    The tiktoken encoding, loaded once per process; None when tiktoken or its BPE file is unavailable
+    
+    Loading can take seconds (or fail slowly offline), so concurrent first callers
+    wait for a single load and a failure is cached and logged once like a success.
+    """
+    with _token_encoding_lock:
+        return _load_token_encoding()
+
+@lru_cache(maxsize=1)
+def _load_token_encoding():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken encoding unavailable, estimating token counts: {str(e)}")
+        return None
+
+def estimate_tokens(text: str) -> int:
+    """
+    Count prompt tokens with tiktoken when available, otherwise estimate ~4 chars per token
+    """
+    encoding = _token_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return max(1, len(text) // 4)
+
 def setup_calendly_api(calendly_url: str) -> tuple:
     """
     Set up the Calendly API connection and get event type UUID
@@ -24,9 +159,9 @@ def setup_calendly_api(calendly_url: str) -> tuple:
         profile_slug = url_parts[-2]
         event_type_slug = url_parts[-1].split('?')[0]
         
-        id_url = f"https://calendly.com/api/booking/event_types/lookup?event_type_slug={event_type_slug}&profile_slug={profile_slug}"
+        id_url = f"{calendly_base_url()}/api/booking/event_types/lookup?event_type_slug={event_type_slug}&profile_slug={profile_slug}"
         
-        response = requests.get(id_url)
+        response = get_upstream("calendly").call(get_http_session().get, id_url, timeout=HTTP_TIMEOUT)
         response.raise_for_status()
         
         event_data = response.json()
@@ -39,8 +174,7 @@ def setup_calendly_api(calendly_url: str) -> tuple:
         return uuid
         
     except Exception as e:
-        logger.error(f"Error setting up Calendly API: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.error(f"Error setting up Calendly API: {str(e)}", exc_info=True)
         raise
 
 def get_calendly_availability(uuid: str, timezone: str = "America/Los_Angeles") -> dict:
@@ -48,7 +182,7 @@ def get_calendly_availability(uuid: str, timezone: str = "America/Los_Angeles")
     Get availability data from Calendly
     """
     try:
-        range_url = f"https://calendly.com/api/booking/event_types/{uuid}/calendar/range"
+        range_url = f"{calendly_base_url()}/api/booking/event_types/{uuid}/calendar/range"
         start_date = datetime.now()
         end_date = start_date + timedelta(days=7)
         
@@ -59,23 +193,124 @@ def get_calendly_availability(uuid: str, timezone: str = "America/Los_Angeles")
             "range_end": end_date.strftime("%Y-%m-%d")
         }
         
-        calendar_response = requests.get(range_url, params=params)
+        calendar_response = get_upstream("calendly").call(
+            get_http_session().get, range_url, params=params, timeout=HTTP_TIMEOUT
+        )
         calendar_response.raise_for_status()
         
-        return calendar_response.json()
+        availability = calendar_response.json()
+        record_snapshot(uuid, availability)
+        return availability
         
     except Exception as e:
         logger.error(f"Error getting Calendly availability: {str(e)}")
         raise
 
-def get_suggested_time(overlapping_calendar: str) -> str:
+def is_slot_available(uuid: str, slot: str, timezone: str = DEFAULT_TIMEZONE):
+    """
+    Check whether Calendly still offers a slot for the event type
+    
+    Used to reconcile uncertain submissions. A slot that is still offered
+    shows the booking did not land; a slot that is gone proves nothing (the
+    host or another invitee may have taken it).
+    
+    Returns:
+        bool: Whether the slot is offered, or None if its day is outside the fetched range
+    """
+    target = parse_slot(slot, timezone)
+    availability = get_calendly_availability(uuid, timezone)
+    if utc_to_local(target, timezone).date().isoformat() not in {day.get("date") for day in availability.get("days", [])}:
+        return None
+    return any(spot == target for spot in iter_available_spots(availability))
+
+def _api_headers() -> dict:
+    """Authorization headers for the Calendly v2 API, or None without CALENDLY_API_TOKEN."""
+    load_env()
+    token = os.getenv("CALENDLY_API_TOKEN")
+    return {"Authorization": f"Bearer {token}"} if token else None
+
+@lru_cache(maxsize=4)
+def _api_user_uri(api_url: str, token_header: str) -> str:
+    """URI of the user the API token belongs to (the host whose bookings are looked up)."""
+    response = get_upstream("calendly").call(get_http_session().get, f"{api_url}/users/me",
+                                            headers={"Authorization": token_header}, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+    return response.json()["resource"]["uri"]
+
+def find_scheduled_booking(event_uuid: str, slot: str, email: str, timezone: str = DEFAULT_TIMEZONE):
+    """
+    Look up a booking through the Calendly v2 API
+    
+    Used to reconcile uncertain submissions with positive evidence: the host's
+    scheduled events (CALENDLY_API_TOKEN must belong to the host) are searched
+    for an active event of this event type starting at slot with this invitee.
+    
+    Returns:
+        bool: Whether the booking exists, or None without a token or when the API cannot be read
+    """
+    headers = _api_headers()
+    if headers is None:
+        return None
+    api_url = os.getenv("CALENDLY_API_URL", DEFAULT_CALENDLY_API_URL).rstrip("/")
+    target = parse_slot(slot, timezone)
+    try:
+        params = {
+            "user": _api_user_uri(api_url, headers["Authorization"]),
+            "invitee_email": email,
+            "status": "active",
+            "min_start_time": target.isoformat().replace("+00:00", "Z"),
+            "max_start_time": (target + timedelta(minutes=1)).isoformat().replace("+00:00", "Z"),
+        }
+        response = get_upstream("calendly").call(get_http_session().get, f"{api_url}/scheduled_events",
+                                                params=params, headers=headers, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        events = response.json().get("collection", [])
+    except Exception as e:
+        logger.warning(f"Could not look up scheduled events through the Calendly API: {e}")
+        return None
+    return any(
+        parse_slot(event["start_time"]) == target and event.get("event_type", "").rstrip("/").endswith(event_uuid)
+        for event in events
+    )
+
+def _invoke_llm(llm, messages, candidates: int, metrics: dict = None):
+    """
+    Invoke the chat model, logging candidate count, token counts and latency
+    """
+    start_time = time.perf_counter()
+    response = get_upstream("llm").call(llm.invoke, messages)
+    latency = time.perf_counter() - start_time
+    
+    call_metrics = {
+        "candidates": candidates,
+        "prompt_tokens": estimate_tokens("\n".join(message.content for message in messages)),
+        "completion_tokens": estimate_tokens(response.content),
+        "latency_s": latency
+    }
+    logger.info(
+        "LLM call: candidates=%d prompt_tokens=%d completion_tokens=%d latency=%.3fs",
+        call_metrics["candidates"], call_metrics["prompt_tokens"],
+        call_metrics["completion_tokens"], call_metrics["latency_s"]
+    )
+    if metrics is not None:
+        metrics.update(call_metrics)
+    return response
+
+def get_suggested_time(overlapping_calendar: str, llm=None, metrics: dict = None) -> str:
     """
     Get suggested meeting time from LLM
+    
+    Args:
+        overlapping_calendar: Formatted candidate times for the prompt
+        llm: Chat model to use (defaults to get_chat_model())
+        metrics: Optional dict updated with candidates, prompt/completion tokens and latency
     """
+    from langchain.output_parsers import ResponseSchema, StructuredOutputParser
+
     try:
         response_schema = ResponseSchema(
             name="suggested_time",
-            description="The suggested meeting time in ISO 8601 format with UTC -07:00 timezone",
+            description="The suggested meeting time in ISO 8601 format, copied exactly from the listed times including its UTC offset",
             type="string"
         )
         
@@ -89,13 +324,12 @@ def get_suggested_time(overlapping_calendar: str) -> str:
             format_instructions=format_instructions
         )
         
-        llm = ChatOpenAI(
-            model_name="gpt-4o-mini",
-            temperature=0,
-            openai_api_key=os.getenv("OPENAI_API_KEY")
-        )
+        if llm is None:
+            llm = get_chat_model()
+        
+        candidates = overlapping_calendar.count("\n") + 1 if overlapping_calendar else 0
+        response = _invoke_llm(llm, messages, candidates, metrics)
         
-        response = llm.invoke(messages)
         parsed_response = parser.parse(response.content)
         suggested_time = parsed_response['suggested_time']
         
@@ -104,13 +338,149 @@ def get_suggested_time(overlapping_calendar: str) -> str:
         logger.error(f"Error getting suggested time: {str(e)}")
         raise
 
-def create_booking_url(calendly_url: str, suggested_time: str) -> str:
+def reserve_suggested_time(event_uuid: str, candidates: list, timezone: str, reservations, owner: str,
+                           llm=None, lease_seconds: float = DEFAULT_LEASE_SECONDS):
+    """
+    Ask the LLM for a slot and reserve it, falling back to the nearest free candidate
+    
+    When another worker reserved the LLM's pick in the meantime, the candidate
+    closest in time to that pick is reserved instead of submitting a booking
+    that is bound to fail.
+    
+    Args:
+        event_uuid: Calendly event type UUID
+        candidates: Pre-ranked aware UTC candidate slots
+        timezone: Timezone the slots are presented in
+        reservations: Slot reservation table
+        owner: Reservation owner id for this booking
+        llm: Chat model used for slot selection
+        lease_seconds: How long the reservation is held
+        
+    Returns:
+        str: Reserved ISO 8601 time in timezone, or None if every candidate is reserved
+    """
+    if not candidates:
+        return None
+    suggested_time = get_suggested_time(format_matches(candidates, timezone), llm=llm)
+    if reservations.reserve(event_uuid, suggested_time, owner, lease_seconds):
+        return suggested_time
+    
+    logger.info(f"Suggested time {suggested_time} is reserved by another booking, picking the nearest free slot")
+    picked = parse_slot(suggested_time, timezone)
+    slot = reservations.reserve_first(event_uuid, sorted(candidates, key=lambda c: abs(c - picked)), owner,
+                                      lease_seconds)
+    return format_slot(slot, timezone) if slot else None
+
+def get_suggested_times_batch(matching_times: list, booking_requests: list, timezone: str = DEFAULT_TIMEZONE,
+                              llm=None, chunk_size: int = 10, metrics: list = None) -> dict:
+    """
+    Get a conflict-free slot assignment for many bookings on one calendar
+    
+    Requests are sent in chunks of chunk_size, each with the slots still
+    unassigned. Duplicate, unknown or missing picks from the LLM are
+    re-assigned locally to the best remaining slot, so the result never
+    books the same slot twice.
+    
+    Args:
+        matching_times: Aware UTC datetimes available to every booking
+        booking_requests: Dicts with an "id" and optional "preferences" text
+        timezone: IANA timezone the times are presented in
+        llm: Chat model to use (defaults to get_chat_model())
+        chunk_size: Maximum number of booking requests per LLM call
+        metrics: Optional list that receives one metrics dict per LLM call
+        
+    Returns:
+        dict: Request id -> ISO 8601 time in timezone (None when slots ran out)
+    """
+    from langchain.output_parsers import ResponseSchema, StructuredOutputParser
+
+    try:
+        response_schema = ResponseSchema(
+            name="assignments",
+            description=(
+                "JSON array with one object per booking request, each with a \"request_id\" string "
+                "and a \"suggested_time\" copied exactly from the listed times including its UTC offset"
+            ),
+            type="array"
+        )
+        
+        parser = StructuredOutputParser.from_response_schemas([response_schema])
+        format_instructions = parser.get_format_instructions()
+        prompt_template = batch_scheduling_prompt()
+        
+        if llm is None:
+            llm = get_chat_model()
+        
+        remaining = sorted(matching_times)
+        assignments = {}
+        
+        for chunk_start in range(0, len(booking_requests), chunk_size):
+            chunk = booking_requests[chunk_start:chunk_start + chunk_size]
+            if not remaining:
+                assignments.update({str(request["id"]): None for request in chunk})
+                continue
+            
+            candidates = select_candidates(remaining, max(len(chunk) * 3, 20), timezone)
+            requests_text = "\n".join(
+                f"- request_id: {request['id']} | preferences: {request.get('preferences') or 'none'}"
+                for request in chunk
+            )
+            messages = prompt_template.format_messages(
+                overlapping_availability=format_matches(candidates, timezone),
+                booking_requests=requests_text,
+                format_instructions=format_instructions
+            )
+            
+            call_metrics = {} if metrics is not None else None
+            response = _invoke_llm(llm, messages, len(candidates), call_metrics)
+            if metrics is not None:
+                metrics.append(dict(call_metrics, requests=len(chunk)))
+            
+            proposed = {}
+            for item in parser.parse(response.content).get("assignments") or []:
+                try:
+                    proposed[str(item["request_id"])] = parse_slot(item["suggested_time"], timezone)
+                except (KeyError, TypeError, ValueError):
+                    continue
+            
+            # Accept valid, unclaimed picks first, then fill gaps with the best remaining slots
+            available = set(remaining)
+            chunk_ids = [str(request["id"]) for request in chunk]
+            for request_id in chunk_ids:
+                slot = proposed.get(request_id)
+                if slot in available:
+                    assignments[request_id] = slot
+                    available.discard(slot)
+            ranked = sorted(available, key=lambda slot: (score_slot(slot, timezone), slot))
+            fallback = iter(ranked)
+            for request_id in chunk_ids:
+                if request_id not in assignments:
+                    slot = next(fallback, None)
+                    assignments[request_id] = slot
+                    available.discard(slot)
+            remaining = sorted(available)
+        
+        return {
+            request_id: format_slot(slot, timezone) if slot else None
+            for request_id, slot in assignments.items()
+        }
+    except Exception as e:
+        logger.error(f"Error getting batched suggested times: {str(e)}")
+        raise
+
+def create_booking_url(calendly_url: str, suggested_time: str, timezone: str = None) -> str:
     """
     Create the final booking URL
+    
+    When a timezone is given, the suggested time is re-expressed in that
+    timezone with the UTC offset in effect on the booked day.
     """
     logger.info("Creating booking URL")
     
     try:
+        if timezone:
+            suggested_time = format_slot(parse_slot(suggested_time, timezone), timezone)
+        
         base_path = '/'.join(calendly_url.split('?')[0].split('/')[:-1]) if calendly_url.endswith('/') else '/'.join(calendly_url.split('?')[0].split('/'))
         final_url = f"{base_path}/{suggested_time}"
         
@@ -118,6 +488,5 @@ def create_booking_url(calendly_url: str, suggested_time: str) -> str:
         return final_url
         
     except Exception as e:
-        logger.error(f"Error creating booking URL: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.error(f"Error creating booking URL: {str(e)}", exc_info=True)
         raise
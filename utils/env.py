@@ -0,0 +1,24 @@
+"""
+Environment loading
+
+The .env file is read once, by the first thing that needs settings from
+it instead of at import time, so importing book.py stays cheap: the entry
+points' configure_from_env(force=True) call, the invitee calendar,
+Browserbase, the OpenAI model and upstream rate overrides.
+CALENDLYAI_LOG_AUTOCONFIG is checked before .env is read, so it must be
+set in the real environment.
+"""
+
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def load_env() -> bool:
+    """
+    Load .env into os.environ once; existing variables win.
+
+    Returns:
+        bool: True if a .env file was found
+    """
+    import dotenv
+    return dotenv.load_dotenv()
@@ -0,0 +1,322 @@
+"""
+Free/busy engine over raw calendar events
+
+Turns a calendar's events, many of them recurring, into the free time of a
+query window without materializing every occurrence:
+
+    iter_occurrences   one event's occurrences in the window; its RRULE is
+                       expanded lazily, starting from the period the window
+                       falls in, so a daily meeting set up three years ago
+                       costs as much as one set up last week
+    iter_busy          the occurrences of every event heap-merged by start
+                       and swept into sorted, disjoint busy intervals
+    free_busy          the window's free working-hours slots in the
+                       Calendly format find_matching_times() consumes
+
+Everything is a generator, so slots are decided while the sweep advances
+and nothing past the window is expanded:
+
+    invitee = free_busy(events, "America/New_York", days=14)
+    matches = find_matching_times(host_calendar, invitee)
+
+Events are CalendarEvent tuples (utils/calendar_sources.py). Recurrences
+repeat in the event's local wall time, so a weekly 9:00 meeting stays at
+9:00 across DST changes. Supported RRULE parts are FREQ (DAILY, WEEKLY,
+MONTHLY, YEARLY), INTERVAL, COUNT, UNTIL, BYDAY (with ordinals such as 2TU
+or -1FR for MONTHLY and YEARLY), BYMONTHDAY and BYMONTH; other parts are
+ignored with a warning and other frequencies contribute their first
+occurrence.
+"""
+
+import re
+import heapq
+import logging
+from calendar import monthrange
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from functools import lru_cache
+
+from utils.calendar_utils import DEFAULT_WORKING_HOURS, calendar_from_free, free_intervals
+from utils.timezone_utils import DEFAULT_TIMEZONE, localize, utc_to_local
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+SUPPORTED_PARTS = frozenset({"FREQ", "INTERVAL", "COUNT", "UNTIL", "BYDAY", "BYMONTHDAY", "BYMONTH", "WKST"})
+BYDAY_PATTERN = re.compile(r"^([+-]?\d{1,2})?(MO|TU|WE|TH|FR|SA|SU)$")
+
+Rule = namedtuple("Rule", "frequency interval count until byday bymonthday bymonth ignored")
+Rule.__doc__ = (
+    "A parsed RRULE: byday holds (ordinal or None, weekday) pairs with Monday as 0, "
+    "ignored the names of parts the engine does not apply.")
+
+
+@lru_cache(maxsize=4096)
+def parse_rrule(rrule: str) -> Rule:
+    """
+    Parse an RRULE value such as FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE.
+
+    Raises:
+        ValueError: A part the engine applies is malformed
+    """
+    parts = dict(part.split("=", 1) for part in rrule.upper().split(";") if "=" in part)
+    byday = []
+    for value in filter(None, parts.get("BYDAY", "").split(",")):
+        match = BYDAY_PATTERN.match(value.strip())
+        if not match:
+            raise ValueError(f"Invalid BYDAY {value}")
+        byday.append((int(match.group(1)) if match.group(1) else None, WEEKDAYS[match.group(2)]))
+    return Rule(
+        parts.get("FREQ"),
+        int(parts.get("INTERVAL", 1)),
+        int(parts["COUNT"]) if "COUNT" in parts else None,
+        parts.get("UNTIL"),
+        tuple(byday),
+        tuple(int(value) for value in filter(None, parts.get("BYMONTHDAY", "").split(","))),
+        tuple(int(value) for value in filter(None, parts.get("BYMONTH", "").split(","))),
+        tuple(sorted(set(parts) - SUPPORTED_PARTS)),
+    )
+
+
+@lru_cache(maxsize=256)
+def _warn_once(message: str) -> None:
+    """Log a warning about a rule once, not on every query that expands it."""
+    logger.warning(message)
+
+
+@lru_cache(maxsize=4096)
+def _until(value: str, timezone: str) -> float:
+    """Epoch seconds of the last instant an UNTIL value admits; a DATE covers the whole day."""
+    if len(value) == 8:
+        return localize(datetime.strptime(value, "%Y%m%d") + timedelta(days=1), timezone).timestamp() - 1
+    if value.endswith("Z"):
+        return datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=dt_timezone.utc).timestamp()
+    return localize(datetime.strptime(value, "%Y%m%dT%H%M%S"), timezone).timestamp()
+
+
+def _local(epoch: float, timezone: str) -> datetime:
+    """Naive local wall time of epoch seconds."""
+    return utc_to_local(datetime.fromtimestamp(epoch, dt_timezone.utc), timezone).replace(tzinfo=None)
+
+
+def _month_days(rule: Rule, year: int, month: int, default_day: int) -> list:
+    """Sorted days of a month selected by BYMONTHDAY and BYDAY (their intersection when both are set)."""
+    first_weekday, length = monthrange(year, month)
+    monthdays = None
+    if rule.bymonthday:
+        monthdays = {day if day > 0 else length + day + 1 for day in rule.bymonthday}
+    weekdays = None
+    if rule.byday:
+        weekdays = set()
+        for ordinal, weekday in rule.byday:
+            matching = list(range(1 + (weekday - first_weekday) % 7, length + 1, 7))
+            if ordinal is None:
+                weekdays.update(matching)
+            elif -len(matching) <= ordinal <= len(matching) and ordinal:
+                weekdays.add(matching[ordinal - 1 if ordinal > 0 else ordinal])
+    if monthdays is None and weekdays is None:
+        monthdays = {default_day}
+    days = monthdays if weekdays is None else weekdays if monthdays is None else monthdays & weekdays
+    return sorted(day for day in days if 1 <= day <= length)
+
+
+# Period generators: (rule, local start, earliest local time of interest, whether COUNT applies)
+# -> (occurrences before the first period yielded, iterator of (period start, sorted candidates)).
+# They skip straight to the period holding `earliest` unless counting would need every earlier period.
+
+def _daily(rule: Rule, local_start: datetime, earliest: datetime, counting: bool) -> tuple:
+    weekdays = {weekday for _, weekday in rule.byday}
+    step = 0 if counting and weekdays else max(0, (earliest - local_start).days // rule.interval)
+
+    def periods(step):
+        while True:
+            candidate = local_start + timedelta(days=step * rule.interval)
+            yield candidate, [candidate] if not weekdays or candidate.weekday() in weekdays else []
+            step += 1
+
+    return step, periods(step)
+
+
+def _weekly(rule: Rule, local_start: datetime, earliest: datetime, counting: bool) -> tuple:
+    weekdays = sorted({weekday for _, weekday in rule.byday}) or [local_start.weekday()]
+    week_start = local_start - timedelta(days=local_start.weekday())
+    step = max(0, (earliest - week_start).days // (7 * rule.interval))
+    # Every full week holds len(weekdays) occurrences; the first only those from DTSTART on
+    first_week = sum(1 for weekday in weekdays if weekday >= local_start.weekday())
+    skipped = 0 if step == 0 else first_week + (step - 1) * len(weekdays)
+
+    def periods(step):
+        while True:
+            week = week_start + timedelta(weeks=step * rule.interval)
+            yield week, [week + timedelta(days=weekday) for weekday in weekdays]
+            step += 1
+
+    return skipped, periods(step)
+
+
+def _monthly(rule: Rule, local_start: datetime, earliest: datetime, counting: bool) -> tuple:
+    first_month = local_start.year * 12 + local_start.month - 1
+    step = 0 if counting else max(0, (earliest.year * 12 + earliest.month - 1 - first_month) // rule.interval)
+
+    def periods(step):
+        while True:
+            year, month = divmod(first_month + step * rule.interval, 12)
+            month += 1
+            days = [] if rule.bymonth and month not in rule.bymonth else \
+                _month_days(rule, year, month, local_start.day)
+            yield datetime(year, month, 1), [datetime.combine(date(year, month, day), local_start.time())
+                                             for day in days]
+            step += 1
+
+    return step, periods(step)
+
+
+def _yearly(rule: Rule, local_start: datetime, earliest: datetime, counting: bool) -> tuple:
+    step = 0 if counting else max(0, (earliest.year - local_start.year) // rule.interval)
+    months = sorted(rule.bymonth) or [local_start.month]
+
+    def periods(step):
+        while True:
+            year = local_start.year + step * rule.interval
+            yield datetime(year, 1, 1), [datetime.combine(date(year, month, day), local_start.time())
+                                         for month in months
+                                         for day in _month_days(rule, year, month, local_start.day)]
+            step += 1
+
+    return step, periods(step)
+
+
+PERIODS = {"DAILY": _daily, "WEEKLY": _weekly, "MONTHLY": _monthly, "YEARLY": _yearly}
+
+
+def iter_occurrences(event, window_start: float, window_end: float, skip=()):
+    """
+    Lazily yield the (start, end) epoch-second occurrences of an event overlapping a window.
+
+    Occurrences in skip (overridden by a RECURRENCE-ID instance) or EXDATE
+    are left out but still count towards COUNT.
+
+    Args:
+        event: CalendarEvent
+        window_start: Window start in epoch seconds
+        window_end: Window end in epoch seconds, exclusive
+        skip: Epoch seconds of occurrences to leave out
+
+    Yields:
+        tuple: (start, end) in epoch seconds, ascending
+    """
+    first = event.start.timestamp()
+    duration = event.end.timestamp() - first
+    rule = None
+    if event.rrule:
+        try:
+            rule = parse_rrule(event.rrule)
+        except ValueError as e:
+            _warn_once(f"RRULE of {event.uid} is invalid ({e}); using its first occurrence")
+        else:
+            if rule.frequency not in PERIODS:
+                _warn_once(f"RRULE FREQ={rule.frequency} of {event.uid} is not expanded; using its first occurrence")
+                rule = None
+            elif rule.ignored:
+                _warn_once(f"RRULE of {event.uid}: ignoring {', '.join(rule.ignored)}")
+    if rule is None:
+        if first < window_end and first + duration > window_start:
+            yield first, first + duration
+        return
+
+    timezone = event.timezone
+    until = _until(rule.until, timezone) if rule.until else None
+    if first >= window_end or (until is not None and until + duration <= window_start):
+        return
+    local_start = _local(first, timezone)
+    # A day of slack either side absorbs UTC offsets and DST shifts between wall time and the window
+    earliest = _local(window_start - duration, timezone) - timedelta(days=1)
+    latest = _local(window_end, timezone) + timedelta(days=1)
+    excluded = set(event.exdates).union(skip) if event.exdates or skip else ()
+
+    index, periods = PERIODS[rule.frequency](rule, local_start, earliest, rule.count is not None)
+    for period_start, candidates in periods:
+        if period_start > latest:
+            return
+        for candidate in candidates:
+            if candidate < local_start:
+                continue
+            index += 1
+            if rule.count is not None and index > rule.count:
+                return
+            start = localize(candidate, timezone).timestamp()
+            if (until is not None and start > until) or start >= window_end:
+                return
+            if start + duration > window_start and start not in excluded:
+                yield start, start + duration
+
+
+def iter_busy(events, window_start: float, window_end: float):
+    """
+    Lazily yield the merged busy intervals of events overlapping [window_start, window_end).
+
+    One-off events are sorted once; each recurring event is its own lazy
+    occurrence stream. The streams are heap-merged by start and swept, so
+    overlapping or touching occurrences come out as one interval.
+
+    Args:
+        events: Sequence of CalendarEvent, including RECURRENCE-ID overrides
+        window_start: Window start in epoch seconds
+        window_end: Window end in epoch seconds, exclusive
+
+    Yields:
+        tuple: Sorted, disjoint (start, end) pairs in epoch seconds
+    """
+    overridden = {}
+    for event in events:
+        if event.recurrence_id is not None:
+            overridden.setdefault(event.uid, set()).add(event.recurrence_id)
+
+    single = []
+    streams = [single]
+    for event in events:
+        if not event.busy:
+            continue
+        if event.rrule and event.recurrence_id is None:
+            streams.append(iter_occurrences(event, window_start, window_end, overridden.get(event.uid, ())))
+            continue
+        start, end = event.start.timestamp(), event.end.timestamp()
+        if start < window_end and end > window_start:
+            single.append((start, end))
+    single.sort()
+
+    current_start = current_end = None
+    for start, end in heapq.merge(*streams):
+        if current_end is not None and start <= current_end:
+            if end > current_end:
+                current_end = end
+            continue
+        if current_end is not None:
+            yield current_start, current_end
+        current_start, current_end = start, end
+    if current_end is not None:
+        yield current_start, current_end
+
+
+def free_busy(events, timezone: str = DEFAULT_TIMEZONE, days: int = 7, slot_minutes: int = 30,
+              working_hours=DEFAULT_WORKING_HOURS, start: date = None) -> dict:
+    """
+    The free working-hours slots left by a calendar's events, in Calendly format.
+
+    Args:
+        events: Sequence of CalendarEvent
+        timezone: IANA timezone the working hours are expressed in
+        days: Number of days, starting at start
+        slot_minutes: Slot length in minutes
+        working_hours: (start_hour, end_hour) for Monday-Friday, or {weekday: (start_hour, end_hour)}
+        start: First day (defaults to today)
+
+    Returns:
+        dict: Calendar data in Calendly format
+    """
+    start = start or datetime.now().date()
+    window_start = localize(datetime.combine(start, time()), timezone).timestamp()
+    window_end = localize(datetime.combine(start + timedelta(days=days), time()), timezone).timestamp()
+    free = free_intervals(iter_busy(events, window_start, window_end), window_start, window_end)
+    return calendar_from_free(free, timezone, days=days, slot_minutes=slot_minutes, working_hours=working_hours,
+                              start=start)
@@ -0,0 +1,192 @@
+"""
+Chat model providers for slot selection
+
+get_chat_model() returns the model used by get_suggested_time. The provider
+is picked explicitly or through the CALENDLYAI_LLM_PROVIDER environment
+variable:
+
+    openai  - gpt-4o-mini through langchain_openai (default)
+    local   - an on-box small model served by Ollama
+    fake    - deterministic offline stand-in with configurable latency
+              distribution and failure injection, for benchmarks and load tests
+"""
+
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from utils.env import load_env
+
+DEFAULT_PROVIDER = "openai"
+DEFAULT_OPENAI_MODEL = "gpt-4o-mini"
+DEFAULT_LOCAL_MODEL = "llama3.2:1b"
+
+ISO_TIME_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:[+-]\d{2}:\d{2}|Z)")
+REQUEST_ID_PATTERN = re.compile(r"^\s*- request_id: (\S+)", re.MULTILINE)
+
+
+def prompt_text(messages) -> str:
+    """Flatten a list of chat messages (or a plain prompt string) into one string."""
+    if isinstance(messages, str):
+        return messages
+    return "\n".join(getattr(message, "content", str(message)) for message in messages)
+
+
+class InjectedLLMFailure(Exception):
+    """Raised by FakeChatModel when a failure is injected."""
+
+
+class FakeChatModel:
+    """
+    Deterministic local stand-in for a chat model.
+
+    Latency is drawn from a seeded distribution (plus an optional per-token
+    cost) and failures are injected at a fixed rate, so offline runs have
+    realistic and reproducible timings. The reply picks one of the ISO 8601
+    times listed in the prompt (one per request for batch prompts) and is
+    formatted the way StructuredOutputParser expects.
+    """
+
+    def __init__(self, latency: str = "lognormal", latency_median: float = 0.8, latency_sigma: float = 0.35,
+                 per_token_latency: float = 0.0, failure_rate: float = 0.0, pick: str = "first",
+                 seed: int = 0, sleep=time.sleep):
+        """
+        Initialize the fake model.
+
+        Args:
+            latency: Latency distribution - "none", "fixed", "uniform" or "lognormal"
+            latency_median: Median (fixed/lognormal) or mean (uniform) latency in seconds
+            latency_sigma: Spread - log-space sigma for lognormal, half-width ratio for uniform
+            per_token_latency: Extra seconds per prompt token (~4 characters)
+            failure_rate: Probability in [0, 1] of raising InjectedLLMFailure
+            pick: Which listed time to answer with - "first", "middle", "last" or "random"
+            seed: Seed for the latency, failure and pick streams
+            sleep: Sleep function (override to simulate time without waiting)
+        """
+        self.latency = latency
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.per_token_latency = per_token_latency
+        self.failure_rate = failure_rate
+        self.pick = pick
+        self.sleep = sleep
+        self.calls = 0
+        self.failures = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _draw_latency(self, prompt_tokens: int) -> float:
+        """Draw one latency sample in seconds."""
+        if self.latency == "none":
+            base = 0.0
+        elif self.latency == "fixed":
+            base = self.latency_median
+        elif self.latency == "uniform":
+            spread = self.latency_median * self.latency_sigma
+            base = self._rng.uniform(self.latency_median - spread, self.latency_median + spread)
+        elif self.latency == "lognormal":
+            base = self._rng.lognormvariate(math.log(self.latency_median), self.latency_sigma)
+        else:
+            raise ValueError(f"Unknown latency distribution: {self.latency}")
+        return max(0.0, base) + self.per_token_latency * prompt_tokens
+
+    def _choose_time(self, times: list, offset: int = 0) -> str:
+        """Pick one of the listed times, shifted by offset for batch answers."""
+        if not times:
+            return ""
+        if self.pick == "first":
+            index = offset
+        elif self.pick == "middle":
+            index = len(times) // 2 + offset
+        elif self.pick == "last":
+            index = len(times) - 1 - offset
+        elif self.pick == "random":
+            return self._rng.choice(times)
+        else:
+            raise ValueError(f"Unknown pick strategy: {self.pick}")
+        return times[index % len(times)]
+
+    def invoke(self, messages):
+        """Answer a list of chat messages (or a plain prompt string)."""
+        prompt = prompt_text(messages)
+
+        # Draw every random value under the lock so concurrent callers stay reproducible
+        with self._lock:
+            self.calls += 1
+            latency = self._draw_latency(len(prompt) // 4)
+            failed = self._rng.random() < self.failure_rate
+            # Listed times appear once as "... (ISO)"; the instructions contain none
+            times = ISO_TIME_PATTERN.findall(prompt)
+            request_ids = REQUEST_ID_PATTERN.findall(prompt)
+            if request_ids:
+                reply = {"assignments": [
+                    {"request_id": request_id, "suggested_time": self._choose_time(times, offset)}
+                    for offset, request_id in enumerate(request_ids)
+                ]}
+            else:
+                reply = {"suggested_time": self._choose_time(times)}
+            if failed:
+                self.failures += 1
+
+        self.sleep(latency)
+        if failed:
+            raise InjectedLLMFailure(f"Injected failure on call {self.calls}")
+        return _ai_message(f"```json\n{json.dumps(reply)}\n```")
+
+
+def _ai_message(content: str):
+    """Build an AIMessage when langchain is installed, otherwise a bare object with .content."""
+    try:
+        from langchain_core.messages import AIMessage
+    except ImportError:
+        return SimpleNamespace(content=content)
+    return AIMessage(content=content)
+
+
+def get_chat_model(provider: str = None, **kwargs):
+    """
+    Create the chat model for the given provider.
+
+    Args:
+        provider: "openai", "local" or "fake" (defaults to CALENDLYAI_LLM_PROVIDER, then openai)
+        **kwargs: Provider-specific overrides (e.g. model_name, FakeChatModel options)
+
+    Returns:
+        A chat model exposing invoke(messages) -> message with .content
+    """
+    load_env()
+    provider = (provider or os.getenv("CALENDLYAI_LLM_PROVIDER") or DEFAULT_PROVIDER).lower()
+
+    if provider == "openai":
+        from langchain_openai.chat_models import ChatOpenAI
+        return ChatOpenAI(
+            model_name=kwargs.pop("model_name", DEFAULT_OPENAI_MODEL),
+            temperature=kwargs.pop("temperature", 0),
+            openai_api_key=kwargs.pop("openai_api_key", os.getenv("OPENAI_API_KEY")),
+            **kwargs
+        )
+
+    if provider == "local":
+        from langchain_community.chat_models import ChatOllama
+        return ChatOllama(
+            model=kwargs.pop("model", os.getenv("CALENDLYAI_LOCAL_MODEL", DEFAULT_LOCAL_MODEL)),
+            temperature=kwargs.pop("temperature", 0),
+            **kwargs
+        )
+
+    if provider == "fake":
+        options = {
+            "latency": os.getenv("CALENDLYAI_FAKE_LLM_LATENCY", "lognormal"),
+            "latency_median": float(os.getenv("CALENDLYAI_FAKE_LLM_MEDIAN", "0.8")),
+            "failure_rate": float(os.getenv("CALENDLYAI_FAKE_LLM_FAILURE_RATE", "0")),
+            "seed": int(os.getenv("CALENDLYAI_FAKE_LLM_SEED", "0")),
+        }
+        options.update(kwargs)
+        return FakeChatModel(**options)
+
+    raise ValueError(f"Unknown LLM provider: {provider}")
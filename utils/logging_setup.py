@@ -0,0 +1,240 @@
+"""
+Queue-based, structured logging for the booking workflow
+
+configure_logging() puts a single QueueHandler on the root logger and moves
+formatting and all file/console I/O to a QueueListener thread, so a booking
+thread only pays for creating a record and enqueueing it. Records are
+emitted as one JSON object per line (or plain text) carrying the booking and
+run IDs set with log_context(), and files rotate by size.
+
+Nothing is configured on import. Entry points call configure_logging(), or
+set CALENDLYAI_LOG_AUTOCONFIG=1 to have configure_from_env() do it when
+book.py is imported. Environment variables:
+
+    CALENDLYAI_LOG_LEVEL     root level (default INFO)
+    CALENDLYAI_LOG_LEVELS    per-module levels, e.g. "utils.calendly_api=DEBUG,selenium=WARNING"
+    CALENDLYAI_LOG_FILE      rotating log file (default: none)
+    CALENDLYAI_LOG_FORMAT    "json" (default) or "text"
+"""
+
+import os
+import json
+import uuid
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from utils.env import load_env
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+
+_booking_id = contextvars.ContextVar("booking_id", default=None)
+_run_id = contextvars.ContextVar("run_id", default=None)
+
+# Standard LogRecord attributes; anything else passed via extra= is emitted as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+_queue_handler = None
+_lock = threading.Lock()
+
+
+@contextmanager
+def log_context(booking_id: str = None, run_id: str = None):
+    """Tag every record logged inside the block (in this thread or task) with booking/run IDs."""
+    tokens = []
+    if booking_id is not None:
+        tokens.append((_booking_id, _booking_id.set(booking_id)))
+    if run_id is not None:
+        tokens.append((_run_id, _run_id.set(run_id)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def current_booking_id() -> str:
+    """Return the booking ID of the current log context, or None."""
+    return _booking_id.get()
+
+
+def new_booking_id() -> str:
+    """Return a short random ID for correlating one booking's log records."""
+    return uuid.uuid4().hex[:12]
+
+
+class ContextFilter(logging.Filter):
+    """Copy the booking/run IDs from the caller's context onto the record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.booking_id = _booking_id.get()
+        record.run_id = _run_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with context IDs, extra fields and exception text."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value if isinstance(value, (str, int, float, bool)) else repr(value)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+
+    The stock prepare() formats the message and traceback on the calling
+    thread so records can be pickled; the queue here is in-process, so the
+    record is passed through as-is.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def parse_module_levels(spec: str) -> dict:
+    """Parse "module=LEVEL,other=LEVEL" into a dict."""
+    levels = {}
+    for item in (spec or "").split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level: str = "INFO", log_file: str = None, json_format: bool = True,
+                      module_levels: dict = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                      backup_count: int = DEFAULT_BACKUP_COUNT, console: bool = True) -> QueueListener:
+    """
+    Route all logging through a queue to a background listener.
+
+    Calling it again replaces the previous configuration.
+
+    Args:
+        level: Root log level
+        log_file: Optional path of a size-rotated log file
+        json_format: Emit JSON lines instead of plain text
+        module_levels: Optional {logger name: level} overrides
+        max_bytes: Rotate the log file at this size
+        backup_count: Rotated files to keep
+        console: Also log to stderr
+
+    Returns:
+        QueueListener: The running listener (stopped automatically at exit)
+    """
+    global _listener, _queue_handler
+    formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    handlers = []
+    if console:
+        handlers.append(logging.StreamHandler())
+    if log_file:
+        handlers.append(RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count,
+                                            encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    with _lock:
+        shutdown_logging()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        _queue_handler = DeferredQueueHandler(queue.SimpleQueue())
+        _queue_handler.addFilter(ContextFilter())
+        root.addHandler(_queue_handler)
+        root.setLevel(level)
+        for name, module_level in (module_levels or {}).items():
+            logging.getLogger(name).setLevel(module_level)
+
+        _listener = QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+    return _listener
+
+
+def add_log_file(path: str, json_format: bool = True, level=logging.NOTSET) -> logging.Handler:
+    """
+    Add a rotating file to the running listener (e.g. one per test suite run).
+
+    Returns:
+        logging.Handler: Pass it to remove_log_handler() when done
+    """
+    handler = RotatingFileHandler(path, maxBytes=DEFAULT_MAX_BYTES, backupCount=DEFAULT_BACKUP_COUNT,
+                                  encoding="utf-8")
+    handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+    handler.setLevel(level)
+    with _lock:
+        if _listener is None:
+            raise RuntimeError("configure_logging() must be called before add_log_file()")
+        _listener.handlers = _listener.handlers + (handler,)
+    return handler
+
+
+def remove_log_handler(handler: logging.Handler) -> None:
+    """Detach a handler added with add_log_file() once records already queued have reached it, and close it."""
+    with _lock:
+        if _listener is not None:
+            # stop() drains the queue; records logged meanwhile wait for the restarted listener
+            _listener.stop()
+            _listener.handlers = tuple(h for h in _listener.handlers if h is not handler)
+            _listener.start()
+    handler.close()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def configure_from_env(force: bool = False, log_file: str = None):
+    """
+    Configure logging from CALENDLYAI_LOG_* variables.
+
+    Does nothing unless force is set or CALENDLYAI_LOG_AUTOCONFIG is truthy,
+    so importing a module never takes over the application's logging. .env is
+    loaded only once it does configure, which keeps importing book.py cheap.
+
+    Args:
+        force: Configure even without CALENDLYAI_LOG_AUTOCONFIG (for entry points)
+        log_file: Log file used when CALENDLYAI_LOG_FILE is not set
+
+    Returns:
+        QueueListener or None
+    """
+    if not force and os.getenv("CALENDLYAI_LOG_AUTOCONFIG", "").lower() not in ("1", "true", "yes"):
+        return None
+    load_env()
+    return configure_logging(
+        level=os.getenv("CALENDLYAI_LOG_LEVEL", "INFO").upper(),
+        log_file=os.getenv("CALENDLYAI_LOG_FILE", log_file) or None,
+        json_format=os.getenv("CALENDLYAI_LOG_FORMAT", "json").lower() != "text",
+        module_levels=parse_module_levels(os.getenv("CALENDLYAI_LOG_LEVELS")),
+    )
+
+
+atexit.register(shutdown_logging)
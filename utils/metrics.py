@@ -0,0 +1,314 @@
+"""
+In-process metrics registry with a Prometheus text endpoint
+
+Counters, histograms and gauges are plain Python objects guarded by a lock,
+so recording a sample costs a dict lookup and an addition and can stay on in
+production. Gauges can be backed by a callback that is only evaluated when
+the registry is scraped (pool sizes, open sessions).
+
+    BOOKINGS.inc(outcome="booked")
+    with PHASE_SECONDS.time(phase="availability"):
+        ...
+    start_metrics_server(9100)      # GET /metrics in Prometheus text format
+    snapshot()                      # plain dict, e.g. for results/ JSON
+
+The booking workflow's own metrics are defined at the bottom of this module;
+modules that own a pool register its gauge callback where the pool lives.
+"""
+
+import math
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _label_key(labelnames: tuple, labels: dict) -> tuple:
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Expected labels {labelnames}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(labelnames: tuple, values: tuple, extra: dict = None) -> str:
+    pairs = list(zip(labelnames, values)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonically increasing count, optionally per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name + "_total", key, {}, value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {",".join(key) or "": value for key, value in self._values.items()}
+
+
+class Histogram:
+    """Bucketed distribution of observations (seconds by default), optionally per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of the block, whether or not it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                yield self.name + "_bucket", key, {"le": _format_value(bound)}, cumulative
+            yield self.name + "_sum", key, {}, values[-2]
+            yield self.name + "_count", key, {}, values[-1]
+
+    def snapshot(self) -> dict:
+        """Per label set: count, sum, mean and bucket-estimated p50/p95."""
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        result = {}
+        for key, values in series.items():
+            count, total = values[-1], values[-2]
+            result[",".join(key) or ""] = {
+                "count": count,
+                "sum": total,
+                "mean": total / count if count else None,
+                "p50": self._quantile(values, 0.5),
+                "p95": self._quantile(values, 0.95),
+            }
+        return result
+
+    def _quantile(self, values: list, q: float):
+        """Upper bound of the bucket holding the q-quantile (None past the last finite bucket)."""
+        count = values[-1]
+        if not count:
+            return None
+        rank, cumulative = q * count, 0
+        for bound, bucket_count in zip(self.buckets, values):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return None if bound == math.inf else bound
+        return None
+
+
+class Gauge:
+    """Value that goes up and down, either set directly or read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._functions = []
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, fn) -> None:
+        """
+        Read the gauge from fn() whenever it is scraped.
+
+        fn returns a number for an unlabelled gauge, or a dict mapping a
+        label value (or tuple of label values) to a number. Several callbacks
+        may be registered; their values are merged.
+        """
+        with self._lock:
+            self._functions.append(fn)
+
+    def _collect(self) -> dict:
+        with self._lock:
+            values = dict(self._values)
+            functions = list(self._functions)
+        for fn in functions:
+            try:
+                result = fn()
+            except Exception as e:
+                logger.warning(f"Gauge {self.name} callback failed: {e}")
+                continue
+            if not isinstance(result, dict):
+                result = {(): result}
+            for key, value in result.items():
+                values[key if isinstance(key, tuple) else (str(key),)] = value
+        return values
+
+    def samples(self):
+        for key, value in sorted(self._collect().items()):
+            yield self.name, key, {}, value
+
+    def snapshot(self) -> dict:
+        return {",".join(key) or "": value for key, value in self._collect().items()}
+
+
+class MetricsRegistry:
+    """Named collection of metrics that renders to Prometheus text or a dict."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (),
+                  buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets)
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample_name, key, extra, value in metric.samples():
+                lines.append(f"{sample_name}{_format_labels(metric.labelnames, key, extra)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """Return {metric name: {label values: value or histogram summary}}."""
+        with self._lock:
+            metrics = dict(self._metrics)
+        return {name: metric.snapshot() for name, metric in sorted(metrics.items())}
+
+
+REGISTRY = MetricsRegistry()
+
+
+def render() -> str:
+    """Render the default registry in Prometheus text format."""
+    return REGISTRY.render()
+
+
+def snapshot() -> dict:
+    """Return the default registry as a JSON-serialisable dict."""
+    return REGISTRY.snapshot()
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0", registry: MetricsRegistry = None) -> ThreadingHTTPServer:
+    """
+    Serve GET /metrics from a daemon thread.
+
+    Args:
+        port: Port to listen on (0 picks a free one; see server.server_address)
+        host: Interface to bind
+        registry: Registry to expose (defaults to REGISTRY)
+
+    Returns:
+        ThreadingHTTPServer: Call shutdown() to stop it
+    """
+    registry = registry or REGISTRY
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+# Booking workflow metrics
+BOOKINGS = REGISTRY.counter(
+    "calendlyai_bookings", "Completed book_calendly_meeting calls by outcome", ("outcome",))
+BOOKING_SECONDS = REGISTRY.histogram(
+    "calendlyai_booking_seconds", "End-to-end book_calendly_meeting latency")
+PHASE_SECONDS = REGISTRY.histogram(
+    "calendlyai_booking_phase_seconds", "Latency of each booking phase", ("phase",))
+BROWSER_POOL = REGISTRY.gauge(
+    "calendlyai_browser_pool", "Browser sessions and pooled drivers by pool and state", ("pool", "state"))
+HTTP_POOL = REGISTRY.gauge(
+    "calendlyai_http_pool_connections", "Shared Calendly HTTP connection pool by state", ("state",))
+AVAILABILITY_INDEX = REGISTRY.counter(
+    "calendlyai_availability_index_lookups", "Availability index lookups by result (hit, refresh, miss)", ("result",))
@@ -0,0 +1,225 @@
+"""
+Multi-process matching of many calendar pairs
+
+find_matching_times is CPU-bound and single-threaded, so matching tens of
+thousands of (host, invitee) pairs is sharded across a ProcessPoolExecutor.
+Calendars are not pickled per task: CalendarCorpus packs every calendar's
+available spots once into a shared memory segment of int64 UTC epoch
+seconds (an offsets table followed by the sorted values), workers attach to
+it when they start and each task only carries a chunk of index pairs.
+Results stream back in the order the pairs were given.
+
+    with CalendarCorpus(calendars) as corpus:
+        for matches in corpus.match(pairs, workers=4):
+            ...
+"""
+
+import os
+import logging
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+from itertools import islice
+from multiprocessing import shared_memory
+
+from utils.calendar_utils import iter_available_spots
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 512
+ITEM_SIZE = array("q").itemsize
+
+# Per-process view of the corpus, set by _attach in each worker
+_segment = None
+_offsets = None
+_values = None
+
+
+def pack_calendar(calendar) -> array:
+    """
+    Pack a Calendly-format calendar into its sorted, de-duplicated available spots.
+
+    Args:
+        calendar (dict): Calendar data in Calendly format
+
+    Returns:
+        array: int64 UTC epoch seconds in ascending order
+    """
+    packed = array("q")
+    last = None
+    for slot in iter_available_spots(calendar):
+        seconds = int(slot.timestamp())
+        if seconds != last:
+            packed.append(seconds)
+            last = seconds
+    return packed
+
+
+def intersect_sorted(first, second) -> list:
+    """Intersect two ascending sequences of unique ints, keeping ascending order."""
+    if len(first) > len(second):
+        first, second = second, first
+    if not first:
+        return []
+    return sorted(set(first).intersection(second))
+
+
+def _views(buffer, count: int):
+    """Split a corpus buffer into its offsets and values int64 views."""
+    view = buffer.cast("q")
+    return view[:count + 1], view[count + 1:]
+
+
+def _attach(name: str, count: int):
+    """ProcessPoolExecutor initializer: map the corpus segment into this worker."""
+    global _segment, _offsets, _values
+    _segment = shared_memory.SharedMemory(name=name)
+    _offsets, _values = _views(_segment.buf, count)
+
+
+def _match_chunk(pairs: list) -> list:
+    """Match a chunk of (index1, index2) pairs against the attached corpus."""
+    offsets, values = _offsets, _values
+    return [
+        intersect_sorted(values[offsets[first]:offsets[first + 1]], values[offsets[second]:offsets[second + 1]])
+        for first, second in pairs
+    ]
+
+
+class CalendarCorpus:
+    """
+    Calendars packed into one shared memory segment for parallel matching.
+
+    The segment holds count + 1 int64 offsets followed by every calendar's
+    available spots; calendar i owns values[offsets[i]:offsets[i + 1]]. The
+    creating process owns the segment and unlinks it on close().
+    """
+
+    def __init__(self, calendars):
+        """
+        Pack calendars into a new shared memory segment.
+
+        Args:
+            calendars: Iterable of calendars in Calendly format
+        """
+        offsets = array("q", [0])
+        values = array("q")
+        for calendar in calendars:
+            values.extend(pack_calendar(calendar))
+            offsets.append(len(values))
+
+        self.count = len(offsets) - 1
+        size = (len(offsets) + len(values)) * ITEM_SIZE
+        self._segment = shared_memory.SharedMemory(create=True, size=max(size, ITEM_SIZE))
+        self._segment.buf[:len(offsets) * ITEM_SIZE] = offsets.tobytes()
+        self._segment.buf[len(offsets) * ITEM_SIZE:size] = values.tobytes()
+        self._offsets, self._values = _views(self._segment.buf, self.count)
+        # Matches repeat the same few thousand instants; convert each once
+        self._datetimes = {}
+        logger.info(f"Packed {self.count} calendars ({len(values)} spots, {size / 1e6:.1f} MB) "
+                    f"into shared memory {self._segment.name}")
+
+    @property
+    def name(self) -> str:
+        """Name of the shared memory segment workers attach to."""
+        return self._segment.name
+
+    def spots(self, index: int) -> list:
+        """Packed available spots of calendar index, as epoch seconds."""
+        return list(self._values[self._offsets[index]:self._offsets[index + 1]])
+
+    def _to_datetimes(self, matches: list) -> list:
+        """Convert epoch seconds to aware UTC datetimes, as find_matching_times returns them."""
+        cache = self._datetimes
+        result = []
+        for seconds in matches:
+            slot = cache.get(seconds)
+            if slot is None:
+                slot = cache[seconds] = datetime.fromtimestamp(seconds, dt_timezone.utc)
+            result.append(slot)
+        return result
+
+    def match(self, pairs, workers: int = None, chunk_size: int = DEFAULT_CHUNK_SIZE, timestamps: bool = False):
+        """
+        Match (index1, index2) pairs across worker processes, streaming results in order.
+
+        At most two chunks per worker are in flight, so pairs may be a lazy
+        iterable of any length. workers=0 matches in this process.
+
+        Args:
+            pairs: Iterable of (index1, index2) calendar index pairs
+            workers (int): Worker processes (defaults to os.cpu_count())
+            chunk_size (int): Pairs per task
+            timestamps (bool): Yield epoch seconds instead of datetimes
+
+        Yields:
+            list: For each pair in order, the matching times that find_matching_times
+            would return for the two calendars
+        """
+        convert = (lambda matches: matches) if timestamps else self._to_datetimes
+        pairs = iter(pairs)
+        chunks = iter(lambda: list(islice(pairs, chunk_size)), [])
+
+        if workers == 0:
+            for chunk in chunks:
+                for first, second in chunk:
+                    yield convert(intersect_sorted(self._values[self._offsets[first]:self._offsets[first + 1]],
+                                                   self._values[self._offsets[second]:self._offsets[second + 1]]))
+            return
+
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                 initargs=(self._segment.name, self.count)) as pool:
+            pending = deque()
+            try:
+                for chunk in islice(chunks, workers * 2):
+                    pending.append(pool.submit(_match_chunk, chunk))
+                while pending:
+                    results = pending.popleft().result()
+                    chunk = next(chunks, None)
+                    if chunk is not None:
+                        pending.append(pool.submit(_match_chunk, chunk))
+                    for matches in results:
+                        yield convert(matches)
+            except Exception as e:
+                logger.error(f"Parallel matching failed: {e}")
+                raise
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def close(self):
+        """Release and unlink the shared memory segment."""
+        if self._segment is None:
+            return
+        # Views must be released before the segment can be closed
+        self._offsets.release()
+        self._values.release()
+        self._offsets = self._values = None
+        self._segment.close()
+        self._segment.unlink()
+        self._segment = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+
+def parallel_find_matching_times(calendars, pairs, workers: int = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Match many calendar pairs in parallel, yielding results in pair order.
+
+    Args:
+        calendars: Sequence of calendars in Calendly format
+        pairs: Iterable of (index1, index2) pairs into calendars
+        workers (int): Worker processes (defaults to os.cpu_count())
+        chunk_size (int): Pairs per task
+
+    Yields:
+        list: Sorted aware UTC datetimes available in both calendars of each pair
+    """
+    with CalendarCorpus(calendars) as corpus:
+        yield from corpus.match(pairs, workers=workers, chunk_size=chunk_size)
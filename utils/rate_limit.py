@@ -0,0 +1,310 @@
+"""
+Adaptive rate limiting and circuit breaking per upstream
+
+Each upstream (Calendly API, Browserbase session creation, LLM) gets an
+Upstream with:
+
+    - a token bucket whose rate adapts to the upstream: it halves on 429 or
+      5xx responses (and pauses for any Retry-After), and creeps back up by a
+      fixed step on every success, up to max_rate
+    - a circuit breaker that opens after consecutive failures and fails fast
+      with CircuitOpenError until a probe call succeeds after reset_timeout
+
+Upstream.call() runs a callable through both, retrying throttled calls. It
+understands requests.Response objects and SDK exceptions carrying a
+status_code (OpenAI, Browserbase). Rates can be overridden with
+CALENDLYAI_RATE_<UPSTREAM> (requests per second).
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+from utils.env import load_env
+
+logger = logging.getLogger(__name__)
+
+# name -> (initial requests per second, burst, max requests per second)
+DEFAULT_UPSTREAMS = {
+    "calendly": (5.0, 10, 20.0),
+    "browserbase": (1.0, 3, 5.0),
+    "llm": (5.0, 10, 20.0),
+}
+
+THROTTLE_STATUSES = {429, 503}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when an upstream's circuit is open and calls fail fast."""
+
+
+class UpstreamThrottled(RuntimeError):
+    """Raised when an upstream keeps throttling after every retry."""
+
+
+def parse_retry_after(value) -> float:
+    """Parse a Retry-After header (seconds or HTTP date) into seconds, or None."""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """Token bucket with an adjustable rate and a hold for Retry-After."""
+
+    def __init__(self, rate: float, burst: int, min_rate: float = 0.1, max_rate: float = None,
+                 increase: float = None, clock=time.monotonic, sleep=time.sleep):
+        """
+        Args:
+            rate: Initial tokens per second
+            burst: Bucket capacity
+            min_rate: Floor for the rate after throttling
+            max_rate: Ceiling for the rate while recovering (defaults to 4x rate)
+            increase: Rate added per success (defaults to 5% of the initial rate)
+        """
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate or rate * 4
+        self.increase = increase or rate * 0.05
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._hold_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout: float = None) -> float:
+        """
+        Take one token, waiting as needed.
+
+        Returns:
+            float: Seconds waited
+
+        Raises:
+            TimeoutError: If no token is available within timeout
+        """
+        start = self._clock()
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                if now >= self._hold_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return now - start
+                wait = max(self._hold_until - now, (1 - self._tokens) / self.rate)
+            if timeout is not None and now - start + wait > timeout:
+                raise TimeoutError(f"No rate limit token within {timeout}s")
+            self._sleep(wait)
+
+    def on_success(self) -> None:
+        """Additive increase after a successful call."""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after: float = None) -> None:
+        """Multiplicative decrease, and hold every caller for retry_after seconds if given."""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+            if retry_after:
+                self._hold_until = max(self._hold_until, self._clock() + retry_after)
+
+
+class CircuitBreaker:
+    """Closed -> open after failure_threshold consecutive failures -> half-open after reset_timeout."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> None:
+        """
+        Raise CircuitOpenError unless a call may go through.
+
+        After reset_timeout one probe call is let through; its outcome closes
+        or re-opens the circuit.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            raise CircuitOpenError(f"Circuit for {self.name} is open, failing fast")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuit for {self.name} closed")
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def release_probe(self) -> None:
+        """Let another probe through after one that proved nothing either way (e.g. a 429)."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit for {self.name} opened after {self._failures} failure(s)")
+                self.state = self.OPEN
+                self._opened_at = self._clock()
+                self._probing = False
+
+
+def _status_and_retry_after(outcome):
+    """Extract (HTTP status, Retry-After seconds) from a response or an SDK exception."""
+    status = getattr(outcome, "status_code", None)
+    response = outcome if hasattr(outcome, "headers") else getattr(outcome, "response", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        retry_after = parse_retry_after(headers.get("Retry-After") or headers.get("retry-after"))
+    except AttributeError:
+        retry_after = None
+    return status, retry_after
+
+
+class Upstream:
+    """Token bucket plus circuit breaker for one upstream service."""
+
+    def __init__(self, name: str, rate: float, burst: int, max_rate: float = None, failure_threshold: int = 5,
+                 reset_timeout: float = 30.0, max_retries: int = 3, clock=time.monotonic, sleep=time.sleep):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst, max_rate=max_rate, clock=clock, sleep=sleep)
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout, clock=clock)
+        self.max_retries = max_retries
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "throttled": 0, "failures": 0, "fast_failures": 0, "waited_s": 0.0}
+
+    def _count(self, name: str, value=1) -> None:
+        with self._lock:
+            self.stats[name] += value
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Call fn through the rate limiter and circuit breaker.
+
+        429/503 responses (or exceptions carrying those statuses) slow the
+        bucket down and are retried after Retry-After or a jittered backoff;
+        other 5xx responses and connection errors count as failures for the
+        breaker. A final throttled or 5xx response is returned as-is so the
+        caller's raise_for_status() still applies.
+
+        Raises:
+            CircuitOpenError: If the upstream's circuit is open
+            UpstreamThrottled: If an exception-raising upstream is still throttling after max_retries
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.breaker.allow()
+            except CircuitOpenError:
+                self._count("fast_failures")
+                raise
+            self._count("waited_s", self.bucket.acquire())
+            self._count("calls")
+
+            try:
+                outcome = fn(*args, **kwargs)
+                raised = None
+            except Exception as e:
+                outcome, raised = e, e
+            status, retry_after = _status_and_retry_after(outcome)
+
+            if status in THROTTLE_STATUSES:
+                self._count("throttled")
+                self.bucket.on_throttle(retry_after)
+                # A probe must always resolve the breaker, or a half-open circuit stays wedged
+                if status == 503:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.release_probe()
+                if attempt < self.max_retries:
+                    delay = retry_after if retry_after is not None else random.uniform(0, 2 ** attempt)
+                    logger.warning(f"{self.name} throttled ({status}), retrying in {delay:.2f}s")
+                    if retry_after is None:
+                        self._sleep(delay)
+                    continue
+                if raised is not None:
+                    raise UpstreamThrottled(f"{self.name} still throttling after {self.max_retries} retries") from raised
+                return outcome
+
+            if raised is not None or (status is not None and status >= 500):
+                self._count("failures")
+                self.breaker.record_failure()
+                if raised is not None:
+                    raise raised
+                return outcome
+
+            self.bucket.on_success()
+            self.breaker.record_success()
+            return outcome
+
+
+_upstreams = {}
+_upstreams_lock = threading.Lock()
+
+
+def get_upstream(name: str) -> Upstream:
+    """Return the process-wide Upstream for name, created with its defaults on first use."""
+    with _upstreams_lock:
+        upstream = _upstreams.get(name)
+        if upstream is None:
+            load_env()
+            rate, burst, max_rate = DEFAULT_UPSTREAMS.get(name, (5.0, 10, 20.0))
+            override = os.getenv(f"CALENDLYAI_RATE_{name.upper()}")
+            if override:
+                rate = float(override)
+                max_rate = max(max_rate, rate)
+            upstream = Upstream(name, rate, burst, max_rate=max_rate)
+            _upstreams[name] = upstream
+        return upstream
+
+
+def upstream_stats() -> dict:
+    """Return per-upstream counters, current rate and circuit state."""
+    with _upstreams_lock:
+        upstreams = dict(_upstreams)
+    return {
+        name: {**upstream.stats, "rate": upstream.bucket.rate, "circuit": upstream.breaker.state}
+        for name, upstream in upstreams.items()
+    }
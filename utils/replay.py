@@ -0,0 +1,557 @@
+"""
+Record and replay of Calendly, LLM and booking-page traffic
+
+Record mode wraps a live run. It writes a JSON cassette containing every
+response of the shared Calendly HTTP session, every chat model reply, the
+booking-page HTML the scraper loaded and the invitee calendar. Replay mode
+serves the cassette offline:
+
+    - ReplayServer answers the Calendly API from a local HTTP server; the
+      session points CALENDLY_BASE_URL at it
+    - ReplayChatModel returns the recorded replies
+    - ReplayScraper loads the recorded booking pages instead of driving Browserbase
+
+Each can inject a fixed latency. Recorded dates are shifted forward by whole
+weeks, so a cassette keeps producing future slots on the same weekdays
+whenever it is replayed.
+
+    with Recorder("cassettes/run.json") as recorder:
+        book_calendly_meeting(..., **recorder.booking_kwargs(llm=get_chat_model(), timezone=tz))
+
+    with ReplaySession("cassettes/run.json", latency={"http": 0.05, "llm": 0.8, "browser": 0.2}) as replay:
+        book_calendly_meeting(..., **replay.booking_kwargs())
+
+A cassette that needs no live services at all can be generated with:
+
+    python -m utils.replay synthesize cassettes/synthetic.json
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import argparse
+import tempfile
+import threading
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from utils.calendly_api import add_response_hook, get_http_session, remove_response_hook
+from utils.llm_providers import ISO_TIME_PATTERN, FakeChatModel, _ai_message, prompt_text
+from utils.timezone_utils import DEFAULT_TIMEZONE, localize, parse_slot
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_VERSION = 1
+DATE_PATTERN = re.compile(r"(?<!\d)(\d{4})-(\d{2})-(\d{2})(?!\d)")
+# Query parameters derived from the current date; requests are matched without them
+VOLATILE_PARAMS = frozenset({"range_start", "range_end"})
+LATENCY_KEYS = ("http", "llm", "browser")
+
+
+def shift_dates(text: str, days: int) -> str:
+    """Move every YYYY-MM-DD date in text (including inside ISO 8601 datetimes) by days."""
+    if not days or not text:
+        return text
+
+    def shift(match):
+        return (date(*map(int, match.groups())) + timedelta(days=days)).isoformat()
+
+    return DATE_PATTERN.sub(shift, text)
+
+
+def replay_shift_days(recorded_on: date, today: date) -> int:
+    """Days to add to recorded dates: the smallest whole number of weeks that is not in the past."""
+    elapsed = (today - recorded_on).days
+    return max(0, -(-elapsed // 7)) * 7
+
+
+def parse_latency(spec: str) -> dict:
+    """Parse "http=0.05,llm=0.8,browser=0.2" (seconds) into a dict."""
+    latency = {}
+    for item in (spec or "").split(","):
+        if "=" in item:
+            key, value = item.split("=", 1)
+            if key.strip() not in LATENCY_KEYS:
+                raise ValueError(f"Unknown latency key {key.strip()!r}, expected one of {LATENCY_KEYS}")
+            latency[key.strip()] = float(value)
+    return latency
+
+
+class Cassette:
+    """Recorded HTTP exchanges, LLM replies, booking pages and invitee calendars of one or more runs."""
+
+    def __init__(self, recorded_on: str = None, http: list = None, llm: list = None, pages: list = None,
+                 calendars: list = None):
+        self.recorded_on = recorded_on or date.today().isoformat()
+        self.http = http or []
+        self.llm = llm or []
+        self.pages = pages or []
+        self.calendars = calendars or []
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version {data.get('version')} in {path}")
+        return cls(data["recorded_on"], data["http"], data["llm"], data["pages"], data["calendars"])
+
+    def save(self, path: str) -> None:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": CASSETTE_VERSION,
+                "recorded_on": self.recorded_on,
+                "http": self.http,
+                "llm": self.llm,
+                "pages": self.pages,
+                "calendars": self.calendars,
+            }, f, indent=2)
+
+
+class RecordingChatModel:
+    """Delegates to a real chat model and records each reply."""
+
+    def __init__(self, llm, recorder: "Recorder"):
+        self.llm = llm
+        self.recorder = recorder
+
+    def invoke(self, messages):
+        response = self.llm.invoke(messages)
+        self.recorder.record_llm(response.content)
+        return response
+
+
+@lru_cache(maxsize=1)
+def _recording_scraper_class():
+    """CalendlyScraper subclass that records each page it navigates to (imported on first use)."""
+    from browser.browserbase_handler import CalendlyScraper
+
+    class RecordingScraper(CalendlyScraper):
+        def __init__(self, recorder: "Recorder", **kwargs):
+            super().__init__(**kwargs)
+            self.recorder = recorder
+
+        def navigate_to_url(self, url):
+            navigated = super().navigate_to_url(url)
+            if navigated:
+                self.recorder.record_page(url, self.driver.page_source)
+            return navigated
+
+    return RecordingScraper
+
+
+def on_demand_availability_index():
+    """
+    An availability index that fetches on every lookup and never refreshes in the background.
+
+    Recording and replay use one per session, so a run makes (and a replay
+    serves) exactly the availability requests it would make without a cache.
+    """
+    from utils.availability_index import AvailabilityIndex
+    return AvailabilityIndex(max_age=0, refresh_interval=0)
+
+
+class Recorder:
+    """Captures a live run into a cassette; saved on stop()."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.cassette = Cassette()
+        self._lock = threading.Lock()
+        self._availability_index = None
+
+    def _on_response(self, response, *args, **kwargs):
+        parsed = urlsplit(response.url)
+        exchange = {
+            "method": response.request.method,
+            "path": parsed.path,
+            "query": dict(parse_qsl(parsed.query)),
+            "status": response.status_code,
+            "content_type": response.headers.get("Content-Type", "application/json"),
+            "body": response.text,
+        }
+        with self._lock:
+            self.cassette.http.append(exchange)
+
+    def record_llm(self, content: str) -> None:
+        with self._lock:
+            self.cassette.llm.append({"content": content})
+
+    def record_page(self, url: str, html: str) -> None:
+        with self._lock:
+            self.cassette.pages.append({"path": urlsplit(url).path, "html": html})
+
+    def record_calendar(self, calendar: dict) -> dict:
+        """Record the invitee calendar used for a run and return it unchanged."""
+        with self._lock:
+            self.cassette.calendars.append(calendar)
+        return calendar
+
+    def wrap_llm(self, llm) -> RecordingChatModel:
+        return RecordingChatModel(llm, self)
+
+    def scraper_factory(self):
+        """Create a Browserbase scraper that records the booking pages it loads."""
+        return _recording_scraper_class()(self)
+
+    def booking_kwargs(self, llm, timezone: str = DEFAULT_TIMEZONE) -> dict:
+        """Keyword arguments for book_calendly_meeting that route one run through the recorder."""
+        from utils.calendar_utils import generate_mock_calendar
+        if self._availability_index is None:
+            self._availability_index = on_demand_availability_index()
+        return {
+            "llm": self.wrap_llm(llm),
+            "calendar": self.record_calendar(generate_mock_calendar(timezone)),
+            "scraper_factory": self.scraper_factory,
+            "availability_index": self._availability_index,
+        }
+
+    def start(self) -> "Recorder":
+        add_response_hook(self._on_response)
+        return self
+
+    def stop(self) -> None:
+        remove_response_hook(self._on_response)
+        self.cassette.save(self.path)
+        logger.info(f"Recorded {len(self.cassette.http)} HTTP exchange(s), {len(self.cassette.llm)} LLM "
+                    f"reply(ies) and {len(self.cassette.pages)} page(s) to {self.path}")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class ReplayServer:
+    """Local HTTP server answering recorded Calendly API requests and booking pages."""
+
+    def __init__(self, cassette: Cassette, shift_days: int = 0, latency: float = 0.0):
+        """
+        Args:
+            cassette: Recorded traffic to serve
+            shift_days: Days added to every recorded date (see replay_shift_days)
+            latency: Seconds added to every response
+        """
+        self.latency = latency
+        self.counts = {"served": 0, "missed": 0}
+        self._exchanges = {}
+        for exchange in cassette.http:
+            exchange = {**exchange, "body": shift_dates(exchange["body"], shift_days)}
+            self._exchanges.setdefault(self._key(exchange["path"], exchange["query"]), []).append(exchange)
+        self._pages = {shift_dates(page["path"], shift_days): shift_dates(page["html"], shift_days)
+                       for page in cassette.pages}
+        self._served = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+
+    @staticmethod
+    def _key(path: str, query: dict) -> tuple:
+        return path, frozenset((k, v) for k, v in query.items() if k not in VOLATILE_PARAMS)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def _lookup(self, path: str, query: dict):
+        """
+        Return (status, content type, body) for a request, or None.
+
+        Repeated requests get the recorded responses in order, then the last
+        one again. Booking pages not in the cassette fall back to a recorded
+        page of the same event type.
+        """
+        with self._lock:
+            key = self._key(path, query)
+            exchanges = self._exchanges.get(key)
+            if exchanges:
+                index = self._served.get(key, 0)
+                self._served[key] = index + 1
+                exchange = exchanges[min(index, len(exchanges) - 1)]
+                return exchange["status"], exchange["content_type"], exchange["body"]
+        html = self._pages.get(path)
+        if html is None:
+            parent = path.rsplit("/", 1)[0] + "/"
+            html = next((html for page, html in self._pages.items() if page.startswith(parent)), None)
+        if html is not None:
+            return 200, "text/html; charset=utf-8", html
+        return None
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                parsed = urlsplit(self.path)
+                found = server._lookup(parsed.path, dict(parse_qsl(parsed.query)))
+                with server._lock:
+                    server.counts["served" if found else "missed"] += 1
+                if found is None:
+                    logger.warning(f"Replay miss: {self.path}")
+                    status, content_type, body = 404, "application/json", json.dumps({"error": "not recorded"})
+                else:
+                    status, content_type, body = found
+                payload = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "ReplayServer":
+        threading.Thread(target=self._server.serve_forever, name="replay-server", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class ReplayChatModel(FakeChatModel):
+    """
+    Returns recorded LLM replies in order, with dates shifted like the rest of the cassette.
+
+    Times are matched to the prompt by instant, since a shift across a DST
+    change re-renders them with the other UTC offset. A reply naming a time
+    that is not in the prompt (the replayed run took a different path) falls
+    back to FakeChatModel's deterministic pick.
+    """
+
+    def __init__(self, replies: list, shift_days: int = 0, latency: float = 0.0, **kwargs):
+        super().__init__(latency="fixed" if latency else "none", latency_median=latency, **kwargs)
+        self.replies = [shift_dates(reply, shift_days) for reply in replies]
+        self.replayed = 0
+        self.fallbacks = 0
+        self._next = 0
+
+    def invoke(self, messages):
+        prompt = prompt_text(messages)
+        with self._lock:
+            reply = self.replies[self._next % len(self.replies)] if self.replies else None
+            self._next += 1
+        listed = {parse_slot(listed): listed for listed in ISO_TIME_PATTERN.findall(prompt)}
+        times = ISO_TIME_PATTERN.findall(reply or "")
+        if not times or any(parse_slot(time_) not in listed for time_ in times):
+            with self._lock:
+                self.fallbacks += 1
+            return super().invoke(messages)
+        reply = ISO_TIME_PATTERN.sub(lambda match: listed[parse_slot(match.group(0))], reply)
+
+        with self._lock:
+            self.calls += 1
+            self.replayed += 1
+            latency = self._draw_latency(len(prompt) // 4)
+        self.sleep(latency)
+        return _ai_message(reply)
+
+
+class ReplayScraper:
+    """
+    Stand-in for CalendlyScraper that loads recorded booking pages from the replay server.
+
+    Each browser step (start, navigate, every field, submit) costs the
+    configured latency; submitting succeeds when the page was served.
+    """
+
+    def __init__(self, base_url: str, latency: float = 0.0, sleep=time.sleep):
+        self.base_url = base_url
+        self.latency = latency
+        self.sleep = sleep
+        self.page = None
+        self.submitted = False
+
+    def _step(self) -> bool:
+        if self.latency:
+            self.sleep(self.latency)
+        return True
+
+    def initialize_browser(self):
+        return self._step()
+
+    def navigate_to_url(self, url):
+        self._step()
+        response = get_http_session().get(self.base_url + urlsplit(url).path, timeout=15)
+        self.page = response.text if response.status_code == 200 else None
+        return self.page is not None
+
+    def fill_name(self, name):
+        return self._step()
+
+    def fill_email(self, email):
+        return self._step()
+
+    def fill_phone(self, phone):
+        return self._step()
+
+    def fill_additional_info(self, additional_info):
+        return self._step()
+
+    def submit_form(self):
+        self._step()
+        self.submitted = True
+        return self.page is not None
+
+    def close_browser(self):
+        self.page = None
+
+
+class ReplaySession:
+    """Serves a cassette offline: local Calendly server, replayed LLM, replayed scraper and a scratch ledger."""
+
+    def __init__(self, path: str, latency: dict = None, today: date = None):
+        """
+        Args:
+            path: Cassette file
+            latency: Seconds injected per "http" response, "llm" call and "browser" step
+            today: Date the replay runs on (defaults to today; fixes the date shift)
+        """
+        self.cassette = Cassette.load(path)
+        self.latency = {key: 0.0 for key in LATENCY_KEYS}
+        self.latency.update(latency or {})
+        self.shift_days = replay_shift_days(date.fromisoformat(self.cassette.recorded_on), today or date.today())
+        self.server = ReplayServer(self.cassette, self.shift_days, self.latency["http"])
+        self.llm = ReplayChatModel([reply["content"] for reply in self.cassette.llm], self.shift_days,
+                                   self.latency["llm"])
+        self.ledger = None
+        self.availability_index = None
+        self._calendars = [json.loads(shift_dates(json.dumps(calendar), self.shift_days))
+                           for calendar in self.cassette.calendars]
+        self._runs = 0
+        self._previous_base_url = None
+        self._scratch = None
+
+    def calendar(self, run: int) -> dict:
+        """Recorded invitee calendar for a run (cycling), or None to let the booking generate one."""
+        if not self._calendars:
+            return None
+        return self._calendars[run % len(self._calendars)]
+
+    def scraper_factory(self) -> ReplayScraper:
+        return ReplayScraper(self.server.url, self.latency["browser"])
+
+    def booking_kwargs(self) -> dict:
+        """Keyword arguments for book_calendly_meeting that route the next run through the replay."""
+        run, self._runs = self._runs, self._runs + 1
+        return {
+            "llm": self.llm,
+            "calendar": self.calendar(run),
+            "scraper_factory": self.scraper_factory,
+            "ledger": self.ledger,
+            "availability_index": self.availability_index,
+        }
+
+    def stats(self) -> dict:
+        return {
+            "shift_days": self.shift_days,
+            "latency": self.latency,
+            **self.server.counts,
+            "llm_replayed": self.llm.replayed,
+            "llm_fallbacks": self.llm.fallbacks,
+        }
+
+    def start(self) -> "ReplaySession":
+        from utils.booking_ledger import BookingLedger
+        self.server.start()
+        self._previous_base_url = os.environ.get("CALENDLY_BASE_URL")
+        os.environ["CALENDLY_BASE_URL"] = self.server.url
+        # Replays must never hit bookings recorded by earlier runs
+        self._scratch = tempfile.TemporaryDirectory(prefix="calendlyai-replay-")
+        self.ledger = BookingLedger(os.path.join(self._scratch.name, "ledger.db"))
+        self.availability_index = on_demand_availability_index()
+        logger.info(f"Replaying cassette on {self.server.url} (dates shifted by {self.shift_days} days)")
+        return self
+
+    def stop(self) -> None:
+        if self._previous_base_url is None:
+            os.environ.pop("CALENDLY_BASE_URL", None)
+        else:
+            os.environ["CALENDLY_BASE_URL"] = self._previous_base_url
+        self.server.stop()
+        if self.ledger is not None:
+            self.ledger.close()
+        if self._scratch is not None:
+            self._scratch.cleanup()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def synthetic_cassette(calendly_url: str = "https://calendly.com/robertjandali/30min",
+                       timezone: str = DEFAULT_TIMEZONE, days: int = 7, runs: int = 5,
+                       today: date = None) -> Cassette:
+    """
+    Build a deterministic cassette without any live service.
+
+    The host offers every third half-hour of the business day and each
+    run's invitee calendar every second one (rotated per run), so every run
+    has a few overlapping slots. LLM replies are left out; ReplayChatModel
+    picks the first listed time.
+    """
+    today = today or date.today()
+    profile_slug, event_slug = calendly_url.rstrip("/").split("/")[-2:]
+    event_uuid = "replay-event-uuid"
+
+    def calendar(step: int, phase: int) -> dict:
+        data = {"invitee_publisher_error": False, "today": today.isoformat(),
+                "availability_timezone": timezone, "days": []}
+        for offset in range(days):
+            day = today + timedelta(days=offset)
+            spots = []
+            if day.weekday() < 5:
+                for index in range(16):
+                    if (index + offset + phase) % step == 0:
+                        start = datetime(day.year, day.month, day.day, 9 + index // 2, 30 * (index % 2))
+                        spots.append({"status": "available", "invitees_remaining": 1,
+                                      "start_time": localize(start, timezone).isoformat(timespec="seconds")})
+            data["days"].append({"date": day.isoformat(), "status": "available" if spots else "unavailable",
+                                 "spots": spots, "enabled": bool(spots)})
+        return data
+
+    lookup_query = {"event_type_slug": event_slug, "profile_slug": profile_slug}
+    range_query = {"timezone": timezone, "diagnostics": "false"}
+    page = ("<html><body><form><input name=\"full_name\"><input name=\"email\"><input type=\"tel\">"
+            "<textarea name=\"question_0\"></textarea><button type=\"submit\">Schedule Event</button>"
+            f"</form></body></html>")
+    return Cassette(
+        recorded_on=today.isoformat(),
+        http=[
+            {"method": "GET", "path": "/api/booking/event_types/lookup", "query": lookup_query, "status": 200,
+             "content_type": "application/json", "body": json.dumps({"uuid": event_uuid})},
+            {"method": "GET", "path": f"/api/booking/event_types/{event_uuid}/calendar/range", "query": range_query,
+             "status": 200, "content_type": "application/json", "body": json.dumps(calendar(3, 0))},
+        ],
+        pages=[{"path": f"/{profile_slug}/{event_slug}/", "html": page}],
+        calendars=[calendar(2, run) for run in range(runs)],
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Replay cassette tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    synthesize = subparsers.add_parser('synthesize', help='Write a deterministic cassette that needs no live services')
+    synthesize.add_argument('path', help='Cassette file to write')
+    synthesize.add_argument('--calendly-url', default='https://calendly.com/robertjandali/30min', help='Event URL')
+    synthesize.add_argument('--timezone', default=DEFAULT_TIMEZONE, help='IANA timezone')
+    synthesize.add_argument('--runs', type=int, default=5, help='Invitee calendars to include')
+
+    args = parser.parse_args()
+    synthetic_cassette(args.calendly_url, args.timezone, runs=args.runs).save(args.path)
+    print(f"Wrote {args.path}")
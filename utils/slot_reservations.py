@@ -0,0 +1,189 @@
+"""
+Slot reservations for concurrent bookings of one host
+
+Workers booking the same Calendly event read the same availability snapshot
+and tend to pick the same slot. Before a slot is submitted it is reserved
+under a lease; other workers filter reserved slots out of their matching
+times, and a worker that loses the race for its preferred slot moves on to
+the next candidate instead of submitting a booking that will fail.
+
+    SlotReservations        - in-process table (one worker process)
+    SQLiteSlotReservations  - cross-process table in a shared SQLite file
+
+Leases expire on their own, so a crashed worker never blocks a slot for
+longer than its TTL. get_reservation_table() returns the SQLite table when
+CALENDLYAI_RESERVATIONS_PATH is set, otherwise the process-wide in-memory one.
+"""
+
+import os
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+
+from utils.timezone_utils import parse_slot
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_SECONDS = 120
+
+
+def new_owner_id() -> str:
+    """Return a unique reservation owner id for one booking attempt."""
+    return f"{os.getpid()}-{uuid.uuid4().hex[:12]}"
+
+
+def slot_id(slot) -> str:
+    """Normalize a slot (aware datetime or ISO string) to a UTC ISO string."""
+    if isinstance(slot, datetime):
+        return parse_slot(slot.isoformat()).isoformat()
+    return parse_slot(slot).isoformat()
+
+
+class SlotReservations:
+    """In-process reservation table: (event, slot) -> (owner, lease expiry)."""
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._leases = {}
+        self._lock = threading.Lock()
+        self.stats = {"reserved": 0, "conflicts": 0, "released": 0}
+
+    def reserve(self, event_uuid: str, slot, owner: str, ttl: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """
+        Reserve a slot for owner unless someone else holds a live lease on it.
+
+        Re-reserving one's own slot extends the lease.
+
+        Returns:
+            bool: True if owner now holds the slot
+        """
+        key = (event_uuid, slot_id(slot))
+        now = self._clock()
+        with self._lock:
+            holder = self._leases.get(key)
+            if holder is not None and holder[0] != owner and holder[1] > now:
+                self.stats["conflicts"] += 1
+                return False
+            self._leases[key] = (owner, now + ttl)
+            self.stats["reserved"] += 1
+            return True
+
+    def release(self, event_uuid: str, slot, owner: str) -> None:
+        """Release owner's lease on a slot (no-op if someone else holds it)."""
+        key = (event_uuid, slot_id(slot))
+        with self._lock:
+            holder = self._leases.get(key)
+            if holder is not None and holder[0] == owner:
+                del self._leases[key]
+                self.stats["released"] += 1
+
+    def reserved_slots(self, event_uuid: str, exclude_owner: str = None) -> set:
+        """Return slot ids with a live lease held by anyone other than exclude_owner."""
+        now = self._clock()
+        with self._lock:
+            expired = [key for key, (_, expires) in self._leases.items() if expires <= now]
+            for key in expired:
+                del self._leases[key]
+            return {
+                key[1] for key, (holder, _) in self._leases.items()
+                if key[0] == event_uuid and holder != exclude_owner
+            }
+
+    def filter_available(self, event_uuid: str, slots, owner: str = None) -> list:
+        """Drop slots reserved by other owners, keeping order."""
+        reserved = self.reserved_slots(event_uuid, exclude_owner=owner)
+        if not reserved:
+            return list(slots)
+        return [slot for slot in slots if slot_id(slot) not in reserved]
+
+    def reserve_first(self, event_uuid: str, slots, owner: str, ttl: float = DEFAULT_LEASE_SECONDS):
+        """Reserve the first slot in slots that is still free; returns it or None."""
+        for slot in slots:
+            if self.reserve(event_uuid, slot, owner, ttl):
+                return slot
+        return None
+
+
+class SQLiteSlotReservations(SlotReservations):
+    """Reservation table shared between processes through a SQLite file."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS slot_reservations (
+            event_uuid TEXT NOT NULL,
+            slot TEXT NOT NULL,
+            owner TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (event_uuid, slot)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path: str, clock=time.time):
+        """
+        Open (and create if needed) the shared table.
+
+        Args:
+            path: SQLite database file shared by every worker process
+            clock: Wall clock; leases are compared across processes, so it must not be monotonic
+        """
+        super().__init__(clock)
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(self.SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=30, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+    def reserve(self, event_uuid: str, slot, owner: str, ttl: float = DEFAULT_LEASE_SECONDS) -> bool:
+        key = (event_uuid, slot_id(slot))
+        now = self._clock()
+        conn = self._connection()
+        # A single upsert is atomic: it only overwrites our own or an expired lease
+        cursor = conn.execute(
+            "INSERT INTO slot_reservations (event_uuid, slot, owner, expires_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (event_uuid, slot) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE slot_reservations.owner = excluded.owner OR slot_reservations.expires_at <= ?",
+            (*key, owner, now + ttl, now)
+        )
+        reserved = cursor.rowcount == 1
+        with self._lock:
+            self.stats["reserved" if reserved else "conflicts"] += 1
+        return reserved
+
+    def release(self, event_uuid: str, slot, owner: str) -> None:
+        cursor = self._connection().execute(
+            "DELETE FROM slot_reservations WHERE event_uuid = ? AND slot = ? AND owner = ?",
+            (event_uuid, slot_id(slot), owner)
+        )
+        if cursor.rowcount:
+            with self._lock:
+                self.stats["released"] += 1
+
+    def reserved_slots(self, event_uuid: str, exclude_owner: str = None) -> set:
+        rows = self._connection().execute(
+            "SELECT slot FROM slot_reservations WHERE event_uuid = ? AND expires_at > ? AND owner != ?",
+            (event_uuid, self._clock(), exclude_owner or "")
+        ).fetchall()
+        return {row[0] for row in rows}
+
+
+_default_table = None
+_default_table_lock = threading.Lock()
+
+
+def get_reservation_table() -> SlotReservations:
+    """Return the process-wide reservation table (SQLite if CALENDLYAI_RESERVATIONS_PATH is set)."""
+    global _default_table
+    with _default_table_lock:
+        if _default_table is None:
+            path = os.getenv("CALENDLYAI_RESERVATIONS_PATH")
+            _default_table = SQLiteSlotReservations(path) if path else SlotReservations()
+        return _default_table
@@ -0,0 +1,389 @@
+"""
+Append-only, memory-mapped store of Calendly availability snapshots
+
+Historical get_calendly_availability responses are kept for analytics.
+Instead of one JSON file per response, they are appended as binary blocks
+to a single file that readers memory-map and scan without deserialising:
+
+    file    := FILE_MAGIC block*
+    block   := BLOCK header, host and timezone (UTF-8, padded to 8 bytes),
+               day_count DAY records, spot_count SPOT records
+    DAY     := date ordinal, flags (available, enabled)                  8 bytes
+    SPOT    := UTC epoch seconds, UTC offset in minutes, invitees
+               remaining, day index, flags (available)                  16 bytes
+
+Spots are sorted by start time, so a date range inside a snapshot is two
+binary searches over the mapped records, and each block header carries its
+first and last spot so whole snapshots outside a range are skipped. The
+per-host index (host -> snapshots in capture order) is built from the block
+headers alone when the store is opened. A block torn by a crash mid-append
+is ignored and overwritten by the next append. Appends are serialised
+within a process; use one writing process per store file.
+
+    with SnapshotStore("availability.snap") as store:
+        store.append(event_uuid, get_calendly_availability(event_uuid, tz))
+        for snapshot, spots in store.query(event_uuid, start=date(2025, 3, 3), end=date(2025, 3, 8)):
+            ...
+        calendar = store.load(store.snapshots(event_uuid)[-1])
+
+Setting CALENDLYAI_SNAPSHOT_STORE to a path makes get_calendly_availability
+append every response it fetches. Existing JSON files convert with:
+
+    python -m utils.snapshot_store import availability.snap EVENT_UUID results/*/availability.json
+    python -m utils.snapshot_store export availability.snap EVENT_UUID --index -1
+"""
+
+import os
+import json
+import mmap
+import time
+import struct
+import logging
+import argparse
+import threading
+from collections import namedtuple
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from functools import lru_cache
+
+from utils.timezone_utils import DEFAULT_TIMEZONE, localize
+
+logger = logging.getLogger(__name__)
+
+FILE_MAGIC = b"CALSNAP\x01"
+BLOCK_MAGIC = b"SNAP"
+# magic, host length, timezone length, day count, spot count, captured_at,
+# first spot, last spot, today (date ordinal), flags (invitee_publisher_error)
+BLOCK = struct.Struct("<4sHHIIdqqiB3x")
+DAY = struct.Struct("<iB3x")
+# start (epoch seconds), UTC offset (minutes), invitees remaining, day index, flags
+SPOT = struct.Struct("<qhHHB1x")
+SPOT_START = struct.Struct("<q")
+
+AVAILABLE = 1
+ENABLED = 2
+
+Snapshot = namedtuple("Snapshot", "host captured_at timezone today publisher_error day_count spot_count first last offset")
+Snapshot.__doc__ = "Location and summary of one stored snapshot; offset is where its DAY records start."
+
+
+def _pad(length: int) -> int:
+    """Round length up to the 8-byte record alignment."""
+    return (length + 7) & ~7
+
+
+def _parse_start(value: str, tz_name: str) -> datetime:
+    """Parse a spot start time, localizing strings without an offset in tz_name."""
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo is not None else localize(parsed, tz_name)
+
+
+def encode_snapshot(host: str, calendar: dict, captured_at: float = None) -> bytes:
+    """
+    Encode a Calendly-format calendar as one snapshot block.
+
+    Only the fields of the Calendly range response used here are kept:
+    invitee_publisher_error, today, availability_timezone and, per day,
+    date, status, enabled and spots (status, start_time, invitees_remaining).
+    Statuses other than "available" are stored as unavailable.
+
+    Args:
+        host (str): Event type UUID (or any host key) the snapshot belongs to
+        calendar (dict): Calendar data in Calendly format
+        captured_at (float): Capture time as epoch seconds (defaults to now)
+
+    Returns:
+        bytes: The encoded block
+    """
+    timezone = calendar.get("availability_timezone") or DEFAULT_TIMEZONE
+    days = []
+    spots = []
+    for day_index, day in enumerate(calendar.get("days", [])):
+        flags = (AVAILABLE if day.get("status") == "available" else 0) | (ENABLED if day.get("enabled", True) else 0)
+        days.append(DAY.pack(date.fromisoformat(day["date"]).toordinal(), flags))
+        for spot in day.get("spots", []):
+            start = _parse_start(spot["start_time"], timezone)
+            spots.append((
+                int(start.timestamp()),
+                int(start.utcoffset().total_seconds() // 60),
+                spot.get("invitees_remaining", 0),
+                day_index,
+                AVAILABLE if spot.get("status") == "available" else 0,
+            ))
+    spots.sort()
+
+    host_bytes, tz_bytes = host.encode(), timezone.encode()
+    names = host_bytes + tz_bytes
+    today = calendar.get("today")
+    header = BLOCK.pack(
+        BLOCK_MAGIC, len(host_bytes), len(tz_bytes), len(days), len(spots),
+        time.time() if captured_at is None else captured_at,
+        spots[0][0] if spots else 0, spots[-1][0] if spots else 0,
+        date.fromisoformat(today).toordinal() if today else 0,
+        1 if calendar.get("invitee_publisher_error") else 0,
+    )
+    return b"".join([
+        header, names, b"\0" * (_pad(len(names)) - len(names)),
+        *days, *(SPOT.pack(*spot) for spot in spots),
+    ])
+
+
+class SnapshotStore:
+    """Append-only snapshot file with a memory-mapped, per-host indexed read path."""
+
+    def __init__(self, path: str):
+        """
+        Open (or create) a snapshot store and index its blocks.
+
+        Args:
+            path (str): Store file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._mmap = None
+        self._index = {}
+        self._size = 0
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, "wb") as handle:
+                handle.write(FILE_MAGIC)
+        self.refresh()
+
+    def refresh(self):
+        """Re-map the file and index blocks appended since the last refresh (e.g. by another process)."""
+        with self._lock:
+            self._remap()
+
+    def _remap(self):
+        with open(self.path, "rb") as handle:
+            if handle.read(len(FILE_MAGIC)) != FILE_MAGIC:
+                raise ValueError(f"{self.path} is not a snapshot store")
+            # Views handed out by spot_records() keep the previous map alive until released
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        mapped = self._mmap
+        position = self._size or len(FILE_MAGIC)
+        while position + BLOCK.size <= len(mapped):
+            (magic, host_length, tz_length, day_count, spot_count, captured_at,
+             first, last, today, flags) = BLOCK.unpack_from(mapped, position)
+            names_at = position + BLOCK.size
+            records_at = names_at + _pad(host_length + tz_length)
+            end = records_at + day_count * DAY.size + spot_count * SPOT.size
+            if magic != BLOCK_MAGIC or end > len(mapped):
+                logger.warning(f"Ignoring incomplete snapshot block at byte {position} of {self.path}")
+                break
+            host = bytes(mapped[names_at:names_at + host_length]).decode()
+            timezone = bytes(mapped[names_at + host_length:names_at + host_length + tz_length]).decode()
+            self._index.setdefault(host, []).append(Snapshot(
+                host, captured_at, timezone, date.fromordinal(today) if today else None, bool(flags),
+                day_count, spot_count, first, last, records_at,
+            ))
+            position = end
+        self._size = position
+
+    def append(self, host: str, calendar: dict, captured_at: float = None) -> Snapshot:
+        """
+        Append a snapshot of a Calendly-format calendar.
+
+        Args:
+            host (str): Event type UUID (or any host key)
+            calendar (dict): Calendar data in Calendly format
+            captured_at (float): Capture time as epoch seconds (defaults to now)
+
+        Returns:
+            Snapshot: The stored snapshot
+        """
+        block = encode_snapshot(host, calendar, captured_at)
+        try:
+            with self._lock:
+                self._remap()
+                with open(self.path, "r+b") as handle:
+                    # Overwrite a torn block left behind by an interrupted append
+                    handle.truncate(self._size)
+                    handle.seek(self._size)
+                    handle.write(block)
+                self._remap()
+            return self._index[host][-1]
+        except Exception as e:
+            logger.error(f"Error appending snapshot for {host} to {self.path}: {e}")
+            raise
+
+    def hosts(self) -> list:
+        """Hosts with at least one snapshot."""
+        return sorted(self._index)
+
+    def snapshots(self, host: str, since=None, until=None) -> list:
+        """
+        Snapshots of a host in capture order, optionally limited to a capture window.
+
+        Args:
+            host (str): Host key
+            since: Earliest capture time (datetime or epoch seconds, inclusive)
+            until: Latest capture time (datetime or epoch seconds, exclusive)
+
+        Returns:
+            list: Snapshot entries
+        """
+        since = since.timestamp() if isinstance(since, datetime) else since
+        until = until.timestamp() if isinstance(until, datetime) else until
+        return [
+            snapshot for snapshot in self._index.get(host, [])
+            if (since is None or snapshot.captured_at >= since) and (until is None or snapshot.captured_at < until)
+        ]
+
+    def _bound(self, value, snapshot: Snapshot):
+        """Epoch seconds of a range bound; dates are local midnight in the snapshot's timezone."""
+        if value is None or isinstance(value, (int, float)):
+            return value
+        if not isinstance(value, datetime):
+            value = localize(datetime(value.year, value.month, value.day), snapshot.timezone)
+        return int(value.timestamp())
+
+    def _bisect(self, base: int, count: int, target: int) -> int:
+        """Index of the first spot record starting at or after target."""
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if SPOT_START.unpack_from(self._mmap, base + middle * SPOT.size)[0] < target:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def spot_records(self, snapshot: Snapshot, start=None, end=None) -> memoryview:
+        """
+        Zero-copy view of a snapshot's SPOT records starting in [start, end).
+
+        Args:
+            snapshot (Snapshot): Entry from snapshots()
+            start: Range start (date, aware datetime or epoch seconds; None for unbounded)
+            end: Range end, exclusive
+
+        Returns:
+            memoryview: Packed SPOT records; unpack with SPOT.iter_unpack()
+        """
+        base = snapshot.offset + snapshot.day_count * DAY.size
+        start, end = self._bound(start, snapshot), self._bound(end, snapshot)
+        first = 0 if start is None else self._bisect(base, snapshot.spot_count, start)
+        last = snapshot.spot_count if end is None else self._bisect(base, snapshot.spot_count, end)
+        return memoryview(self._mmap)[base + first * SPOT.size:base + max(first, last) * SPOT.size]
+
+    def query(self, host: str, start=None, end=None, since=None, until=None):
+        """
+        Scan a host's snapshots for bookable spots in a date range.
+
+        Snapshots whose spots all fall outside [start, end) are skipped from
+        the index without touching their records.
+
+        Args:
+            host (str): Host key
+            start: Range start (date, aware datetime or epoch seconds; None for unbounded)
+            end: Range end, exclusive
+            since: Earliest capture time (datetime or epoch seconds)
+            until: Latest capture time, exclusive
+
+        Yields:
+            tuple: (Snapshot, list of available spot start times as epoch seconds)
+        """
+        for snapshot in self.snapshots(host, since, until):
+            if not snapshot.spot_count:
+                continue
+            low, high = self._bound(start, snapshot), self._bound(end, snapshot)
+            if (low is not None and snapshot.last < low) or (high is not None and snapshot.first >= high):
+                continue
+            records = self.spot_records(snapshot, low, high)
+            yield snapshot, [
+                seconds for seconds, _, invitees, _, flags in SPOT.iter_unpack(records)
+                if flags & AVAILABLE and invitees > 0
+            ]
+
+    def load(self, snapshot: Snapshot) -> dict:
+        """
+        Decode a snapshot back into a Calendly-format calendar.
+
+        Args:
+            snapshot (Snapshot): Entry from snapshots()
+
+        Returns:
+            dict: Calendar data in Calendly format
+        """
+        days = []
+        for ordinal, flags in DAY.iter_unpack(self._mmap[snapshot.offset:snapshot.offset + snapshot.day_count * DAY.size]):
+            days.append({
+                "date": date.fromordinal(ordinal).isoformat(),
+                "status": "available" if flags & AVAILABLE else "unavailable",
+                "spots": [],
+                "enabled": bool(flags & ENABLED),
+            })
+        for seconds, offset, invitees, day_index, flags in SPOT.iter_unpack(self.spot_records(snapshot)):
+            start = datetime.fromtimestamp(seconds, _fixed_offset(offset))
+            days[day_index]["spots"].append({
+                "status": "available" if flags & AVAILABLE else "unavailable",
+                "start_time": start.isoformat(timespec="seconds"),
+                "invitees_remaining": invitees,
+            })
+        return {
+            "invitee_publisher_error": snapshot.publisher_error,
+            "today": snapshot.today.isoformat() if snapshot.today else None,
+            "availability_timezone": snapshot.timezone,
+            "days": days,
+        }
+
+    def close(self):
+        """Drop the read mapping; it is unmapped once no spot_records() views remain."""
+        self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+
+@lru_cache(maxsize=64)
+def _fixed_offset(minutes: int) -> dt_timezone:
+    return dt_timezone(timedelta(minutes=minutes))
+
+
+@lru_cache(maxsize=1)
+def snapshot_store_from_env():
+    """The store named by CALENDLYAI_SNAPSHOT_STORE, or None when snapshots are not kept."""
+    path = os.environ.get("CALENDLYAI_SNAPSHOT_STORE")
+    return SnapshotStore(path) if path else None
+
+
+def record_snapshot(host: str, calendar: dict) -> None:
+    """
+    Append an availability response to the configured store, if any.
+
+    Recording is best effort: a failure is logged and never fails the caller.
+    """
+    try:
+        store = snapshot_store_from_env()
+        if store is not None:
+            store.append(host, calendar)
+    except Exception as e:
+        logger.warning(f"Could not record availability snapshot for {host}: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Availability snapshot store tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    import_parser = subparsers.add_parser('import', help='Append Calendly-format JSON files to a store')
+    import_parser.add_argument('store', help='Snapshot store file')
+    import_parser.add_argument('host', help='Event type UUID the files belong to')
+    import_parser.add_argument('files', nargs='+', help='JSON files; captured_at is taken from their mtime')
+    export_parser = subparsers.add_parser('export', help='Print a stored snapshot as Calendly-format JSON')
+    export_parser.add_argument('store', help='Snapshot store file')
+    export_parser.add_argument('host', help='Event type UUID')
+    export_parser.add_argument('--index', type=int, default=-1, help='Snapshot index in capture order')
+
+    args = parser.parse_args()
+    with SnapshotStore(args.store) as snapshot_store:
+        if args.command == 'import':
+            for file_path in args.files:
+                with open(file_path) as handle:
+                    snapshot_store.append(args.host, json.load(handle), captured_at=os.path.getmtime(file_path))
+            print(f"Appended {len(args.files)} snapshots to {args.store}")
+        else:
+            print(json.dumps(snapshot_store.load(snapshot_store.snapshots(args.host)[args.index]), indent=2))
@@ -0,0 +1,90 @@
+"""
+Timezone helpers for slot math
+
+Slots are handled as UTC datetimes internally and the caller's timezone is
+only applied at the edges (Calendly request params, prompt text and booking
+URLs). Conversions go straight through zoneinfo, whose C implementation
+caches each zone's transitions and needs no pytz-style normalize().
+"""
+
+from datetime import datetime, timezone as dt_timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+UTC = dt_timezone.utc
+DEFAULT_TIMEZONE = "America/Los_Angeles"
+
+
+@lru_cache(maxsize=None)
+def get_zone(tz_name: str) -> ZoneInfo:
+    """Return the (cached) ZoneInfo for an IANA timezone name."""
+    return ZoneInfo(tz_name)
+
+
+def localize(naive_local: datetime, tz_name: str) -> datetime:
+    """
+    Attach tz_name to a naive local wall-clock time.
+
+    Args:
+        naive_local: Naive datetime expressed in tz_name wall-clock time
+        tz_name: IANA timezone name
+
+    Returns:
+        datetime: Aware datetime in tz_name (ambiguous times take the first occurrence)
+    """
+    return naive_local.replace(tzinfo=get_zone(tz_name))
+
+
+def local_to_utc(naive_local: datetime, tz_name: str) -> datetime:
+    """Convert a naive local wall-clock time in tz_name to an aware UTC datetime."""
+    return localize(naive_local, tz_name).astimezone(UTC)
+
+
+def to_utc(value: datetime, tz_name: str = None) -> datetime:
+    """
+    Normalize a datetime to aware UTC.
+
+    Naive datetimes are interpreted in tz_name when given, otherwise as UTC.
+    """
+    if value.tzinfo is None:
+        if tz_name:
+            return local_to_utc(value, tz_name)
+        return value.replace(tzinfo=UTC)
+    return value.astimezone(UTC)
+
+
+def utc_to_local(value: datetime, tz_name: str) -> datetime:
+    """
+    Convert a UTC datetime to tz_name.
+
+    Args:
+        value: Aware datetime (naive values are treated as UTC)
+        tz_name: IANA timezone name
+
+    Returns:
+        datetime: Aware datetime in tz_name
+    """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return value.astimezone(get_zone(tz_name))
+
+
+def parse_slot(value: str, tz_name: str = None) -> datetime:
+    """
+    Parse an ISO 8601 slot string into an aware UTC datetime.
+
+    Args:
+        value: ISO 8601 string, e.g. "2025-04-01T14:00:00-07:00" or "...Z"
+        tz_name: Timezone used for strings without an offset (defaults to UTC)
+
+    Returns:
+        datetime: Aware UTC datetime
+    """
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    return to_utc(datetime.fromisoformat(value), tz_name)
+
+
+def format_slot(value: datetime, tz_name: str) -> str:
+    """Format a UTC datetime as an ISO 8601 string in tz_name, e.g. 2025-04-01T14:00:00-07:00."""
+    return utc_to_local(value, tz_name).isoformat(timespec="seconds")
@@ -0,0 +1,131 @@
+"""
+Condition-based waits and retry backoff for the booking paths
+
+wait_until() polls a condition with adaptive (growing) intervals instead of
+sleeping for a fixed time, and backoff_delays() yields jittered exponential
+delays for retries. Every named wait is recorded in wait_stats() so timing
+runs can show how long each booking actually spent waiting.
+"""
+
+import random
+import threading
+import time
+
+_stats_lock = threading.Lock()
+_wait_stats = {}
+
+
+def _record(name: str, elapsed: float, satisfied: bool) -> None:
+    """Accumulate timing for a named wait."""
+    if not name:
+        return
+    with _stats_lock:
+        entry = _wait_stats.setdefault(name, {"count": 0, "total_s": 0.0, "max_s": 0.0, "timeouts": 0})
+        entry["count"] += 1
+        entry["total_s"] += elapsed
+        entry["max_s"] = max(entry["max_s"], elapsed)
+        if not satisfied:
+            entry["timeouts"] += 1
+
+
+def wait_stats() -> dict:
+    """Return a snapshot of per-name wait counts, total/max seconds and timeouts."""
+    with _stats_lock:
+        return {name: dict(entry) for name, entry in _wait_stats.items()}
+
+
+def reset_wait_stats() -> None:
+    """Clear recorded wait statistics."""
+    with _stats_lock:
+        _wait_stats.clear()
+
+
+def wait_until(condition, timeout: float = 10, initial_interval: float = 0.05, max_interval: float = 1.0,
+               backoff: float = 1.5, name: str = None, raise_on_timeout: bool = False,
+               sleep=time.sleep, clock=time.monotonic):
+    """
+    Poll condition until it returns a truthy value or the timeout expires.
+
+    The first checks happen quickly and the interval grows by `backoff` up to
+    max_interval, so fast conditions return almost immediately while slow ones
+    do not hammer a remote browser. Exceptions raised by the condition count
+    as "not yet".
+
+    Args:
+        condition: Callable returning a truthy value when the wait is over
+        timeout: Maximum seconds to wait
+        initial_interval: First polling interval in seconds
+        max_interval: Upper bound for the polling interval
+        backoff: Multiplier applied to the interval after each poll
+        name: Optional name under which the wait is recorded in wait_stats()
+        raise_on_timeout: Raise TimeoutError instead of returning None on timeout
+        sleep: Sleep function (override for simulated time)
+        clock: Monotonic clock function (override for simulated time)
+
+    Returns:
+        The condition's truthy result, or None on timeout
+    """
+    start = clock()
+    deadline = start + timeout
+    interval = initial_interval
+    while True:
+        try:
+            result = condition()
+        except Exception:
+            result = None
+        if result:
+            _record(name, clock() - start, True)
+            return result
+
+        remaining = deadline - clock()
+        if remaining <= 0:
+            _record(name, clock() - start, False)
+            if raise_on_timeout:
+                raise TimeoutError(f"Condition {name or condition!r} not met within {timeout}s")
+            return None
+
+        sleep(min(interval, remaining))
+        interval = min(interval * backoff, max_interval)
+
+
+def backoff_delays(base: float = 1.0, factor: float = 2.0, max_delay: float = 30.0, jitter: str = "full",
+                   rng: random.Random = None):
+    """
+    Yield jittered exponential backoff delays for successive retries.
+
+    Args:
+        base: Delay ceiling for the first retry in seconds
+        factor: Growth factor of the ceiling per retry
+        max_delay: Upper bound for the ceiling
+        jitter: "full" (uniform in [0, ceiling]), "equal" (ceiling/2 + uniform half) or "none"
+        rng: Optional random.Random for reproducible delays
+
+    Yields:
+        float: Seconds to wait before the next attempt
+    """
+    rng = rng or random
+    attempt = 0
+    while True:
+        ceiling = min(max_delay, base * factor ** attempt)
+        if jitter == "full":
+            yield rng.uniform(0, ceiling)
+        elif jitter == "equal":
+            yield ceiling / 2 + rng.uniform(0, ceiling / 2)
+        elif jitter == "none":
+            yield ceiling
+        else:
+            raise ValueError(f"Unknown jitter mode: {jitter}")
+        attempt += 1
+
+
+def sleep_backoff(delays, name: str = None, sleep=time.sleep) -> float:
+    """
+    Sleep for the next delay from a backoff_delays() generator and record it.
+
+    Returns:
+        float: Seconds slept
+    """
+    delay = next(delays)
+    sleep(delay)
+    _record(name, delay, True)
+    return delay
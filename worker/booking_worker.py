@@ -0,0 +1,277 @@
+"""
+Long-running booking worker
+
+Pulls booking jobs from a job queue backend (see worker.job_queue) and runs
+book_calendly_meeting for each, at most `concurrency` at a time. Bookings are
+blocking (Browserbase WebDriver, HTTP, LLM), so they run on a thread pool
+sized to the concurrency limit; the Calendly HTTP session and the chat model
+are shared by every job.
+
+While a job runs the worker renews its lease in the queue, so other
+worker processes sharing the queue never take it over. On SIGINT/SIGTERM
+the worker stops taking new jobs and waits for in-flight bookings to finish
+(their scrapers close their Browserbase sessions). Jobs whose bookings are
+still running when the drain timeout expires are marked failed as
+abandoned on shutdown before the queue closes, so no other worker picks up
+a booking that may still land; their threads keep the shared HTTP session
+and their Browserbase sessions, and the process exits once they return.
+
+With --metrics-port the process serves Prometheus metrics (utils.metrics:
+booking outcomes, phase latencies, browser and HTTP pool usage, worker jobs)
+at /metrics.
+
+Run from the repository root:
+
+    python -m worker.booking_worker --backend sqlite --db booking_jobs.db --concurrency 4
+    python -m worker.booking_worker --backend sqlite --db booking_jobs.db --enqueue jobs.jsonl --exit-when-empty
+    python -m worker.booking_worker --backend sqlite --db booking_jobs.db --metrics-port 9100
+"""
+
+import json
+import time
+import signal
+import asyncio
+import logging
+import argparse
+import statistics
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from worker.job_queue import create_job_queue
+from utils.logging_setup import configure_from_env, log_context
+from utils.metrics import REGISTRY, start_metrics_server
+
+logger = logging.getLogger(__name__)
+
+LATENCY_WINDOW = 1000  # most recent job latencies kept for percentiles
+ABANDONED_ERROR = "Abandoned on shutdown: booking still running after the drain timeout"
+
+WORKER_JOBS = REGISTRY.gauge("calendlyai_worker_jobs", "Booking worker jobs by state", ("state",))
+JOB_SECONDS = REGISTRY.histogram("calendlyai_worker_job_seconds", "Queued booking job latency by outcome", ("outcome",))
+
+
+class BookingWorker:
+    """Runs queued bookings with a concurrency limit and collects throughput metrics."""
+
+    def __init__(self, job_queue, concurrency: int = 4, book=None, llm=None, drain_timeout: float = 300):
+        """
+        Initialize the worker.
+
+        Args:
+            job_queue: Backend from worker.job_queue.create_job_queue()
+            concurrency: Maximum bookings running at once
+            book: Booking function taking the job payload as kwargs (defaults to book.book_calendly_meeting)
+            llm: Chat model shared by every job (defaults to utils.llm_providers.get_chat_model())
+            drain_timeout: Seconds to wait for in-flight bookings on shutdown
+        """
+        if book is None:
+            from book import book_calendly_meeting
+            book = book_calendly_meeting
+        if llm is None:
+            from utils.llm_providers import get_chat_model
+            llm = get_chat_model()
+        self.job_queue = job_queue
+        self.concurrency = concurrency
+        self.book = book
+        self.llm = llm
+        self.drain_timeout = drain_timeout
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="booking")
+        self._stopping = False
+        self._in_flight = {}  # task -> job id
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._started_at = None
+        self.counters = {"completed": 0, "succeeded": 0, "failed": 0, "abandoned": 0}
+        # Read at scrape time, so the gauge never lags behind the queue between metrics() calls
+        WORKER_JOBS.set_function(lambda: {"queued": self.job_queue.depth()})
+
+    def stop(self) -> None:
+        """Stop taking new jobs; in-flight bookings are drained by run()."""
+        if not self._stopping:
+            logger.info("Booking worker stopping, draining in-flight jobs")
+            self._stopping = True
+
+    def metrics(self) -> dict:
+        """Return throughput, queue depth, in-flight count and latency percentiles."""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        latencies = sorted(self._latencies)
+        queue_depth = self.job_queue.depth()
+        return {
+            **self.counters,
+            "in_flight": len(self._in_flight),
+            "queue_depth": queue_depth,
+            "uptime_s": elapsed,
+            "throughput_per_min": self.counters["completed"] / elapsed * 60 if elapsed else 0.0,
+            "latency_p50_s": statistics.median(latencies) if latencies else None,
+            "latency_p95_s": latencies[int(0.95 * (len(latencies) - 1))] if latencies else None,
+        }
+
+    def _run_booking(self, payload: dict):
+        """Run one booking on a worker thread."""
+        return self.book(**payload, llm=self.llm)
+
+    async def _process(self, job: dict) -> None:
+        with log_context(booking_id=f"job-{job['id']}"):
+            await self._process_job(job)
+
+    async def _process_job(self, job: dict) -> None:
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        try:
+            # run_in_executor does not carry context variables over to the thread on 3.9
+            context = contextvars.copy_context()
+            result = await loop.run_in_executor(self._executor, context.run, self._run_booking, job["payload"])
+        except Exception as e:
+            result = None
+            error = f"{type(e).__name__}: {e}"
+        else:
+            error = None if result else "Booking returned no URL"
+        elapsed = time.monotonic() - start
+
+        self._latencies.append(elapsed)
+        self.counters["completed"] += 1
+        JOB_SECONDS.observe(elapsed, outcome="succeeded" if error is None else "failed")
+        if error is None:
+            self.counters["succeeded"] += 1
+            await self.job_queue.complete(job["id"], result)
+            logger.info(f"Job {job['id']} booked in {elapsed:.2f}s: {result}")
+        else:
+            self.counters["failed"] += 1
+            await self.job_queue.fail(job["id"], error)
+            logger.error(f"Job {job['id']} failed after {elapsed:.2f}s: {error}")
+
+    async def run(self, exit_when_empty: bool = False, metrics_interval: float = 30) -> dict:
+        """
+        Consume jobs until stop() is called (or the queue is empty, if exit_when_empty).
+
+        Returns:
+            dict: Final metrics
+        """
+        self._started_at = time.monotonic()
+        slots = asyncio.Semaphore(self.concurrency)
+        reporter = asyncio.ensure_future(self._report(metrics_interval)) if metrics_interval else None
+        lease_seconds = getattr(self.job_queue, "lease_seconds", None)
+        heartbeat = asyncio.ensure_future(self._heartbeat(lease_seconds / 3)) if lease_seconds else None
+        logger.info(f"Booking worker started with concurrency {self.concurrency}")
+
+        try:
+            while not self._stopping:
+                await slots.acquire()
+                job = None
+                try:
+                    if not self._stopping:
+                        job = await self.job_queue.get(timeout=1.0)
+                finally:
+                    if job is None:
+                        slots.release()
+                if job is None:
+                    if exit_when_empty and not self._in_flight and self.job_queue.depth() == 0:
+                        break
+                    continue
+
+                task = asyncio.ensure_future(self._process(job))
+                self._in_flight[task] = job["id"]
+                WORKER_JOBS.set(len(self._in_flight), state="in_flight")
+                task.add_done_callback(self._job_done)
+                task.add_done_callback(lambda _: slots.release())
+        finally:
+            await self._drain()
+            for background in (reporter, heartbeat):
+                if background is not None:
+                    background.cancel()
+            final = self.metrics()
+            await self.job_queue.close()
+
+        logger.info(f"Booking worker stopped: {final}")
+        return final
+
+    def _job_done(self, task) -> None:
+        self._in_flight.pop(task, None)
+        WORKER_JOBS.set(len(self._in_flight), state="in_flight")
+
+    async def _drain(self) -> None:
+        """Wait for in-flight bookings, then release shared resources or mark the stragglers abandoned."""
+        if self._in_flight:
+            logger.info(f"Waiting up to {self.drain_timeout}s for {len(self._in_flight)} in-flight job(s)")
+            done, pending = await asyncio.wait(set(self._in_flight), timeout=self.drain_timeout)
+            if pending:
+                # Record the jobs before the queue closes; their outcome is settled by the booking
+                # ledger, not by rerunning them. Cancelling the tasks does not stop their executor
+                # threads, which still use the HTTP session and their Browserbase sessions
+                abandoned = [self._in_flight[task] for task in pending]
+                logger.warning(f"{len(pending)} job(s) still running after the drain timeout; marking them "
+                               f"abandoned and keeping the HTTP session and browser sessions open until they return")
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                for job_id in abandoned:
+                    self.counters["abandoned"] += 1
+                    await self.job_queue.fail(job_id, ABANDONED_ERROR)
+                self._executor.shutdown(wait=False)
+                return
+
+        from browser.browserbase_handler import release_open_sessions
+        release_open_sessions()
+        self._executor.shutdown(wait=False)
+        from utils.calendly_api import close_http_session
+        close_http_session()
+
+    async def _heartbeat(self, interval: float) -> None:
+        """Renew the queue leases of in-flight jobs every interval seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.job_queue.heartbeat(list(self._in_flight.values()))
+            except Exception as e:
+                logger.warning(f"Could not renew job leases: {e}")
+
+    async def _report(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            logger.info(f"Booking worker metrics: {self.metrics()}")
+
+
+async def enqueue_file(job_queue, path: str) -> int:
+    """Enqueue one job per JSON line (book_calendly_meeting keyword arguments)."""
+    count = 0
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                await job_queue.put(json.loads(line))
+                count += 1
+    return count
+
+
+async def _main(args) -> dict:
+    queue_kwargs = {"path": args.db} if args.backend == "sqlite" else {}
+    job_queue = create_job_queue(args.backend, **queue_kwargs)
+    if args.enqueue:
+        logger.info(f"Enqueued {await enqueue_file(job_queue, args.enqueue)} job(s) from {args.enqueue}")
+
+    worker = BookingWorker(job_queue, concurrency=args.concurrency, drain_timeout=args.drain_timeout)
+    if args.metrics_port is not None:
+        start_metrics_server(args.metrics_port)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, worker.stop)
+        except NotImplementedError:
+            pass
+    return await worker.run(exit_when_empty=args.exit_when_empty, metrics_interval=args.metrics_interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run the Calendly booking worker')
+    parser.add_argument('--backend', choices=['memory', 'sqlite'], default='sqlite', help='Job queue backend')
+    parser.add_argument('--db', default='booking_jobs.db', help='SQLite job database (sqlite backend)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Bookings running at once')
+    parser.add_argument('--enqueue', help='JSONL file of booking jobs to enqueue before starting')
+    parser.add_argument('--exit-when-empty', action='store_true', help='Exit once the queue is drained')
+    parser.add_argument('--drain-timeout', type=float, default=300, help='Seconds to wait for in-flight jobs on shutdown')
+    parser.add_argument('--metrics-interval', type=float, default=30, help='Seconds between metrics log lines (0 to disable)')
+    parser.add_argument('--metrics-port', type=int, help='Serve Prometheus metrics on this port at /metrics')
+
+    args = parser.parse_args()
+    configure_from_env(force=True)
+
+    print(json.dumps(asyncio.run(_main(args)), indent=2))
@@ -0,0 +1,228 @@
+"""
+Job queue backends for the booking worker
+
+Every backend exposes the same small async interface so the worker does not
+care where jobs come from:
+
+    put(payload)            -> job id
+    get(timeout)            -> job dict {"id", "payload", "attempts"} or None
+    heartbeat(job_ids)      extend the lease of running jobs
+    complete(job_id, result)
+    fail(job_id, error)
+    depth()                 -> number of queued jobs
+    close()
+
+InMemoryJobQueue wraps an asyncio.Queue for in-process use. SQLiteJobQueue
+persists jobs in a local SQLite file so they survive restarts and can be
+shared by several worker processes. A claimed job is leased to its worker
+for lease_seconds and the worker's heartbeats keep renewing the lease; only
+jobs whose lease expired (their worker crashed or hung) are requeued, so a
+second worker never takes over jobs another live worker is running.
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import logging
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_SECONDS = 60.0
+
+
+class InMemoryJobQueue:
+    """In-process job queue backed by asyncio.Queue."""
+
+    lease_seconds = None  # jobs never leave the process, so there is nothing to lease
+
+    def __init__(self, maxsize: int = 0):
+        self._queue = asyncio.Queue(maxsize)
+        self.results = {}
+
+    async def put(self, payload: dict) -> str:
+        job_id = uuid.uuid4().hex
+        await self._queue.put({"id": job_id, "payload": payload, "attempts": 1})
+        return job_id
+
+    async def get(self, timeout: float = 1.0):
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def heartbeat(self, job_ids) -> None:
+        pass
+
+    async def complete(self, job_id: str, result) -> None:
+        self.results[job_id] = {"status": "done", "result": result}
+
+    async def fail(self, job_id: str, error: str) -> None:
+        self.results[job_id] = {"status": "failed", "error": error}
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    async def close(self) -> None:
+        pass
+
+
+class SQLiteJobQueue:
+    """Durable job queue stored in a local SQLite database."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            result TEXT,
+            error TEXT,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL,
+            worker_id TEXT,
+            lease_until REAL
+        );
+        CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+    """
+    LEASE_COLUMNS = {"worker_id": "TEXT", "lease_until": "REAL"}
+
+    def __init__(self, path: str = "booking_jobs.db", poll_interval: float = 0.2, requeue_running: bool = True,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS, worker_id: str = None):
+        """
+        Open (and create if needed) the job database.
+
+        Args:
+            path: SQLite database file
+            poll_interval: Seconds between polls while the queue is empty
+            requeue_running: Put 'running' jobs whose lease expired back in the queue before claiming
+            lease_seconds: Seconds a claimed job stays leased without a heartbeat
+            worker_id: Identity recorded on claimed jobs (defaults to host, PID and a random suffix)
+        """
+        self.path = path
+        self.poll_interval = poll_interval
+        self.requeue_running = requeue_running
+        self.lease_seconds = lease_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+        # Databases created before leases lack the lease columns; their running jobs count as expired
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for name, kind in self.LEASE_COLUMNS.items():
+            if name not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+
+    def _put(self, payload: dict) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, payload, created_at) VALUES (?, ?, ?)",
+                (job_id, json.dumps(payload), time.time())
+            )
+        return job_id
+
+    def _claim(self):
+        """Atomically requeue expired leases and lease the oldest queued job to this worker."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                requeued = 0
+                if self.requeue_running:
+                    requeued = self._conn.execute(
+                        "UPDATE jobs SET status = 'queued', worker_id = NULL, lease_until = NULL "
+                        "WHERE status = 'running' AND (lease_until IS NULL OR lease_until < ?)", (now,)
+                    ).rowcount
+                row = self._conn.execute(
+                    "SELECT id, payload, attempts FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, "
+                        "worker_id = ?, lease_until = ? WHERE id = ?",
+                        (now, self.worker_id, now + self.lease_seconds, row[0])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if requeued:
+            logger.warning(f"Requeued {requeued} job(s) whose lease expired in {self.path}")
+        if row is None:
+            return None
+        return {"id": row[0], "payload": json.loads(row[1]), "attempts": row[2] + 1}
+
+    def _heartbeat(self, job_ids) -> int:
+        """Extend the leases this worker still holds; returns how many were extended."""
+        job_ids = list(job_ids)
+        if not job_ids:
+            return 0
+        with self._lock:
+            extended = self._conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE status = 'running' AND worker_id = ? "
+                f"AND id IN ({', '.join('?' * len(job_ids))})",
+                (time.time() + self.lease_seconds, self.worker_id, *job_ids)
+            ).rowcount
+        if extended < len(job_ids):
+            logger.warning(f"Lost the lease on {len(job_ids) - extended} running job(s) in {self.path}")
+        return extended
+
+    def _finish(self, job_id: str, status: str, result=None, error: str = None) -> None:
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL "
+                "WHERE id = ? AND worker_id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id,
+                 self.worker_id)
+            ).rowcount
+        if not updated:
+            logger.warning(f"Job {job_id} finished as {status} after its lease passed to another worker")
+
+    async def put(self, payload: dict) -> str:
+        return await asyncio.to_thread(self._put, payload)
+
+    async def get(self, timeout: float = 1.0):
+        deadline = time.monotonic() + timeout
+        while True:
+            job = await asyncio.to_thread(self._claim)
+            if job is not None or time.monotonic() >= deadline:
+                return job
+            await asyncio.sleep(min(self.poll_interval, max(0.0, deadline - time.monotonic())))
+
+    async def heartbeat(self, job_ids) -> None:
+        await asyncio.to_thread(self._heartbeat, job_ids)
+
+    async def complete(self, job_id: str, result) -> None:
+        await asyncio.to_thread(self._finish, job_id, "done", result)
+
+    async def fail(self, job_id: str, error: str) -> None:
+        await asyncio.to_thread(self._finish, job_id, "failed", None, error)
+
+    def depth(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    async def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def create_job_queue(backend: str = "memory", **kwargs):
+    """
+    Create a job queue backend by name ("memory" or "sqlite").
+
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    if backend == "memory":
+        return InMemoryJobQueue(**kwargs)
+    if backend == "sqlite":
+        return SQLiteJobQueue(**kwargs)
+    raise ValueError(f"Unknown job queue backend: {backend}")